@@ -26,13 +26,18 @@ DoubleSpinBox.__init__ = _new_init
 class Globals(QObject):
     clicked = Signal(int, int, object, bool)
     pressed = Signal(object)
+    released = Signal(object)
+    moved = Signal(int, int)
 
     def __init__(self, exit_event):
         super().__init__()
         self.pynput_mouse = None
+        self.pynput_mouse_move = None
         self.pynput_keyboard = None
         self._thread_pool_executor_max_workers = 0
         self.thread_pool_executor = None
+        self._vision_executor_max_workers = 0
+        self.vision_executor = None
         self.shared_frame = None
         exit_event.bind_stop(self)
         self.init_pynput()
@@ -41,6 +46,7 @@ class Globals(QObject):
         logger.info("pynput stop")
         self.reset_pynput()
         self.shutdown_thread_pool_executor()
+        self.shutdown_vision_executor()
 
     def init_pynput(self):
         logger.info("pynput start")
@@ -48,10 +54,22 @@ class Globals(QObject):
             self.pynput_mouse = mouse.Listener(on_click=self.on_click)
             self.pynput_mouse.start()
         if self.pynput_keyboard is None:
-            self.pynput_keyboard = keyboard.Listener(on_press=self.on_press)
+            self.pynput_keyboard = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
             self.pynput_keyboard.start()
 
+    def start_move_listener(self):
+        """开始转发鼠标移动（moved 信号），只在需要时（如录制宏）开启，平时不监听全局的鼠标移动。"""
+        if self.pynput_mouse_move is None:
+            self.pynput_mouse_move = mouse.Listener(on_move=self.on_move)
+            self.pynput_mouse_move.start()
+
+    def stop_move_listener(self):
+        if self.pynput_mouse_move:
+            self.pynput_mouse_move.stop()
+            self.pynput_mouse_move = None
+
     def reset_pynput(self):
+        self.stop_move_listener()
         if self.pynput_mouse:
             self.pynput_mouse.stop()
             self.pynput_mouse = None
@@ -65,6 +83,12 @@ class Globals(QObject):
     def on_press(self, key):
         self.pressed.emit(key)
 
+    def on_release(self, key):
+        self.released.emit(key)
+
+    def on_move(self, x, y):
+        self.moved.emit(x, y)
+
     def get_thread_pool_executor(self, max_workers=4):
         """
         获取全局执行器。
@@ -89,6 +113,32 @@ class Globals(QObject):
             self.thread_pool_executor = None
             self._thread_pool_executor_max_workers = 0
 
+    def get_vision_executor(self, max_workers=4):
+        """
+        获取图像匹配专用的执行器。
+
+        与全局执行器分开，避免常驻的后台任务（如鼠标抖动）占用线程导致匹配任务排队。
+        max_workers 变化时重建线程池。
+        """
+        if self.vision_executor is not None and max_workers != self._vision_executor_max_workers:
+            logger.info(
+                f"vision executor reset max_workers {self._vision_executor_max_workers} -> {max_workers}")
+            self.shutdown_vision_executor()
+
+        if self.vision_executor is None:
+            logger.info(f"create vision executor, max_workers: {max_workers}")
+            self.vision_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                                         thread_name_prefix="vision")
+            self._vision_executor_max_workers = max_workers
+
+        return self.vision_executor
+
+    def shutdown_vision_executor(self):
+        if self.vision_executor is not None:
+            self.vision_executor.shutdown(wait=False, cancel_futures=True)
+            self.vision_executor = None
+            self._vision_executor_max_workers = 0
+
 
 if __name__ == "__main__":
     glbs = Globals(exit_event=None)
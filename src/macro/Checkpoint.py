@@ -0,0 +1,54 @@
+REFERENCE_ASPECT = 16 / 9
+
+
+class Checkpoint:
+    """片段开始前的 track_point 测量点。
+
+    坐标均为 16:9 参考画面中的相对位置（水平方向以画面中心对齐，与 `box_of_screen_scaled(hcenter=True)` 一致）。
+    测量到的标记偏离录制时的位置超过 tolerance 时记录为漂移，用来统计路线在哪个片段开始偏离。
+
+    只测量不转动视角：把偏差换算为鼠标移动量需要按视野和灵敏度实测的系数，内置路线还没有实测的数据，
+    用估计的系数校正会把正常的出生点差异当成漂移转走。
+    """
+
+    __slots__ = ('expected', 'tolerance', 'search_radius')
+
+    def __init__(self, expected, tolerance=0.01, search_radius=0.08):
+        """
+        Args:
+            expected: 录制时标记中心的相对位置 (x, y)。
+            tolerance: 允许的偏差（相对画面宽度），超过时记录为漂移，必须小于 search_radius。
+            search_radius: 只在 expected 周围这个范围内查找标记。
+        """
+        if tolerance >= search_radius:
+            raise ValueError(f"测量点的 tolerance ({tolerance}) 必须小于 search_radius ({search_radius})")
+        self.expected = (float(expected[0]), float(expected[1]))
+        self.tolerance = tolerance
+        self.search_radius = search_radius
+
+    @classmethod
+    def from_dict(cls, data) -> 'Checkpoint | None':
+        if not data:
+            return None
+        return cls(**data)
+
+    def search_region(self) -> tuple[float, float, float, float]:
+        """查找标记的区域 (x1, y1, x2, y2)，相对 16:9 参考画面。"""
+        x, y = self.expected
+        radius = self.search_radius
+        return max(0.0, x - radius), max(0.0, y - radius), min(1.0, x + radius), min(1.0, y + radius)
+
+    def offset(self, measured) -> tuple[float, float]:
+        """测量位置相对录制位置的偏差。"""
+        return measured[0] - self.expected[0], measured[1] - self.expected[1]
+
+    def drifted(self, measured) -> bool:
+        """测量位置是否在任一方向上偏离录制位置超过 tolerance。"""
+        offset_x, offset_y = self.offset(measured)
+        return abs(offset_x) > self.tolerance or abs(offset_y) > self.tolerance
+
+
+def normalized_position(x, y, width, height) -> tuple[float, float]:
+    """把截图中的像素坐标换算为 16:9 参考画面中的相对位置（水平方向以画面中心对齐）。"""
+    reference_width = height * REFERENCE_ASPECT
+    return 0.5 + (x - width / 2) / reference_width, y / height
@@ -0,0 +1,204 @@
+import json
+
+import numpy as np
+
+OP_DELAY = 0
+OP_KEY_DOWN = 1
+OP_KEY_UP = 2
+OP_MOUSE_DOWN = 3
+OP_MOUSE_UP = 4
+OP_MOUSE_MOVE = 5
+OP_RESET_TRANSPORT = 6
+OP_F_DOWN = 7
+OP_F_UP = 8
+OP_CHECKPOINT = 9
+
+OP_NAMES = {
+    OP_DELAY: "delay",
+    OP_KEY_DOWN: "key_down",
+    OP_KEY_UP: "key_up",
+    OP_MOUSE_DOWN: "mouse_down",
+    OP_MOUSE_UP: "mouse_up",
+    OP_MOUSE_MOVE: "mouse_move",
+    OP_RESET_TRANSPORT: "reset_and_transport",
+    OP_F_DOWN: "key_down",
+    OP_F_UP: "key_up",
+    OP_CHECKPOINT: "checkpoint",
+}
+
+ACTION_DTYPE = np.dtype([
+    ('time', np.float64),
+    ('op', np.uint8),
+    ('arg', np.int32),
+    ('dx', np.int32),
+    ('dy', np.int32),
+])
+
+# 录制时的按键名 -> 运行时由 key_resolver 映射到玩家实际配置的按键
+MAPPED_KEYS = ('lshift', '4', 'e', 'q')
+
+ROTATION_DIRECTIONS = {"left": (-1, 0), "right": (1, 0), "up": (0, -1), "down": (0, 1)}
+
+
+class MacroProgram:
+    """编译后的外部脚本，与玩家配置无关，可保存为 `.npz`。
+
+    actions 为 ACTION_DTYPE 结构化数组，保持脚本中的顺序：
+    - time: 相对脚本开始的绝对时间（秒）。
+    - op: 操作码，见 OP_*。
+    - arg: 按键/鼠标按钮在 keys 中的下标，其他操作为 -1。
+    - dx, dy: 录制时的鼠标移动量，`mouse_rotation` 在编译时已换算为像素。
+    `f` 键按下的间隔决定它是交互还是快速破解，只能在播放时判断，因此单独使用 OP_F_DOWN/OP_F_UP。
+    OP_CHECKPOINT 的 arg 为 checkpoints 中的下标，每个校验点是脚本中去掉 type/time 后的字典。
+    """
+
+    def __init__(self, actions, keys, original_sensitivity=(1.0, 1.0), warnings=None, checkpoints=None):
+        self.actions = actions
+        self.keys = list(keys)
+        self.original_sensitivity = tuple(original_sensitivity)
+        self.warnings = warnings or []
+        self.checkpoints = checkpoints or []
+
+    def __len__(self):
+        return len(self.actions)
+
+    @property
+    def duration(self) -> float:
+        return float(self.actions['time'][-1]) if len(self.actions) else 0.0
+
+    def bind(self, key_resolver, sensitivity_divisor=None) -> 'BoundMacro':
+        """按当前的按键配置和灵敏度生成可直接播放的宏。
+
+        Args:
+            key_resolver: key_resolver(key) 返回实际发送的按键名。
+            sensitivity_divisor: (x, y)，鼠标移动量需要除以的系数，None 表示不换算。
+        """
+        keys = [key_resolver(key) for key in self.keys]
+        dx = self.actions['dx']
+        dy = self.actions['dy']
+        if sensitivity_divisor is not None:
+            dx = np.rint(dx / sensitivity_divisor[0]).astype(np.int32)
+            dy = np.rint(dy / sensitivity_divisor[1]).astype(np.int32)
+        return BoundMacro(self.actions['time'], self.actions['op'], self.actions['arg'], dx, dy, keys,
+                          self.checkpoints)
+
+    def save(self, path):
+        np.savez(path, actions=self.actions, keys=np.array(self.keys, dtype=str),
+                 original_sensitivity=np.array(self.original_sensitivity, dtype=np.float64),
+                 checkpoints=np.array(json.dumps(self.checkpoints, ensure_ascii=False)))
+
+    @classmethod
+    def load(cls, path) -> 'MacroProgram':
+        with np.load(path, allow_pickle=False) as data:
+            checkpoints = json.loads(str(data['checkpoints'])) if 'checkpoints' in data else []
+            return cls(data['actions'], data['keys'].tolist(), data['original_sensitivity'].tolist(),
+                       checkpoints=checkpoints)
+
+
+class BoundMacro:
+    """绑定了按键与灵敏度的宏，rows 中全部为 Python 标量，播放循环中不再做任何查表和换算。
+
+    OP_CHECKPOINT 行的 key 位置为校验点字典。
+    """
+
+    __slots__ = ('rows', 'duration')
+
+    def __init__(self, times, ops, args, dx, dy, keys, checkpoints=()):
+        keys = keys + [None]
+        key_names = [checkpoints[arg] if op == OP_CHECKPOINT else keys[arg]
+                     for op, arg in zip(np.asarray(ops).tolist(), np.asarray(args).tolist())]
+        self.rows = list(zip(np.asarray(times).tolist(), np.asarray(ops).tolist(), key_names,
+                             np.asarray(dx).tolist(), np.asarray(dy).tolist()))
+        self.duration = self.rows[-1][0] if self.rows else 0.0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+def compile_script(script, drop_alt=True, dynamic_f=True) -> MacroProgram:
+    """把外部脚本 JSON 编译为 MacroProgram。
+
+    Args:
+        script: 包含 actions 的脚本字典。
+        drop_alt: 是否丢弃 alt 键，录制脚本中的 alt 由任务自行管理。
+        dynamic_f: 是否把 `f` 编译为 OP_F_DOWN/OP_F_UP，在播放时判断交互还是快速破解。
+
+    Returns:
+        MacroProgram: 无法识别的动作会被跳过并记录在 warnings 中。
+    """
+    original_sensitivity = (1.0, 1.0)
+    if "original_x_sensitivity" in script and "original_y_sensitivity" in script:
+        original_sensitivity = (script["original_x_sensitivity"], script["original_y_sensitivity"])
+
+    keys = []
+    key_index = {}
+
+    def index_of(key):
+        if key not in key_index:
+            key_index[key] = len(keys)
+            keys.append(key)
+        return key_index[key]
+
+    rows = []
+    warnings = []
+    checkpoints = []
+    for action in script.get("actions", []):
+        action_type = action.get('type')
+        action_time = action.get('time', 0.0)
+        if action_type == "delay":
+            rows.append((action_time, OP_DELAY, -1, 0, 0))
+        elif action_type == "mouse_move":
+            rows.append((action_time, OP_MOUSE_MOVE, -1, action.get('dx', 0), action.get('dy', 0)))
+        elif action_type == "mouse_rotation":
+            direction = action.get("direction", "up")
+            if direction not in ROTATION_DIRECTIONS:
+                warnings.append(f"未知的鼠标方向: {direction}")
+                continue
+            pixels = int(action.get("angle", 0) * action.get("sensitivity", 10))
+            unit_x, unit_y = ROTATION_DIRECTIONS[direction]
+            rows.append((action_time, OP_MOUSE_MOVE, -1, unit_x * pixels, unit_y * pixels))
+        elif action_type in ("mouse_down", "mouse_up"):
+            op = OP_MOUSE_DOWN if action_type == "mouse_down" else OP_MOUSE_UP
+            rows.append((action_time, op, index_of(action.get('button', 'left')), 0, 0))
+        elif action_type in ("key_down", "key_up"):
+            key = normalize_key(action['key'])
+            down = action_type == "key_down"
+            if key == 'f4':
+                if down:
+                    rows.append((action_time, OP_RESET_TRANSPORT, -1, 0, 0))
+            elif key == 'f' and dynamic_f:
+                rows.append((action_time, OP_F_DOWN if down else OP_F_UP, -1, 0, 0))
+            elif 'alt' in key and drop_alt:
+                continue
+            else:
+                rows.append((action_time, OP_KEY_DOWN if down else OP_KEY_UP, index_of(key), 0, 0))
+        elif action_type == "checkpoint":
+            checkpoint = {key: value for key, value in action.items() if key not in ('type', 'time')}
+            if 'template' not in checkpoint and checkpoint.get('check') != 'in_team':
+                warnings.append(f"校验点缺少 template 或 check: {action}")
+                continue
+            rows.append((action_time, OP_CHECKPOINT, len(checkpoints), 0, 0))
+            checkpoints.append(checkpoint)
+        else:
+            warnings.append(f"Unknown action type: {action_type}")
+
+    actions = np.array(rows, dtype=ACTION_DTYPE)
+    return MacroProgram(actions, keys, original_sensitivity, warnings, checkpoints)
+
+
+def normalize_key(key: str) -> str:
+    """
+    标准化按键名称
+    """
+    if not isinstance(key, str):
+        return key
+
+    key_lower = key.lower()
+    if key_lower == 'shift':
+        return 'lshift'
+    if key_lower == 'ctrl':
+        return 'lcontrol'
+    return key
@@ -0,0 +1,119 @@
+import threading
+from contextlib import contextmanager
+
+INPUT_KEY_DOWN = 'key_down'
+INPUT_KEY_UP = 'key_up'
+INPUT_MOUSE_DOWN = 'mouse_down'
+INPUT_MOUSE_UP = 'mouse_up'
+INPUT_MOUSE_MOVE = 'mouse_move'
+
+
+class InputState:
+    """记录按键和鼠标按钮的按下状态，合并同一时刻的输入后一次性发出。
+
+    - 已按下的移动键（move_keys）不再重复 key_down，其余按键的重复按下照常发送：
+      内置路线会在按住移动键时再次按下闪避等按键，游戏需要收到这次按下。未按下的键不发送 key_up。
+    - batch() 内的输入先排队，退出时合并相邻的鼠标移动，以一次 emit 发出。
+    - release_all() 只松开确实按下的键，播放中断、出错时调用即可保证不卡键。
+
+    emit(events) 为实际发送输入的后端，events 为 [(类型, 按键/按钮, dx, dy)]，
+    测试中可以用记录调用的假后端代替。
+    """
+
+    MOVE_KEYS = ('w', 'a', 's', 'd')
+
+    def __init__(self, emit, move_keys=MOVE_KEYS):
+        self.emit = emit
+        self.move_keys = frozenset(move_keys)
+        self.keys = set()
+        self.buttons = set()
+        self._queue = None
+        self._lock = threading.RLock()
+
+    def is_down(self, key) -> bool:
+        return key in self.keys
+
+    def key_down(self, key) -> bool:
+        """按下按键，返回是否实际发送；只有已按下的移动键会被跳过。"""
+        with self._lock:
+            if key in self.keys and key in self.move_keys:
+                return False
+            self.keys.add(key)
+            self._send((INPUT_KEY_DOWN, key, 0, 0))
+            return True
+
+    def key_up(self, key) -> bool:
+        """松开按键，返回是否实际发送。"""
+        with self._lock:
+            if key not in self.keys:
+                return False
+            self.keys.discard(key)
+            self._send((INPUT_KEY_UP, key, 0, 0))
+            return True
+
+    def mouse_down(self, button='left') -> bool:
+        with self._lock:
+            if button in self.buttons:
+                return False
+            self.buttons.add(button)
+            self._send((INPUT_MOUSE_DOWN, button, 0, 0))
+            return True
+
+    def mouse_up(self, button='left') -> bool:
+        with self._lock:
+            if button not in self.buttons:
+                return False
+            self.buttons.discard(button)
+            self._send((INPUT_MOUSE_UP, button, 0, 0))
+            return True
+
+    def move(self, dx, dy):
+        if not dx and not dy:
+            return
+        with self._lock:
+            queue = self._queue
+            if queue and queue[-1][0] == INPUT_MOUSE_MOVE:
+                _, _, last_dx, last_dy = queue[-1]
+                queue[-1] = (INPUT_MOUSE_MOVE, None, last_dx + dx, last_dy + dy)
+            else:
+                self._send((INPUT_MOUSE_MOVE, None, dx, dy))
+
+    @contextmanager
+    def batch(self):
+        """收集同一时刻的输入，退出时一次发出；可以嵌套，只有最外层退出时发送。"""
+        with self._lock:
+            outermost = self._queue is None
+            if outermost:
+                self._queue = []
+            try:
+                yield self
+            finally:
+                if outermost:
+                    events, self._queue = self._queue, None
+                    if events:
+                        self.emit(events)
+
+    def release_all(self) -> list:
+        """松开所有按下的按键和鼠标按钮。
+
+        Returns:
+            list: 实际松开的按键和按钮。
+        """
+        with self._lock:
+            released = sorted(self.keys) + sorted(self.buttons)
+            events = [(INPUT_KEY_UP, key, 0, 0) for key in sorted(self.keys)]
+            events += [(INPUT_MOUSE_UP, button, 0, 0) for button in sorted(self.buttons)]
+            self.keys.clear()
+            self.buttons.clear()
+            if events:
+                if self._queue is not None:
+                    self._queue.extend(events)
+                else:
+                    self.emit(events)
+            return released
+
+    def _send(self, event):
+        if self._queue is not None:
+            self._queue.append(event)
+        else:
+            self.emit([event])
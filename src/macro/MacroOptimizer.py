@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+import sys
+
+from src.macro.CompiledMacro import normalize_key
+
+ORIGINAL_SUFFIX = '.orig'
+
+
+class MacroOptimizer:
+    """录制脚本的离线优化。
+
+    - 合并：相邻的 `mouse_move` 在 move_window 秒内合并为一次移动，位移求和，时间取最后一次。
+    - 去重：已按下的键再次 key_down（录制器记录的自动重复）直接丢弃；
+      同一个键松开后 pair_gap 秒内又按下，视为没有松开，两个动作一起丢弃。
+      未按下的键的 key_up 可能是脚本有意的防卡键释放，保留。
+    - 压缩：没有任何按键/鼠标按住时，超过 idle_floor 秒的空闲间隔缩短为 idle_floor，之后的动作整体前移。
+      `delay`、`checkpoint` 标记前后、松开 protected_keys（交互、传送、菜单）之后的间隔是在等待游戏，不压缩。
+    """
+
+    PROTECTED_KEYS = ('f', 'f4', 'esc')
+    MARKER_TYPES = ('delay', 'checkpoint')
+
+    def __init__(self, move_window=0.02, idle_floor=2.0, pair_gap=0.005, protected_keys=PROTECTED_KEYS):
+        self.move_window = move_window
+        self.idle_floor = idle_floor
+        self.pair_gap = pair_gap
+        self.protected_keys = frozenset(protected_keys)
+
+    def optimize(self, script) -> tuple[dict, dict]:
+        """优化脚本，不修改传入的字典。
+
+        Returns:
+            tuple: (优化后的脚本, 统计)。
+        """
+        actions = sorted((dict(action) for action in script.get('actions', [])),
+                         key=lambda action: action.get('time', 0.0))
+        report = {
+            'actions_before': len(actions),
+            'duration_before': _duration(actions),
+        }
+        actions, report['dropped_keys'] = self._drop_redundant_keys(actions)
+        actions, report['merged_moves'] = self._merge_moves(actions)
+        actions, report['compressed_gaps'] = self._compress_idle(actions)
+        report['actions_after'] = len(actions)
+        report['duration_after'] = _duration(actions)
+        report['saved'] = report['duration_before'] - report['duration_after']
+
+        optimized = dict(script)
+        optimized['actions'] = actions
+        if 'action_count' in script:
+            optimized['action_count'] = len(actions)
+        if 'total_time' in script:
+            optimized['total_time'] = round(report['duration_after'], 3)
+        return optimized, report
+
+    def optimize_file(self, path) -> dict:
+        """优化单个脚本文件，原文件保留为 `<文件名>.orig`。
+
+        已经优化过的脚本总是从 `.orig` 重新优化，重复运行或修改参数不会叠加压缩；
+        结果与现有文件相同时不改写，避免预处理缓存失效。
+        """
+        original_path = path + ORIGINAL_SUFFIX
+        source = original_path if os.path.exists(original_path) else path
+        with open(source, 'r', encoding='utf-8') as f:
+            script = json.load(f)
+        optimized, report = self.optimize(script)
+        report['name'] = os.path.splitext(os.path.basename(path))[0]
+        content = json.dumps(optimized, ensure_ascii=False, indent=2)
+        if source == original_path:
+            with open(path, 'r', encoding='utf-8') as f:
+                if f.read() == content:
+                    return report
+        else:
+            shutil.copy2(path, original_path)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return report
+
+    def optimize_folder(self, folder) -> list[dict]:
+        """优化外部逻辑文件夹下 scripts 中的所有脚本。"""
+        scripts_dir = os.path.join(folder, 'scripts')
+        if not os.path.isdir(scripts_dir):
+            scripts_dir = folder
+        reports = []
+        for filename in sorted(os.listdir(scripts_dir)):
+            if filename.lower().endswith('.json'):
+                reports.append(self.optimize_file(os.path.join(scripts_dir, filename)))
+        return reports
+
+    def _drop_redundant_keys(self, actions):
+        held = set()
+        result = []
+        dropped = 0
+        for action in actions:
+            action_type = action.get('type')
+            if action_type not in ('key_down', 'key_up'):
+                result.append(action)
+                continue
+            key = normalize_key(action.get('key'))
+            if action_type == 'key_down':
+                if key in held:
+                    dropped += 1
+                    continue
+                released = _recent_release(result, key, action.get('time', 0.0) - self.pair_gap)
+                if released is not None:
+                    result.remove(released)
+                    held.add(key)
+                    dropped += 2
+                    continue
+                held.add(key)
+            else:
+                held.discard(key)
+            result.append(action)
+        return result, dropped
+
+    def _merge_moves(self, actions):
+        result = []
+        merged = 0
+        group_start = None
+        for action in actions:
+            previous = result[-1] if result else None
+            if (action.get('type') == 'mouse_move' and previous is not None
+                    and previous.get('type') == 'mouse_move'
+                    and action.get('time', 0.0) - group_start <= self.move_window):
+                previous['dx'] = previous.get('dx', 0) + action.get('dx', 0)
+                previous['dy'] = previous.get('dy', 0) + action.get('dy', 0)
+                previous['time'] = action.get('time', 0.0)
+                merged += 1
+                continue
+            if action.get('type') == 'mouse_move':
+                group_start = action.get('time', 0.0)
+            result.append(action)
+        return result, merged
+
+    def _compress_idle(self, actions):
+        held = set()
+        shift = 0.0
+        compressed = 0
+        previous = None
+        for action in actions:
+            action_time = action.get('time', 0.0)
+            if previous is not None:
+                gap = action_time - previous.get('time', 0.0)
+                if gap > self.idle_floor and not held and self._compressible(previous, action):
+                    shift += gap - self.idle_floor
+                    compressed += 1
+            if shift:
+                action['time'] = round(action_time - shift, 6)
+            previous = dict(action, time=action_time)
+
+            action_type = action.get('type')
+            if action_type == 'key_down':
+                held.add(normalize_key(action.get('key')))
+            elif action_type == 'key_up':
+                held.discard(normalize_key(action.get('key')))
+            elif action_type == 'mouse_down':
+                held.add(('mouse', action.get('button', 'left')))
+            elif action_type == 'mouse_up':
+                held.discard(('mouse', action.get('button', 'left')))
+        return actions, compressed
+
+    def _compressible(self, previous, action):
+        if previous.get('type') in self.MARKER_TYPES or action.get('type') in self.MARKER_TYPES:
+            return False
+        if previous.get('type') == 'key_up' and normalize_key(previous.get('key')) in self.protected_keys:
+            return False
+        return True
+
+
+def _recent_release(actions, key, since):
+    """since 之后 key 的最后一个按键动作为松开时返回该动作。"""
+    for action in reversed(actions):
+        if action.get('time', 0.0) < since:
+            return None
+        if action.get('type') in ('key_down', 'key_up') and normalize_key(action.get('key')) == key:
+            return action if action.get('type') == 'key_up' else None
+    return None
+
+
+def _duration(actions):
+    return actions[-1].get('time', 0.0) if actions else 0.0
+
+
+def format_report(report) -> str:
+    return (f"{report.get('name', '')}: {report['actions_before']} -> {report['actions_after']} 个动作, "
+            f"{report['duration_before']:.2f}s -> {report['duration_after']:.2f}s (节省 {report['saved']:.2f}s), "
+            f"合并移动 {report['merged_moves']}, 去除按键 {report['dropped_keys']}, 压缩间隔 {report['compressed_gaps']}")
+
+
+if __name__ == '__main__':
+    # python -m src.macro.MacroOptimizer <外部逻辑文件夹或脚本文件> ...
+    optimizer = MacroOptimizer()
+    total_saved = 0.0
+    for target in sys.argv[1:]:
+        reports = optimizer.optimize_folder(target) if os.path.isdir(target) else [optimizer.optimize_file(target)]
+        for report in reports:
+            total_saved += report['saved']
+            print(format_report(report))
+    print(f'total saved: {total_saved:.2f}s')
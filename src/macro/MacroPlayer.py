@@ -0,0 +1,162 @@
+import threading
+import time
+from contextlib import nullcontext
+
+from src.macro.PrecisionTimer import PrecisionTimer
+
+
+class MacroAborted(Exception):
+    """播放被 abort 打断。"""
+    pass
+
+
+class MacroPlayer:
+    """在独立线程上按时间轴播放宏。
+
+    播放线程只负责按时间发出输入，截图、月卡检查等由调用方线程完成，输入时序不再受截图速度影响：
+    - 中止通过 abort_event 通知，播放线程的等待会立即被唤醒。
+    - is_paused 返回 True 时播放线程暂停，恢复后时间轴整体后移暂停的时长。
+    - main_thread_ops 中的操作（需要截图、等待界面的操作）交给调用方线程在 service 中执行，
+      播放线程等待其完成后继续，时间轴后移其耗时。
+    - 时间相同的连续动作只等待一次，在 batch() 内依次 dispatch，由 batch 合并为一次输入。
+
+    典型用法::
+
+        player.start(macro)
+        try:
+            while not player.wait(0.01):
+                ...  # 截图、检查
+                player.service()
+        finally:
+            player.stop()
+        player.raise_error()
+    """
+
+    PAUSE_POLL_INTERVAL = 0.1
+
+    def __init__(self, dispatch, is_paused=None, main_thread_ops=(), name='macro-player', batch=None):
+        """
+        Args:
+            dispatch: dispatch(op, key, dx, dy) 执行单个动作。
+            is_paused: 无参数函数，返回是否暂停。
+            main_thread_ops: 需要在调用方线程执行的操作码。
+            name: 播放线程名称。
+            batch: 无参数函数，返回包住同一时刻所有动作的上下文管理器。
+        """
+        self.dispatch = dispatch
+        self.batch = batch or nullcontext
+        self.is_paused = is_paused or (lambda: False)
+        self.main_thread_ops = frozenset(main_thread_ops)
+        self.name = name
+        self.abort_event = threading.Event()
+        self.done_event = threading.Event()
+        self.done_event.set()
+        self.timer = PrecisionTimer(sleep=self._sleep)
+        self.error = None
+        self._thread = None
+        self._pending = None
+        self._served = threading.Event()
+
+    def start(self, macro):
+        """启动播放线程，macro 为 (time, op, key, dx, dy) 的序列。"""
+        self.stop()
+        self.abort_event.clear()
+        self.done_event.clear()
+        self.error = None
+        self._pending = None
+        self._thread = threading.Thread(target=self._run, args=(macro,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def abort(self):
+        self.abort_event.set()
+
+    def stop(self):
+        """中止播放并等待播放线程退出。"""
+        self.abort()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def wait(self, timeout=None) -> bool:
+        """等待播放结束，返回是否已结束。"""
+        return self.done_event.wait(timeout)
+
+    @property
+    def running(self) -> bool:
+        return not self.done_event.is_set()
+
+    def service(self):
+        """在调用方线程执行播放线程提交的 main_thread_ops 操作。"""
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        try:
+            self.dispatch(*pending)
+        except BaseException as e:
+            self.error = e
+            self.abort()
+        finally:
+            self._served.set()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def _run(self, macro):
+        try:
+            self.timer.start()
+            for target_time, group in self._groups(macro):
+                self._wait_if_paused()
+                self.timer.wait_until(target_time)
+                if self.abort_event.is_set():
+                    return
+                if group[0][0] in self.main_thread_ops:
+                    # 阻塞操作（等待界面、截图校验）不占用录制的时间，结束后时间轴整体后移，
+                    # 之后的动作保持录制时的间隔，而不是为了追赶进度而缩短等待
+                    blocked_at = time.perf_counter()
+                    self._run_on_main_thread(group[0])
+                    self.timer.origin += time.perf_counter() - blocked_at
+                    continue
+                with self.batch():
+                    for action in group:
+                        self.dispatch(*action)
+        except MacroAborted:
+            pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done_event.set()
+
+    def _groups(self, macro):
+        """把时间相同的连续动作分为一组，main_thread_ops 的动作单独一组。"""
+        group = []
+        group_time = None
+        for target_time, op, key, dx, dy in macro:
+            if group and (target_time != group_time or op in self.main_thread_ops
+                          or group[0][0] in self.main_thread_ops):
+                yield group_time, group
+                group = []
+            group_time = target_time
+            group.append((op, key, dx, dy))
+        if group:
+            yield group_time, group
+
+    def _run_on_main_thread(self, action):
+        self._served.clear()
+        self._pending = action
+        while not self._served.wait(self.PAUSE_POLL_INTERVAL):
+            if self.abort_event.is_set():
+                raise MacroAborted
+
+    def _wait_if_paused(self):
+        if not self.is_paused():
+            return
+        paused_at = time.perf_counter()
+        while self.is_paused():
+            self._sleep(self.PAUSE_POLL_INTERVAL)
+        self.timer.origin += time.perf_counter() - paused_at
+
+    def _sleep(self, seconds):
+        if self.abort_event.wait(seconds):
+            raise MacroAborted
@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+
+from src.macro.CompiledMacro import MacroProgram, compile_script
+from src.macro.MacroOptimizer import MacroOptimizer
+
+KEY_ALIASES = {
+    'shift': 'lshift',
+    'shift_l': 'lshift',
+    'shift_r': 'rshift',
+    'ctrl': 'lcontrol',
+    'ctrl_l': 'lcontrol',
+    'ctrl_r': 'rcontrol',
+    'alt': 'lalt',
+    'alt_l': 'lalt',
+    'alt_r': 'ralt',
+    'alt_gr': 'ralt',
+    'cmd': 'lwin',
+    'cmd_l': 'lwin',
+    'cmd_r': 'rwin',
+}
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def key_name(key):
+    """把 pynput 的按键转换为脚本中的按键名，无法识别时返回 None。
+
+    只依赖 `char`/`name` 属性，测试中可以用任意带这些属性的对象代替 pynput 的按键。
+    """
+    char = getattr(key, 'char', None)
+    if char:
+        return char.lower()
+    name = getattr(key, 'name', None)
+    if name:
+        return KEY_ALIASES.get(name, name)
+    return None
+
+
+class MacroRecorder:
+    """录制键盘、鼠标输入，直接生成 ImportTask 播放用的 MacroProgram。
+
+    on_* 回调在监听线程中调用，事件时间取 `perf_counter_ns` 的整数纳秒，
+    片段内的时间由整数相减后再换算为秒，不会积累浮点误差。
+    split 开始新的片段，每个片段对应外部逻辑中的一个节点（一个脚本和一张地图）。
+
+    鼠标移动量取与上一次位置的差值。anchor 为 (x, y) 时适用于游戏把光标拉回窗口中心的情况：
+    第一次移动以 anchor 为起点，光标跳回 anchor 视为游戏的拉回，只重置位置，不记录为移动。
+    """
+
+    def __init__(self, clock_ns=time.perf_counter_ns, anchor=None, move_window=0.01):
+        self.clock_ns = clock_ns
+        self.anchor = anchor
+        self.optimizer = MacroOptimizer(move_window=move_window, idle_floor=math.inf)
+        self.recording = False
+        self.events = []
+        self.segments = []
+        self.unknown_keys = 0
+        self._last_position = None
+        self._lock = threading.Lock()
+
+    def start(self, name):
+        """清空之前的录制并开始第一个片段。"""
+        with self._lock:
+            self.events = []
+            self.segments = [(self.clock_ns(), name)]
+            self.unknown_keys = 0
+            self._last_position = None
+            self.recording = True
+
+    def split(self, name):
+        """在当前时间开始新的片段。"""
+        with self._lock:
+            if self.recording:
+                self.segments.append((self.clock_ns(), name))
+
+    def stop(self):
+        with self._lock:
+            self.recording = False
+
+    def on_press(self, key):
+        self._record_key('key_down', key)
+
+    def on_release(self, key):
+        self._record_key('key_up', key)
+
+    def on_click(self, x, y, button, pressed):
+        name = getattr(button, 'name', str(button))
+        self._record(('mouse_down' if pressed else 'mouse_up', name))
+
+    def on_move(self, x, y):
+        t_ns = self.clock_ns()
+        with self._lock:
+            if not self.recording:
+                return
+            origin = self._last_position
+            self._last_position = (x, y)
+            if self.anchor is not None:
+                if (x, y) == self.anchor:
+                    # 游戏把光标拉回锚点，不是玩家的移动，只重置位置
+                    return
+                if origin is None:
+                    origin = self.anchor
+            elif origin is None:
+                return
+            dx, dy = x - origin[0], y - origin[1]
+            if dx or dy:
+                self.events.append((t_ns, 'mouse_move', dx, dy))
+
+    def _record_key(self, event_type, key):
+        name = key_name(key)
+        if name is None:
+            with self._lock:
+                self.unknown_keys += 1
+            return
+        self._record((event_type, name))
+
+    def _record(self, event):
+        t_ns = self.clock_ns()
+        with self._lock:
+            if self.recording:
+                self.events.append((t_ns,) + event)
+
+    def build(self) -> list[tuple[str, MacroProgram]]:
+        """把录制结果按片段编译。
+
+        合并同一时间窗口内的鼠标移动并去掉系统自动重复的按键，不压缩空闲时间。
+
+        Returns:
+            list: [(片段名称, MacroProgram)]。
+        """
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event[0])
+            segments = list(self.segments)
+
+        result = []
+        for index, (start_ns, name) in enumerate(segments):
+            end_ns = segments[index + 1][0] if index + 1 < len(segments) else None
+            actions = [_to_action(event, start_ns) for event in events
+                       if event[0] >= start_ns and (end_ns is None or event[0] < end_ns)]
+            script, _ = self.optimizer.optimize({'actions': actions})
+            result.append((name, compile_script(script)))
+        return result
+
+
+def _to_action(event, start_ns):
+    t_ns, event_type = event[0], event[1]
+    # 保留到微秒，录制器本身的时间精度远高于输入发送的精度
+    action = {'type': event_type, 'time': round((t_ns - start_ns) / NS_PER_SECOND, 6)}
+    if event_type == 'mouse_move':
+        action['dx'], action['dy'] = event[2], event[3]
+    elif event_type in ('mouse_down', 'mouse_up'):
+        action['button'] = event[2]
+    else:
+        action['key'] = event[2]
+    return action
@@ -0,0 +1,98 @@
+import time
+
+
+class PrecisionTimer:
+    """宏播放用的高精度定时器。
+
+    等待分三段：
+    - 粗等待：调用 sleep 睡到目标时间前 spin_budget 秒。
+    - 让出：剩余时间大于 spin_threshold 时反复 yield（`time.sleep(0)`），释放 GIL 给截图/识别线程。
+    - 自旋：最后不足 spin_threshold 的时间忙等。
+    spin_budget 根据每次粗等待实测的超时量学习（均值 + 4 倍平均偏差），
+    计时器精度高的系统上会自动缩小，不再固定预留 20ms 忙等。
+    第一次 start 时先用几次短睡眠校准，动作间隔短于预算时也能得到合适的初始值。
+
+    sleep、yield_func 和 clock 均可替换，便于在测试中注入假的时钟。
+    """
+
+    INITIAL_SPIN_BUDGET = 0.02
+    MIN_SPIN_BUDGET = 0.0005
+    MAX_SPIN_BUDGET = 0.03
+    SPIN_THRESHOLD = 0.0005
+    LEARNING_RATE = 0.1
+    CALIBRATION_SAMPLES = 5
+    CALIBRATION_SLEEP = 0.001
+
+    def __init__(self, sleep=time.sleep, clock=time.perf_counter, yield_func=None):
+        self.sleep = sleep
+        self.clock = clock
+        self.yield_func = yield_func or (lambda: time.sleep(0))
+        self.spin_budget = self.INITIAL_SPIN_BUDGET
+        self.overshoot_mean = None
+        self.overshoot_deviation = 0.0
+        self.origin = clock()
+        self.lateness = []
+
+    def calibrate(self):
+        """测量短睡眠的超时量，作为 spin_budget 的初始值。"""
+        for _ in range(self.CALIBRATION_SAMPLES):
+            before = self.clock()
+            self.sleep(self.CALIBRATION_SLEEP)
+            self._learn(self.clock() - before - self.CALIBRATION_SLEEP)
+
+    def start(self):
+        """以当前时间为 0 点开始新的一段时间轴，并清空延迟统计。"""
+        if self.overshoot_mean is None:
+            self.calibrate()
+        self.origin = self.clock()
+        self.lateness = []
+
+    def wait_until(self, offset) -> float:
+        """等待到 origin + offset。
+
+        Returns:
+            float: 实际到达时间比目标晚的秒数，目标已过时为正数。
+        """
+        target = self.origin + offset
+        remaining = target - self.clock()
+        if remaining > self.spin_budget:
+            request = remaining - self.spin_budget
+            before = self.clock()
+            self.sleep(request)
+            self._learn(self.clock() - before - request)
+        while target - self.clock() > self.SPIN_THRESHOLD:
+            self.yield_func()
+        while self.clock() < target:
+            pass
+        lateness = self.clock() - target
+        self.lateness.append(lateness)
+        return lateness
+
+    def _learn(self, overshoot):
+        if self.overshoot_mean is None:
+            self.overshoot_mean = overshoot
+        else:
+            error = overshoot - self.overshoot_mean
+            self.overshoot_mean += self.LEARNING_RATE * error
+            self.overshoot_deviation += self.LEARNING_RATE * (abs(error) - self.overshoot_deviation)
+        budget = self.overshoot_mean + 4 * self.overshoot_deviation
+        self.spin_budget = min(max(budget, self.MIN_SPIN_BUDGET), self.MAX_SPIN_BUDGET)
+
+    def stats(self) -> dict:
+        """本段时间轴上每个动作的延迟统计，单位毫秒。"""
+        if not self.lateness:
+            return {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "spin_budget_ms": self.spin_budget * 1000}
+        ordered = sorted(self.lateness)
+        return {
+            "count": len(ordered),
+            "p50_ms": percentile(ordered, 0.5) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "spin_budget_ms": self.spin_budget * 1000,
+        }
+
+
+def percentile(ordered, q):
+    """已排序序列的分位数（最近秩）。"""
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,142 @@
+import json
+
+from src.macro.Checkpoint import Checkpoint
+from src.macro.CompiledMacro import MacroProgram, compile_script
+
+
+class Segment:
+    """时间轴中的一个片段，片段内的动作由播放线程按时间连续发出，不做任何等待。
+
+    需要截图、等待界面的逻辑只能放在片段边界，以钩子名称引用，由 run_timeline 在调用方线程执行：
+    - when: 片段的执行条件，返回假值时跳过该片段。
+    - before: 片段开始前执行，返回 False 时中止整条时间轴。
+    - wait: 片段结束后执行，返回 False 时中止整条时间轴。
+    checkpoint 不为 None 时，在 before 之后、播放之前测量 track_point 的位置，记录偏离录制位置的片段。
+    """
+
+    __slots__ = ('name', 'program', 'before', 'when', 'wait', 'checkpoint')
+
+    def __init__(self, name, program: MacroProgram, before=None, when=None, wait=None,
+                 checkpoint: Checkpoint = None):
+        self.name = name
+        self.program = program
+        self.before = before
+        self.when = when
+        self.wait = wait
+        self.checkpoint = checkpoint
+
+    def hooks(self):
+        return [hook for hook in (self.when, self.before, self.wait) if hook is not None]
+
+
+class Timeline:
+    """由若干片段组成的移动路线，加载时一次性编译，播放时不再解析 JSON。"""
+
+    def __init__(self, name, segments, description=''):
+        self.name = name
+        self.segments = list(segments)
+        self.description = description
+
+    def __len__(self):
+        return len(self.segments)
+
+    @property
+    def duration(self) -> float:
+        """所有片段的动作时长之和，不含钩子耗时。"""
+        return sum(segment.program.duration for segment in self.segments)
+
+    def hooks(self) -> set:
+        return {hook for segment in self.segments for hook in segment.hooks()}
+
+    @classmethod
+    def from_dict(cls, name, data) -> 'Timeline':
+        """从时间轴格式的路线创建，片段内动作的 time 为距片段开始的秒数。"""
+        segments = []
+        for index, segment in enumerate(data.get('segments', [])):
+            program = compile_route(segment.get('actions', []))
+            segments.append(Segment(segment.get('name', str(index)), program, before=segment.get('before'),
+                                    when=segment.get('when'), wait=segment.get('wait'),
+                                    checkpoint=Checkpoint.from_dict(segment.get('checkpoint'))))
+        return cls(name, segments, data.get('description', ''))
+
+    @classmethod
+    def from_relative(cls, name, actions, split_key='f', split_wait='puzzle', checkpoint=None) -> 'Timeline':
+        """从相对时间格式（每个动作带 delay）的路径创建。
+
+        在每次松开 split_key 后切分片段，包含 split_key 的片段结束后执行 split_wait 钩子；
+        钩子等待期间已经消耗了时间，紧随其后的片段忽略首个动作的 delay。
+        checkpoint 为第一个片段的测量点配置。
+        """
+        groups = []
+        current = []
+        for action in actions:
+            current.append(action)
+            if action.get('type') == 'key_up' and action.get('key') == split_key:
+                groups.append(current)
+                current = []
+        if current:
+            groups.append(current)
+
+        segments = []
+        after_wait = False
+        for index, group in enumerate(groups):
+            offset = 0.0
+            timed = []
+            for i, action in enumerate(group):
+                if not (i == 0 and after_wait):
+                    offset += action.get('delay', 0)
+                timed_action = dict(action)
+                timed_action['time'] = offset
+                timed.append(timed_action)
+            has_split_key = any(action.get('type') in ('key_down', 'key_up') and action.get('key') == split_key
+                                for action in group)
+            segments.append(Segment(str(index), compile_route(timed), wait=split_wait if has_split_key else None,
+                                    checkpoint=Checkpoint.from_dict(checkpoint) if index == 0 else None))
+            after_wait = has_split_key
+        return cls(name, segments)
+
+
+def compile_route(actions) -> MacroProgram:
+    """编译内置路线的动作，按键原样发送（包括 alt 和 f），不做交互/快速破解的判断。"""
+    return compile_script({"actions": actions}, drop_alt=False, dynamic_f=False)
+
+
+def load_timelines(path) -> dict:
+    """加载时间轴格式的路线文件。
+
+    Returns:
+        dict: {路线名称: Timeline}。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {name: Timeline.from_dict(name, route) for name, route in data.get('routes', {}).items()}
+
+
+def run_timeline(timeline: Timeline, play, hooks, measure=None) -> bool:
+    """按顺序播放时间轴的各个片段。
+
+    Args:
+        timeline: 要播放的时间轴。
+        play: play(segment) 播放单个片段，返回 False 表示播放被打断。
+        hooks: {钩子名称: 无参数函数}，在调用方线程执行。
+        measure: measure(segment) 在带 checkpoint 的片段播放前测量偏差，None 时忽略测量点。
+
+    Returns:
+        bool: 全部片段执行完成返回 True，被钩子或播放中止返回 False。
+    """
+    missing = timeline.hooks() - set(hooks)
+    if missing:
+        raise ValueError(f"时间轴 {timeline.name} 缺少钩子: {sorted(missing)}")
+
+    for segment in timeline.segments:
+        if segment.when is not None and not hooks[segment.when]():
+            continue
+        if segment.before is not None and hooks[segment.before]() is False:
+            return False
+        if segment.checkpoint is not None and measure is not None:
+            measure(segment)
+        if play(segment) is False:
+            return False
+        if segment.wait is not None and hooks[segment.wait]() is False:
+            return False
+    return True
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+
+
+class DescriptorIndex:
+    """根节点的粗筛索引。
+
+    加载时为每个地图模板保存一张按 scale 缩小的灰度缩略图（几 KB），匹配根节点前先把截图缩小到同样的比例，
+    在缩略图上做归一化相关，只对得分最高的 top_k 个模板做原分辨率匹配。缩小后的匹配代价约为原来的 scale⁴，
+    根节点再多也只有缩略图部分随数量增长。粗筛是近似的：候选中没有达到接受阈值的结果时，
+    调用方再匹配缩略图得分其次的 top_k 个根节点（见 rank 和 ImportTask.match_map），回退的代价也有上限。
+
+    面积小于截图 min_area_ratio 的模板缩小后细节不足以区分，总是保留为候选，不参与粗筛。
+    """
+
+    MIN_THUMBNAIL_SIZE = 8
+
+    def __init__(self, scale=1 / 16, top_k=3, min_area_ratio=0.05):
+        self.scale = scale
+        self.top_k = top_k
+        self.min_area_ratio = min_area_ratio
+        self._thumbnails = {}
+        self._shapes = {}
+        self._small_screen = None
+        self.queries = 0
+        self.skipped = 0
+        # 粗筛候选都没有达到接受阈值、回退到匹配得分其次的根节点的次数
+        self.fallbacks = 0
+
+    def __len__(self):
+        return len(self._thumbnails)
+
+    def __contains__(self, name):
+        return name in self._thumbnails
+
+    def add(self, name, template):
+        """记录模板的缩略图，模板过小时只记录尺寸。"""
+        self._shapes[name] = template.shape[:2]
+        height, width = template.shape[:2]
+        size = (round(width * self.scale), round(height * self.scale))
+        if min(size) < self.MIN_THUMBNAIL_SIZE:
+            self._thumbnails.pop(name, None)
+            return
+        self._thumbnails[name] = cv2.resize(np.asarray(template), size, interpolation=cv2.INTER_AREA)
+
+    def build(self, templates, names):
+        """为 names 中的模板建立缩略图，templates 为 {名称: 模板}，可以是按需加载的映射。"""
+        for name in names:
+            template = templates.get(name)
+            if template is not None:
+                self.add(name, template)
+
+    def shortlist(self, screen, names) -> list[str]:
+        """从 names 中选出需要精确匹配的模板，保持 names 中的顺序。
+
+        Args:
+            screen: 灰度截图。
+            names: 候选模板名称。
+
+        Returns:
+            list: 过小或没有缩略图的模板，加上缩略图得分最高的 top_k 个模板。
+        """
+        return self.rank(screen, names)[0]
+
+    def rank(self, screen, names) -> tuple[list[str], list[str]]:
+        """把 names 分为需要精确匹配的模板和其余模板。
+
+        Returns:
+            tuple: (shortlist 的结果, 其余模板按缩略图得分从高到低排列)。
+        """
+        screen_area = screen.shape[0] * screen.shape[1]
+        scored = []
+        kept = set()
+        for name in names:
+            thumbnail = self._thumbnails.get(name)
+            height, width = self._shapes.get(name, (0, 0))
+            if thumbnail is None or height * width < self.min_area_ratio * screen_area:
+                kept.add(name)
+            else:
+                scored.append(name)
+        if len(scored) <= self.top_k:
+            return list(names), []
+
+        self.queries += 1
+        small_screen = self._downscale_screen(screen)
+        scores = [(self.score(small_screen, name), name) for name in scored]
+        scores.sort(reverse=True)
+        kept.update(name for _, name in scores[:self.top_k])
+        self.skipped += len(scored) - self.top_k
+        return [name for name in names if name in kept], [name for _, name in scores[self.top_k:]]
+
+    def score(self, small_screen, name) -> float:
+        thumbnail = self._thumbnails[name]
+        if thumbnail.shape[0] > small_screen.shape[0] or thumbnail.shape[1] > small_screen.shape[1]:
+            return 0.0
+        result = cv2.matchTemplate(small_screen, thumbnail, cv2.TM_CCOEFF_NORMED)
+        return float(result.max())
+
+    def _downscale_screen(self, screen):
+        # (截图, 缩小截图) 作为整体缓存，后台匹配线程同时替换缓存时不会拿到别的截图
+        cached = self._small_screen
+        if cached is None or cached[0] is not screen:
+            cached = (screen, cv2.resize(screen, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA))
+            self._small_screen = cached
+        return cached[1]
@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+
+class FftScreen:
+    """一帧截图的频谱和归一化所需的数据，创建后只会追加窗口统计的缓存，可以在多个线程间共享。"""
+
+    __slots__ = ('screen', 'spectrum', 'screen_float', 'dft_size', 'window_std')
+
+    def __init__(self, screen):
+        height, width = screen.shape[:2]
+        self.dft_size = (cv2.getOptimalDFTSize(height), cv2.getOptimalDFTSize(width))
+        self.screen_float = screen.astype(np.float32)
+        padded = cv2.copyMakeBorder(self.screen_float, 0, self.dft_size[0] - height, 0, self.dft_size[1] - width,
+                                    cv2.BORDER_CONSTANT, value=0)
+        self.spectrum = cv2.dft(padded)
+        self.window_std = {}
+        self.screen = screen
+
+
+class FftCorrelator:
+    """频域模板匹配后端，结果与 `cv2.TM_CCOEFF_NORMED` 一致（纯色模板直接返回 0 分）。
+
+    大模板在空间域做相关的代价与 模板面积 × 搜索位置数 成正比，频域只需一次逐元素相乘和一次逆变换。
+    - 截图的频谱每帧只计算一次，所有候选模板共用。
+    - 模板减去均值后的频谱按 (名称, DFT 尺寸) 缓存，DFT 尺寸由截图分辨率决定，分辨率不变时只计算一次。
+    - 归一化所需的窗口均值/方差用盒式滤波计算，按模板尺寸每帧缓存。
+
+    每帧的数据保存在 FftScreen 中，作为一个整体替换，不同线程同时匹配不同的截图时不会互相覆盖。
+    """
+
+    EPSILON = 1e-6
+    # float32 盒式滤波下 E[x²] - E[x]² 的误差约为 1e-2，低于此方差的窗口视为纯色
+    FLAT_VARIANCE = 0.1
+
+    def __init__(self):
+        self._templates = {}
+        self._prepared = None
+
+    def prepare(self, screen: np.ndarray) -> FftScreen:
+        """计算截图的频谱，同一帧只计算一次。"""
+        prepared = self._prepared
+        if prepared is None or prepared.screen is not screen:
+            prepared = FftScreen(screen)
+            self._prepared = prepared
+        return prepared
+
+    def match(self, screen: np.ndarray, name: str, template: np.ndarray,
+              prepared: FftScreen = None) -> tuple[float, tuple[int, int]]:
+        """在灰度截图中匹配模板。
+
+        Args:
+            prepared: prepare(screen) 的结果，并行匹配时由调用方计算一次后传入。
+
+        Returns:
+            tuple: (置信度, 左上角坐标)。
+        """
+        if prepared is None or prepared.screen is not screen:
+            prepared = self.prepare(screen)
+        template_spectrum, template_norm = self._template_spectrum(name, template, prepared.dft_size)
+        height, width = screen.shape[:2]
+        template_height, template_width = template.shape[:2]
+        if template_norm < self.EPSILON:
+            return 0.0, (0, 0)
+
+        # 循环相关在 DFT 尺寸不小于截图时，模板完整落在截图内的位置不会发生回绕
+        correlation = cv2.idft(cv2.mulSpectrums(prepared.spectrum, template_spectrum, 0, conjB=True),
+                               flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+        correlation = correlation[:height - template_height + 1, :width - template_width + 1]
+        denominator = self._window_deviation(prepared, template_height, template_width) * np.float32(template_norm)
+        result = cv2.divide(correlation, denominator)
+        _, confidence, _, loc = cv2.minMaxLoc(result)
+        return confidence, loc
+
+    def _template_spectrum(self, name, template, dft_size):
+        key = (name, dft_size, template.shape[:2])
+        cached = self._templates.get(key)
+        if cached is None:
+            zero_mean = template.astype(np.float32)
+            zero_mean -= zero_mean.mean()
+            norm = float(np.sqrt(np.square(zero_mean, dtype=np.float64).sum()))
+            template_height, template_width = template.shape[:2]
+            padded = cv2.copyMakeBorder(zero_mean, 0, dft_size[0] - template_height,
+                                        0, dft_size[1] - template_width, cv2.BORDER_CONSTANT, value=0)
+            cached = (cv2.dft(padded), norm)
+            self._templates[key] = cached
+        return cached
+
+    def _window_deviation(self, prepared, template_height, template_width):
+        """每个搜索位置上，截图窗口的 sqrt(面积 × 方差)。"""
+        key = (template_height, template_width)
+        deviation = prepared.window_std.get(key)
+        if deviation is None:
+            screen_float = prepared.screen_float
+            height, width = screen_float.shape[:2]
+            size = (template_width, template_height)
+            mean = cv2.boxFilter(screen_float, cv2.CV_32F, size, anchor=(0, 0),
+                                 normalize=True, borderType=cv2.BORDER_CONSTANT)
+            square_mean = cv2.sqrBoxFilter(screen_float, cv2.CV_32F, size, anchor=(0, 0),
+                                           normalize=True, borderType=cv2.BORDER_CONSTANT)
+            valid = (slice(0, height - template_height + 1), slice(0, width - template_width + 1))
+            mean, square_mean = mean[valid], square_mean[valid]
+            variance = square_mean - mean * mean
+            # 纯色窗口的相关值只剩浮点误差，与 matchTemplate 一样视为 0 分
+            variance[variance < self.FLAT_VARIANCE] = np.inf
+            deviation = np.sqrt(variance) * np.float32(np.sqrt(template_height * template_width))
+            prepared.window_std[key] = deviation
+        return deviation
+
+    def forget(self, name):
+        """丢弃模板 name 的频谱缓存。"""
+        for key in list(self._templates):
+            if key[0] == name:
+                self._templates.pop(key, None)
+
+    def clear(self):
+        self._templates.clear()
+        self._prepared = None
@@ -0,0 +1,99 @@
+import threading
+
+
+class MapWatcher:
+    """在后台线程中匹配延迟节点的子节点，主循环只需要检查 found。
+
+    watch(index) 开始（或切换到）监视节点 index，后台线程每隔 interval 秒取一次最新的画面调用
+    match(index, frame)，返回非 None 时记录结果并设置 found，之后停止匹配直到再次 watch。
+    同一帧不会重复匹配；is_paused 返回 True 时暂停匹配。
+
+    典型用法::
+
+        watcher.watch(delay_index)
+        ...
+        if watcher.found.is_set():
+            matched = watcher.take()
+    """
+
+    def __init__(self, match, frame_source, interval=0.5, is_paused=None, name='map-watcher'):
+        """
+        Args:
+            match: match(index, frame) 返回匹配结果（如节点名称和置信度）或 None，在后台线程调用。
+            frame_source: 无参数函数，返回最新的画面。
+            interval: 两次匹配的最小间隔（秒）。
+            is_paused: 无参数函数，返回是否暂停。
+            name: 后台线程名称。
+        """
+        self.match = match
+        self.frame_source = frame_source
+        self.interval = interval
+        self.is_paused = is_paused or (lambda: False)
+        self.name = name
+        self.found = threading.Event()
+        self.index = None
+        self.result = None
+        self.error = None
+        self.matches = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def watching(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def watch(self, index):
+        """监视 index 的子节点，已经在监视同一个节点时不做任何事。"""
+        if index == self.index and (self.watching or self.found.is_set()):
+            return
+        self.stop()
+        self.index = index
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(index,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监视并清除结果。"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self.index = None
+        self.result = None
+        self.found.clear()
+
+    def take(self):
+        """取出匹配结果并停止监视，后台线程出错时在调用方线程重新抛出。
+
+        Returns:
+            object | None: 匹配函数返回的结果，尚未匹配到时为 None。
+        """
+        if self.error is not None:
+            error, self.error = self.error, None
+            self.stop()
+            raise error
+        if not self.found.is_set():
+            return None
+        result = self.result
+        self.stop()
+        return result
+
+    def _run(self, index):
+        last_frame = None
+        try:
+            while not self._stop_event.wait(self.interval):
+                if self.is_paused():
+                    continue
+                frame = self.frame_source()
+                if frame is None or frame is last_frame:
+                    continue
+                last_frame = frame
+                self.matches += 1
+                result = self.match(index, frame)
+                if result is not None and not self._stop_event.is_set():
+                    self.result = result
+                    self.found.set()
+                    return
+        except BaseException as e:
+            self.error = e
+            self.found.set()
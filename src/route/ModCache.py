@@ -0,0 +1,189 @@
+import json
+import os
+
+import numpy as np
+
+from src.route.ScaleCalibrator import rescale
+
+CACHE_DIR = '.cache'
+INDEX_FILE = 'index.json'
+SCRIPTS_FILE = 'scripts.json'
+VERSION = 2
+
+
+class ModCache:
+    """外部逻辑文件夹的预处理缓存。
+
+    缓存放在 `mod/<名称>/.cache/` 下：
+    - 地图模板解码并转为灰度后各存为一个 `.npy`，加载时以只读内存映射打开，不再解码 PNG。
+    - 脚本 JSON 解析结果合并存为一个 `scripts.json`，启动时只需读取一个文件。
+      mod 文件夹会在用户之间分享，缓存中不使用 pickle 等可执行任意代码的格式，`.npy` 也不允许 pickle。
+    - 按比例缩放后的模板（适配与录制时不同的分辨率）存在 `x<比例>/` 子目录中，与原始模板分别记录。
+    - `index.json` 记录每个源文件的 mtime/size，只有变化、新增的文件会重新处理，删除的文件同步移出缓存。
+    缓存损坏或版本不一致时整体重建。
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.cache_dir = os.path.join(folder, CACHE_DIR)
+        self.index = {'version': VERSION, 'maps': {}, 'scripts': {}}
+        self.rebuilt = []
+        self._load_index()
+
+    def load_maps(self, loader, directory='map', suffix='.png') -> dict:
+        """加载地图模板。
+
+        Args:
+            loader: 缓存失效时调用 loader(file_path)，返回灰度 ndarray，失败时返回 None。
+
+        Returns:
+            dict: {模板名称: ndarray}，未变化的模板为只读内存映射。
+        """
+        result = {}
+        for name, source in self.map_sources(loader, directory, suffix).items():
+            template = source()
+            if template is not None:
+                result[name] = template
+        return result
+
+    def map_sources(self, loader, directory='map', suffix='.png', scale=1.0) -> dict:
+        """检查并重建地图模板的缓存，但不把模板留在内存中，供按需加载使用。
+
+        Args:
+            scale: 模板的缩放比例，不为 1 时缓存缩放后的模板。
+
+        Returns:
+            dict: {模板名称: 无参数加载函数}，缓存有效时以只读内存映射打开 `.npy`，否则调用 loader。
+        """
+        if scale != 1.0:
+            original_loader = loader
+            loader = lambda file_path: rescale(original_loader(file_path), scale)
+        entries = self.index.setdefault(_maps_section(scale), {})
+        cache_dir = _scaled_dir(self.cache_dir, scale)
+        result = {}
+        files = self._list(directory, suffix)
+        for name, file_path, signature in files:
+            entry = entries.get(name)
+            npy_path = os.path.join(cache_dir, f'{name}.npy')
+            if entry is not None and entry['signature'] == signature and os.path.exists(npy_path):
+                result[name] = _npy_source(npy_path, loader, file_path)
+                continue
+            template = loader(file_path)
+            if template is None:
+                continue
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(npy_path, np.ascontiguousarray(template))
+            except OSError:
+                # 旧的内存映射仍被占用时（Windows）本次不写缓存，下次启动再重建
+                entries.pop(name, None)
+                result[name] = _file_source(loader, file_path)
+                continue
+            entries[name] = {'signature': signature}
+            result[name] = _npy_source(npy_path, loader, file_path)
+            self.rebuilt.append(file_path)
+        self._drop_missing(entries, {name for name, _, _ in files}, '.npy', cache_dir)
+        self._save_index()
+        return result
+
+    def load_scripts(self, loader, directory='scripts', suffix='.json') -> dict:
+        """加载脚本，loader(file_path) 返回解析后的脚本，失败时返回 None。"""
+        entries = self.index['scripts']
+        cached = self._load_scripts_cache()
+        result = {}
+        changed = False
+        files = self._list(directory, suffix)
+        for name, file_path, signature in files:
+            entry = entries.get(name)
+            if entry is not None and entry['signature'] == signature and name in cached:
+                result[name] = cached[name]
+                continue
+            data = loader(file_path)
+            if data is None:
+                continue
+            entries[name] = {'signature': signature}
+            result[name] = data
+            changed = True
+            self.rebuilt.append(file_path)
+        names = {name for name, _, _ in files}
+        if self._drop_missing(entries, names) or changed or set(cached) != set(result):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _atomic_write(os.path.join(self.cache_dir, SCRIPTS_FILE),
+                          lambda f: json.dump(result, f, ensure_ascii=False, separators=(',', ':')))
+        self._save_index()
+        return result
+
+    def _list(self, directory, suffix):
+        path = os.path.join(self.folder, directory)
+        if not os.path.isdir(path):
+            return []
+        files = []
+        for filename in os.listdir(path):
+            if not filename.lower().endswith(suffix):
+                continue
+            file_path = os.path.join(path, filename)
+            stat = os.stat(file_path)
+            files.append((filename[:-len(suffix)], file_path, [stat.st_mtime_ns, stat.st_size]))
+        return files
+
+    def _drop_missing(self, entries, names, cache_suffix=None, cache_dir=None) -> bool:
+        missing = [name for name in entries if name not in names]
+        for name in missing:
+            del entries[name]
+            if cache_suffix is not None:
+                try:
+                    os.remove(os.path.join(cache_dir or self.cache_dir, f'{name}{cache_suffix}'))
+                except OSError:
+                    pass
+        return bool(missing)
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get('version') == VERSION:
+            self.index = index
+
+    def _save_index(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        _atomic_write(os.path.join(self.cache_dir, INDEX_FILE),
+                      lambda f: json.dump(self.index, f, ensure_ascii=False))
+
+    def _load_scripts_cache(self):
+        try:
+            with open(os.path.join(self.cache_dir, SCRIPTS_FILE), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return cached if isinstance(cached, dict) else {}
+
+
+def _maps_section(scale):
+    return 'maps' if scale == 1.0 else f'maps@{scale:.4f}'
+
+
+def _scaled_dir(cache_dir, scale):
+    return cache_dir if scale == 1.0 else os.path.join(cache_dir, f'x{scale:.4f}')
+
+
+def _npy_source(npy_path, loader, file_path):
+    def load():
+        try:
+            return np.load(npy_path, mmap_mode='r', allow_pickle=False)
+        except (OSError, ValueError):
+            return loader(file_path)
+    return load
+
+
+def _file_source(loader, file_path):
+    return lambda: loader(file_path)
+
+
+def _atomic_write(path, writer):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        writer(f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,158 @@
+import io
+import json
+import os
+import struct
+import sys
+import zipfile
+
+import cv2
+import numpy as np
+
+from src.macro.CompiledMacro import MacroProgram, compile_script
+from src.route.ScaleCalibrator import recorded_height, rescale
+
+PACKAGE_SUFFIX = '.okmod'
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+
+
+class ModPackage:
+    """单文件的外部逻辑包 `<名称>.okmod`。
+
+    包是一个 zip 文件，地图和脚本均以 ZIP_STORED（不压缩）保存，`manifest.json` 记录：
+    - resolution: 录制分辨率（高度）。节点树由 ImportTask 按模板和脚本名称建立，与文件夹形式的外部逻辑一致。
+    - maps: 每个地图模板（已转为灰度的原始像素）在包文件中的偏移、形状和类型，直接以内存映射读取。
+    - scripts: 每个编译后脚本（MacroProgram 的 `.npz`）在包文件中的偏移和大小。
+    打开时只读取 zip 目录和 manifest，模板和脚本在用到时才按偏移读取。
+    偏移或形状与包文件不符的模板视为不存在（加载函数返回 None），原因记录在 errors 中。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as package:
+            self.manifest = json.loads(package.read(MANIFEST).decode('utf-8'))
+        self.errors = {}
+        if self.manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"不支持的外部逻辑包版本: {self.manifest.get('version')}")
+
+    @property
+    def name(self) -> str:
+        return self.manifest.get('name', '')
+
+    @property
+    def resolution(self) -> int | None:
+        return self.manifest.get('resolution')
+
+    @property
+    def scripts(self) -> list[str]:
+        return list(self.manifest.get('scripts', {}))
+
+    def map_sources(self, scale=1.0) -> dict:
+        """{模板名称: 无参数加载函数}，加载函数返回只读内存映射，scale 不为 1 时返回缩放后的副本。"""
+        return {name: self._map_source(name, entry, scale) for name, entry in self.manifest.get('maps', {}).items()}
+
+    def load_program(self, name) -> MacroProgram:
+        """按偏移读取一个编译后的脚本，第一次播放该节点时才调用。"""
+        entry = self.manifest['scripts'][name]
+        with open(self.path, 'rb') as f:
+            f.seek(entry['offset'])
+            return MacroProgram.load(io.BytesIO(f.read(entry['size'])))
+
+    def _map_source(self, name, entry, scale):
+        def load():
+            try:
+                template = np.memmap(self.path, dtype=np.dtype(entry['dtype']), mode='r', offset=entry['offset'],
+                                     shape=tuple(entry['shape']))
+            except (ValueError, TypeError, KeyError, OverflowError, OSError) as e:
+                self.errors[name] = str(e)
+                return None
+            return rescale(template, scale)
+        return load
+
+
+def is_package(path) -> bool:
+    return path.lower().endswith(PACKAGE_SUFFIX)
+
+
+def load_map_file(file_path):
+    """与 ImportTask 加载地图相同，解码 PNG 并转为灰度。"""
+    image = cv2.imdecode(np.fromfile(file_path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"无法解码: {file_path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def pack(folder, output=None) -> str:
+    """把外部逻辑文件夹（map/*.png、scripts/*.json 或 *.npz）打包为 `.okmod`。
+
+    Returns:
+        str: 输出文件路径。
+    """
+    folder = os.path.normpath(folder)
+    output = output or folder + PACKAGE_SUFFIX
+    maps = _list_files(os.path.join(folder, 'map'), '.png')
+    scripts = _list_files(os.path.join(folder, 'scripts'), '.json')
+    for name, file_path in _list_files(os.path.join(folder, 'scripts'), '.npz').items():
+        scripts.setdefault(name, file_path)
+
+    manifest = {
+        'format': 'okmod',
+        'version': FORMAT_VERSION,
+        'name': os.path.basename(folder),
+        'resolution': recorded_height(os.path.basename(folder)),
+        'maps': {},
+        'scripts': {},
+    }
+    members = {}
+    tmp_path = output + '.tmp'
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as package:
+        for name, file_path in maps.items():
+            template = np.ascontiguousarray(load_map_file(file_path))
+            member = f'map/{name}.u8'
+            package.writestr(member, template.tobytes())
+            members[member] = ('maps', name)
+            manifest['maps'][name] = {'shape': list(template.shape), 'dtype': template.dtype.str}
+        for name, file_path in scripts.items():
+            buffer = io.BytesIO()
+            if file_path.endswith('.npz'):
+                MacroProgram.load(file_path).save(buffer)
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    compile_script(json.load(f)).save(buffer)
+            member = f'scripts/{name}.npz'
+            package.writestr(member, buffer.getvalue())
+            members[member] = ('scripts', name)
+            manifest['scripts'][name] = {'size': len(buffer.getvalue())}
+
+    with zipfile.ZipFile(tmp_path) as package, open(tmp_path, 'rb') as f:
+        for info in package.infolist():
+            section, name = members[info.filename]
+            manifest[section][name]['offset'] = _data_offset(f, info)
+
+    with zipfile.ZipFile(tmp_path, 'a', zipfile.ZIP_DEFLATED) as package:
+        package.writestr(MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=1))
+    os.replace(tmp_path, output)
+    return output
+
+
+def _list_files(directory, suffix):
+    if not os.path.isdir(directory):
+        return {}
+    return {filename[:-len(suffix)]: os.path.join(directory, filename)
+            for filename in sorted(os.listdir(directory)) if filename.lower().endswith(suffix)}
+
+
+def _data_offset(f, info):
+    """成员数据在包文件中的起始位置，需要读取本地文件头中的文件名和扩展字段长度。"""
+    f.seek(info.header_offset)
+    header = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+    if header[0] != b'PK\x03\x04':
+        raise ValueError(f"损坏的本地文件头: {info.filename}")
+    return info.header_offset + LOCAL_HEADER.size + header[9] + header[10]
+
+
+if __name__ == '__main__':
+    # python -m src.route.ModPackage <外部逻辑文件夹> [输出文件]
+    path = pack(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f'{path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB')
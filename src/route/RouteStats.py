@@ -0,0 +1,96 @@
+import json
+import os
+
+ROOT_KEY = ''
+
+
+class RouteStats:
+    """外部逻辑的路线统计。
+
+    记录每个节点之后实际匹配到的子节点次数及各节点的平均置信度，保存在 mod 目录下的
+    `route_stats.json` 中。匹配地图时按历史出现次数排列候选，线性路线上通常第一个候选即可命中。
+    另外按分辨率记录每个节点最近一次匹配到的位置，作为下次搜索的位置先验。
+    """
+
+    FILENAME = 'route_stats.json'
+
+    def __init__(self, path=None):
+        self.path = path
+        self.transitions = {}
+        self.confidence = {}
+        self.locations = {}
+        self.dirty = False
+
+    @classmethod
+    def for_folder(cls, folder):
+        stats = cls(os.path.join(folder, cls.FILENAME))
+        stats.load()
+        return stats
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.transitions = data.get('transitions', {})
+        self.confidence = data.get('confidence', {})
+        self.locations = data.get('locations', {})
+        self.dirty = False
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        data = {
+            'transitions': self.transitions,
+            'confidence': self.confidence,
+            'locations': self.locations,
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def record(self, parent, child, confidence):
+        """记录一次 parent -> child 的跳转，parent 为 None 表示从根节点开始。"""
+        children = self.transitions.setdefault(_key(parent), {})
+        children[child] = children.get(child, 0) + 1
+        count, mean = self.confidence.get(child, (0, 0.0))
+        count += 1
+        mean += (confidence - mean) / count
+        self.confidence[child] = [count, mean]
+        self.dirty = True
+
+    def count(self, parent, child) -> int:
+        return self.transitions.get(_key(parent), {}).get(child, 0)
+
+    def average_confidence(self, name) -> float:
+        return self.confidence.get(name, (0, 0.0))[1]
+
+    def location(self, resolution, name):
+        """节点在该分辨率下最近一次匹配到的左上角坐标，没有记录时返回 None。"""
+        loc = self.locations.get(_resolution_key(resolution), {}).get(name)
+        return tuple(loc) if loc is not None else None
+
+    def record_location(self, resolution, name, loc):
+        locations = self.locations.setdefault(_resolution_key(resolution), {})
+        loc = [int(loc[0]), int(loc[1])]
+        if locations.get(name) != loc:
+            locations[name] = loc
+            self.dirty = True
+
+    def order(self, parent, candidates) -> list[str]:
+        """按历史出现次数从高到低排列候选，次数相同时保持原顺序。"""
+        children = self.transitions.get(_key(parent))
+        if not children:
+            return list(candidates)
+        return sorted(candidates, key=lambda name: -children.get(name, 0))
+
+
+def _resolution_key(resolution):
+    width, height = resolution
+    return f'{width}x{height}'
+
+
+def _key(parent):
+    return ROOT_KEY if parent is None else parent
@@ -0,0 +1,60 @@
+import re
+
+ROOT_PATTERN = re.compile(r'[a-zA-Z]$')
+
+
+class RouteTree:
+    """外部逻辑的节点树。
+
+    节点名称形如 `A`、`A-1`、`A-1-1`，在加载时一次性建立父子关系：
+    - 子节点：`父节点-X`，X 不含 '-' 且长度不超过 3（`A-1` 的子节点是 `A-1-1`，不是 `A-10` 或 `A-1-1-1`）。
+    - 根节点：以字母结尾的节点。
+    同时保留按名称排序的顺序，供无地图模式按顺序执行脚本。
+    """
+
+    MAX_SUFFIX_LENGTH = 3
+
+    def __init__(self, names, root_pattern=ROOT_PATTERN):
+        self.names = list(names)
+        self.root_pattern = root_pattern
+        self.roots = [name for name in self.names if root_pattern.search(name)]
+        self._children = {}
+        for name in self.names:
+            parent = parent_of(name, self.MAX_SUFFIX_LENGTH)
+            if parent is not None:
+                self._children.setdefault(parent, []).append(name)
+        self.order = sorted(self.names)
+        self._position = {name: i for i, name in enumerate(self.order)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._position
+
+    def children(self, name) -> list[str]:
+        return self._children.get(name, [])
+
+    def candidates(self, name, pattern=None) -> list[str]:
+        """下一步可能出现的节点，name 为 None 时返回根节点。"""
+        if name is not None:
+            return self.children(name)
+        if pattern is None or pattern is self.root_pattern or pattern.pattern == self.root_pattern.pattern:
+            return self.roots
+        return [node for node in self.names if pattern.search(node)]
+
+    def next_in_order(self, name):
+        """按名称排序后的下一个节点，没有时返回 None。"""
+        if name is None:
+            return self.order[0] if self.order else None
+        position = self._position[name] + 1
+        return self.order[position] if position < len(self.order) else None
+
+
+def parent_of(name, max_suffix_length=RouteTree.MAX_SUFFIX_LENGTH):
+    if '-' not in name:
+        return None
+    parent, suffix = name.rsplit('-', 1)
+    if len(suffix) > max_suffix_length:
+        return None
+    return parent
@@ -0,0 +1,97 @@
+import re
+
+import cv2
+
+from src.route.TemplateMatcher import TemplateMatcher
+
+RESOLUTION_PATTERN = re.compile(r'(\d{3,4})[pP]|([24])[kK]')
+K_HEIGHTS = {'2': 1440, '4': 2160}
+COMMON_HEIGHTS = (1080, 1440, 2160)
+
+
+def recorded_height(folder_name) -> int | None:
+    """从外部逻辑文件夹名称中识别录制分辨率，如 `示例(1080p)`、`xxx 2k`，无法识别时返回 None。"""
+    match = RESOLUTION_PATTERN.search(folder_name)
+    if match is None:
+        return None
+    if match.group(1):
+        return int(match.group(1))
+    return K_HEIGHTS[match.group(2)]
+
+
+def normalize_scale(scale) -> float:
+    """缩放比例保留 4 位小数，与 1 相差不到 1% 时视为不缩放。"""
+    return 1.0 if abs(scale - 1.0) < 0.01 else round(scale, 4)
+
+
+def candidate_scales(screen_height, recorded=None) -> list[float]:
+    """需要校准的缩放比例，第一个为最可能的比例。
+
+    已知录制分辨率时只在按高度换算的比例和不缩放之间选择，否则尝试所有常见分辨率。
+    """
+    heights = (recorded,) if recorded else COMMON_HEIGHTS
+    scales = [normalize_scale(screen_height / height) for height in heights]
+    scales.append(1.0)
+    return list(dict.fromkeys(scales))
+
+
+def rescale(template, scale):
+    """按比例缩放模板，缩小用 INTER_AREA，放大用 INTER_LINEAR。"""
+    if scale == 1.0 or template is None:
+        return template
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(template, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+class ScaleCalibrator:
+    """在第一次匹配时用少量模板试探各个缩放比例，选出置信度最高的比例。
+
+    只在校准时临时缩放模板，选定比例后由调用方加载（或在磁盘缓存中生成）缩放后的模板，之后不再有额外开销。
+    最高置信度低于 min_confidence 时（当前画面里没有这些模板）不做决定，下次匹配时再校准；
+    每个比例在各次尝试中的最高置信度会累计下来，max_attempts 次仍无法决定时选累计置信度最高的比例，
+    一次都没有匹配过时才使用 fallback。
+    """
+
+    def __init__(self, scales, fallback=1.0, min_confidence=0.6, max_attempts=5):
+        self.scales = list(scales)
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.max_attempts = max_attempts
+        self.matcher = TemplateMatcher(pyramid=True, backend='spatial')
+        self.attempts = 0
+        self.scores = {}
+
+    @property
+    def needed(self) -> bool:
+        return len(self.scales) > 1
+
+    def calibrate(self, screen, templates) -> tuple[float, float] | None:
+        """
+        Args:
+            screen: 灰度截图。
+            templates: [(名称, 原始分辨率的模板)]。
+
+        Returns:
+            tuple | None: (比例, 置信度)，没有足够可信的结果时为 None；
+            超过尝试次数时为各次尝试中置信度最高的比例，从未匹配过时为 (fallback, 0.0)。
+        """
+        self.attempts += 1
+        best = None
+        for scale in self.scales:
+            for name, template in templates:
+                scaled = rescale(template, scale)
+                confidence, _ = self.matcher.match(screen, f'{name}@{scale}', scaled)
+                if confidence > self.scores.get(scale, float('-inf')):
+                    self.scores[scale] = confidence
+                if best is None or confidence > best[1]:
+                    best = (scale, confidence)
+        self.matcher.clear()
+        if best is not None and best[1] >= self.min_confidence:
+            return best
+        if self.attempts >= self.max_attempts:
+            if not self.scores:
+                return self.fallback, 0.0
+            # 比例按可能性排列，置信度相同时保留靠前的比例
+            scale = max(self.scales, key=lambda s: self.scores.get(s, float('-inf')))
+            return scale, self.scores[scale]
+        return None
@@ -0,0 +1,196 @@
+import math
+
+import cv2
+import numpy as np
+
+from src.route.FftCorrelator import FftCorrelator
+
+BACKENDS = ('auto', 'spatial', 'fft')
+
+class TemplateMatcher:
+    """外部逻辑地图模板匹配器。
+
+    支持两种模式：
+    - 穷举：直接在整张灰度截图上 `cv2.matchTemplate`。
+    - 金字塔（由粗到精）：先在缩小后的截图与模板上找到最高峰，再只在原分辨率下对峰值附近的
+      小窗口做精确匹配。缩小后的模板按 (名称, 截图尺寸) 缓存，同一帧的缩小截图只计算一次。
+    传入位置先验 hint 时先只搜索 hint 附近的窗口，窗口内置信度不足 window_threshold 时再全图搜索。
+
+    同一帧的缩小截图作为 (截图, 缩小截图) 整体缓存和替换，match_many 还会把它作为参数传给各个线程，
+    主循环、后台匹配线程和匹配线程池同时使用同一个匹配器时不会拿到别的截图的数据。
+
+    全图搜索的后端由 backend 决定：
+    - spatial: 上述穷举/金字塔。
+    - fft: 频域相关（见 `FftCorrelator`），截图频谱每帧只算一次，模板越大越占优。
+    - auto: 模板面积不小于截图面积的 FFT_MIN_AREA_RATIO 时使用 fft，否则使用 spatial。
+      阈值来自 `tests/benchmarks/TemplateMatcherBenchmark.py` 在 2560x1440 下的结果，金字塔开关不同，分界点也不同。
+    """
+
+    MIN_COARSE_SIZE = 12
+    FFT_MIN_AREA_RATIO = {True: 0.2, False: 0.001}
+
+    def __init__(self, pyramid=True, scale=0.25, refine_margin=4, window_padding=0.02, window_threshold=0.8,
+                 backend='auto'):
+        if backend not in BACKENDS:
+            raise ValueError(f'unknown backend: {backend}')
+        self.pyramid = pyramid
+        self.backend = backend
+        self.fft = FftCorrelator()
+        self.scale = scale
+        self.refine_margin = refine_margin
+        self.window_padding = window_padding
+        self.window_threshold = window_threshold
+        self._small_templates = {}
+        self._small_screen = None
+        self.window_hits = 0
+        self.window_misses = 0
+
+    def match(self, screen: np.ndarray, name: str, template: np.ndarray, hint=None, small_screen=None,
+              fft_screen=None) -> tuple[float, tuple[int, int]]:
+        """在灰度截图中匹配模板。
+
+        Args:
+            screen: 灰度截图。
+            name: 模板名称，用作缓存的键。
+            template: 灰度模板。
+            hint: 上次匹配到的左上角坐标，为 None 时直接全图搜索。
+            small_screen: 缩小后的 screen，为 None 时按需计算。
+            fft_screen: `FftCorrelator.prepare(screen)` 的结果，为 None 时按需计算。
+
+        Returns:
+            tuple: (置信度, 左上角坐标)。模板比截图大时返回 (0.0, (0, 0))。
+        """
+        if template.shape[0] > screen.shape[0] or template.shape[1] > screen.shape[1]:
+            return 0.0, (0, 0)
+        if hint is not None:
+            confidence, loc = self.match_window(screen, name, template, hint, small_screen)
+            if confidence >= self.window_threshold:
+                self.window_hits += 1
+                return confidence, loc
+            self.window_misses += 1
+        if self.use_fft(screen, template):
+            return self.fft.match(screen, name, template, fft_screen)
+        if not self.pyramid or min(template.shape[:2]) * self.scale < self.MIN_COARSE_SIZE:
+            return match_exhaustive(screen, template)
+        return self._match_pyramid(screen, name, template, small_screen=small_screen)
+
+    def use_fft(self, screen, template) -> bool:
+        if self.backend != 'auto':
+            return self.backend == 'fft'
+        ratio = template.shape[0] * template.shape[1] / (screen.shape[0] * screen.shape[1])
+        return ratio >= self.FFT_MIN_AREA_RATIO[self.pyramid]
+
+    def match_window(self, screen, name, template, hint, small_screen=None) -> tuple[float, tuple[int, int]]:
+        """只在 hint 周围留出 window_padding（相对截图宽度）的窗口内匹配。"""
+        padding = max(self.refine_margin, round(screen.shape[1] * self.window_padding))
+        template_height, template_width = template.shape[:2]
+        x, y = hint
+        x1 = min(max(0, x - padding), screen.shape[1] - template_width)
+        y1 = min(max(0, y - padding), screen.shape[0] - template_height)
+        x2 = min(screen.shape[1], x1 + template_width + padding * 2)
+        y2 = min(screen.shape[0], y1 + template_height + padding * 2)
+        if self.pyramid and min(template.shape[:2]) * self.scale >= self.MIN_COARSE_SIZE:
+            return self._match_pyramid(screen, name, template, (x1, y1, x2, y2), small_screen)
+        confidence, (loc_x, loc_y) = match_exhaustive(screen[y1:y2, x1:x2], template)
+        return confidence, (x1 + loc_x, y1 + loc_y)
+
+    def match_many(self, screen: np.ndarray, candidates, executor=None) -> list[tuple[float, tuple[int, int]]]:
+        """匹配多个模板，结果顺序与 candidates 一致。
+
+        `cv2.matchTemplate` 会释放 GIL，传入 executor 时各候选在线程池中并行匹配，
+        所有线程共享同一张截图，不做拷贝；缩小截图与截图频谱在当前线程计算一次，作为参数传给各线程。
+
+        Args:
+            screen: 灰度截图。
+            candidates: (名称, 模板) 或 (名称, 模板, hint) 列表。
+            executor: 线程池，为 None 或候选少于 2 个时顺序执行。
+        """
+        if executor is None or len(candidates) < 2:
+            return [self.match(screen, *candidate) for candidate in candidates]
+        small_screen = self._downscale_screen(screen) if self.pyramid else None
+        fft_screen = None
+        if any(self.use_fft(screen, candidate[1]) for candidate in candidates):
+            fft_screen = self.fft.prepare(screen)
+        futures = [executor.submit(self.match, screen, *candidate, small_screen=small_screen, fft_screen=fft_screen)
+                   for candidate in candidates]
+        return [future.result() for future in futures]
+
+    def _match_pyramid(self, screen, name, template, region=None, small_screen=None):
+        if small_screen is None:
+            small_screen = self._downscale_screen(screen)
+        small_template = self._downscale_template(name, template, screen.shape)
+        offset_x = offset_y = 0
+        if region is not None:
+            # 在缩小截图上截取同一区域做粗匹配
+            offset_x, offset_y = int(region[0] * self.scale), int(region[1] * self.scale)
+            small_screen = small_screen[offset_y:math.ceil(region[3] * self.scale),
+                                        offset_x:math.ceil(region[2] * self.scale)]
+        if small_template.shape[0] > small_screen.shape[0] or small_template.shape[1] > small_screen.shape[1]:
+            if region is not None:
+                x1, y1, x2, y2 = region
+                confidence, (loc_x, loc_y) = match_exhaustive(screen[y1:y2, x1:x2], template)
+                return confidence, (x1 + loc_x, y1 + loc_y)
+            return match_exhaustive(screen, template)
+
+        coarse = cv2.matchTemplate(small_screen, small_template, cv2.TM_CCOEFF_NORMED)
+        _, _, _, (coarse_x, coarse_y) = cv2.minMaxLoc(coarse)
+        coarse_x += offset_x
+        coarse_y += offset_y
+
+        # 缩小时丢失的精度为 1/scale 个像素，在此基础上再留出少量余量
+        margin = math.ceil(1 / self.scale) + self.refine_margin
+        template_height, template_width = template.shape[:2]
+        x = round(coarse_x / self.scale)
+        y = round(coarse_y / self.scale)
+        x1, y1 = max(0, x - margin), max(0, y - margin)
+        x2 = min(screen.shape[1], x + template_width + margin)
+        y2 = min(screen.shape[0], y + template_height + margin)
+        if x2 - x1 < template_width:
+            x1 = max(0, x2 - template_width)
+        if y2 - y1 < template_height:
+            y1 = max(0, y2 - template_height)
+
+        confidence, (loc_x, loc_y) = match_exhaustive(screen[y1:y2, x1:x2], template)
+        return confidence, (x1 + loc_x, y1 + loc_y)
+
+    def _downscale_screen(self, screen):
+        # 只读一次缓存，其它线程同时替换缓存时仍使用与 screen 对应的缩小截图
+        cached = self._small_screen
+        if cached is None or cached[0] is not screen:
+            cached = (screen, cv2.resize(screen, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA))
+            self._small_screen = cached
+        return cached[1]
+
+    def _downscale_template(self, name, template, screen_shape):
+        key = (name, screen_shape[:2], template.shape[:2])
+        small_template = self._small_templates.get(key)
+        if small_template is None:
+            small_template = cv2.resize(template, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            self._small_templates[key] = small_template
+        return small_template
+
+    @property
+    def window_hit_rate(self) -> float:
+        total = self.window_hits + self.window_misses
+        return self.window_hits / total if total else 0.0
+
+    def forget(self, name):
+        """模板被释放后丢弃由它派生的缓存（缩小的模板、频谱）。"""
+        # 可能在预加载线程中调用，先复制键再删除
+        for key in list(self._small_templates):
+            if key[0] == name:
+                self._small_templates.pop(key, None)
+        self.fft.forget(name)
+
+    def clear(self):
+        self.fft.clear()
+        self._small_templates.clear()
+        self._small_screen = None
+        self.window_hits = 0
+        self.window_misses = 0
+
+
+def match_exhaustive(screen, template):
+    result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+    _, confidence, _, loc = cv2.minMaxLoc(result)
+    return confidence, loc
@@ -0,0 +1,131 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+BYTES_PER_MB = 1024 * 1024
+
+
+class TemplateStore(Mapping):
+    """按需加载的地图模板，常驻内存的模板总大小受 budget_mb 限制。
+
+    以 {名称: 加载函数} 创建，行为与 {名称: 模板} 的字典相同（`in`、迭代、len 不加载任何模板），
+    第一次取模板时才调用加载函数，超出预算时淘汰最久未使用的模板，淘汰时调用 on_evict(name)
+    以便匹配器丢弃由该模板派生的缓存。加载失败（返回 None）的模板视为不存在。
+
+    prefetch 在节点成为当前节点时提前加载下一层子节点，可以在后台线程调用。
+    """
+
+    def __init__(self, sources, budget_mb=256, on_evict=None):
+        """
+        Args:
+            sources: {模板名称: 无参数加载函数}，迭代顺序即模板顺序。
+            budget_mb: 常驻模板的总大小上限（MB），不大于 0 时不限制。
+            on_evict: on_evict(name) 模板被淘汰后调用。
+        """
+        self.sources = dict(sources)
+        self.budget = budget_mb * BYTES_PER_MB
+        self.on_evict = on_evict
+        self._resident = OrderedDict()
+        self._prefetched = set()
+        self._failed = set()
+        self._lock = threading.RLock()
+        self.resident_bytes = 0
+        self.peak_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetches = 0
+        self.prefetch_hits = 0
+
+    def __getitem__(self, name):
+        with self._lock:
+            template = self._resident.get(name)
+            if template is not None:
+                self._resident.move_to_end(name)
+                self.hits += 1
+                if name in self._prefetched:
+                    self._prefetched.discard(name)
+                    self.prefetch_hits += 1
+                return template
+            self.misses += 1
+            template = self._load(name)
+            if template is None:
+                raise KeyError(name)
+            return template
+
+    def __contains__(self, name):
+        return name in self.sources and name not in self._failed
+
+    def __iter__(self):
+        return (name for name in self.sources if name not in self._failed)
+
+    def __len__(self):
+        return len(self.sources) - len(self._failed)
+
+    def prefetch(self, names) -> int:
+        """提前加载 names 中尚未加载的模板，返回实际加载的数量。"""
+        loaded = 0
+        for name in names:
+            with self._lock:
+                if name in self._resident or name not in self:
+                    continue
+                if self._load(name) is not None:
+                    self._prefetched.add(name)
+                    self.prefetches += 1
+                    loaded += 1
+        return loaded
+
+    def clear(self):
+        """释放所有常驻模板。"""
+        with self._lock:
+            for name in list(self._resident):
+                self._evict(name)
+
+    @property
+    def prefetch_hit_rate(self) -> float:
+        """提前加载的模板中，在被淘汰前实际用到的比例。"""
+        return self.prefetch_hits / self.prefetches if self.prefetches else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'resident': len(self._resident),
+            'resident_mb': self.resident_bytes / BYTES_PER_MB,
+            'peak_mb': self.peak_bytes / BYTES_PER_MB,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'prefetches': self.prefetches,
+            'prefetch_hit_rate': self.prefetch_hit_rate,
+        }
+
+    def _load(self, name):
+        source = self.sources.get(name)
+        if source is None or name in self._failed:
+            return None
+        template = source()
+        if template is None:
+            self._failed.add(name)
+            return None
+        self._resident[name] = template
+        self.resident_bytes += template.nbytes
+        self._shrink(keep=name)
+        self.peak_bytes = max(self.peak_bytes, self.resident_bytes)
+        return template
+
+    def _shrink(self, keep):
+        if self.budget <= 0:
+            return
+        while self.resident_bytes > self.budget and len(self._resident) > 1:
+            oldest = next(iter(self._resident))
+            if oldest == keep:
+                self._resident.move_to_end(keep)
+                continue
+            self._evict(oldest)
+            self.evictions += 1
+
+    def _evict(self, name):
+        template = self._resident.pop(name)
+        self.resident_bytes -= template.nbytes
+        self._prefetched.discard(name)
+        if self.on_evict is not None:
+            self.on_evict(name)
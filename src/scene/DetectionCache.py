@@ -0,0 +1,63 @@
+class DetectionCache:
+    """帧级别的检测结果缓存。
+
+    同一帧上重复的 `find_one` 查询直接返回上一次的结果（`Box` 或 None）。
+    当前帧对象变化（包括 `wait_until` 内部的截图）或调用 `invalidate` 时清空缓存。
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._entries = {}
+        self.frame_seq = 0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        self._frame = None
+        self._entries.clear()
+
+    def get(self, frame, key, finder):
+        """获取 key 在 frame 上的检测结果，未命中时调用 finder 计算并缓存。
+
+        Args:
+            frame: 当前帧，只按对象身份比较。
+            key: (特征名, box, threshold) 等可哈希的查询条件。
+            finder: 无参数的检测函数。
+
+        Returns:
+            finder 的返回值。
+        """
+        if frame is not self._frame:
+            self._frame = frame
+            self._entries.clear()
+            self.frame_seq += 1
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        result = finder()
+        self._entries[key] = result
+        return result
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frame_seq,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+def box_key(box):
+    if box is None:
+        return None
+    return box.x, box.y, box.width, box.height
@@ -0,0 +1,165 @@
+import cv2
+import numpy as np
+
+
+class FishBarDetector:
+    """钓鱼小游戏中鱼条和鱼标的检测器。
+
+    ROI 是一条窄的竖条，鱼条是实心的矩形，鱼标在鱼条上下移动。鱼标在鱼条外时，二值化后各亮色区域在竖直方向上
+    互不重叠，且每个区域在每一行上是连续的一段。此时不需要 findContours：按行统计亮色像素数，连续的非空行就是
+    一个区域，只对最终选中的鱼条和鱼标计算外接矩形和重心。
+
+    鱼标进入鱼条（控制区判断正依赖这种情形）或反光落在鱼条所在的行时，按行投影会把它们并入鱼条。
+    并入后鱼条所在的行不再全部填满外接矩形：鱼标的暗色描边使这些行变窄，鱼条外的反光使外接矩形变宽。
+    因此选出鱼条后检查每行的亮色像素数，有行比外接矩形窄超过 BAR_EDGE_TOLERANCE 时改用轮廓重新划分；
+    鱼标同理，最宽的一行应当填满外接矩形。检查只用到已有的按行统计，几乎不增加耗时。
+
+    面积按轮廓面积（像素中心连线围成的多边形）换算，以沿用原来 contourArea 的阈值：
+    像素数 - 行数 - (首行宽 + 末行宽) / 2 + 1。矩形的鱼条与 contourArea 完全一致，
+    圆形的鱼标在斜边上每行有半个像素以内的差异（约 3%），远小于阈值之间的间隔。
+
+    二值图和按行统计的缓冲区按 ROI 尺寸预先分配，尺寸不变时每帧不再分配内存。
+    """
+
+    BRIGHT_THRESHOLD = 200
+    # 1080p 下鱼条每行允许比外接矩形窄的像素数（边缘抗锯齿），按 res_ratio 缩放
+    BAR_EDGE_TOLERANCE = 2
+
+    def __init__(self, bar_min_area, icon_min_area, icon_max_area):
+        self.bar_min_area = bar_min_area
+        self.icon_min_area = icon_min_area
+        self.icon_max_area = icon_max_area
+        self.fallbacks = 0
+        self._shape = None
+        self._gray = None
+        self._binary = None
+        self._transposed = None
+        self._counts = None
+        self._lit = None
+        self._column_counts = None
+        self._row_indices = None
+        self._column_indices = None
+
+    def detect(self, roi: np.ndarray, res_ratio=1.0):
+        """检测鱼条和鱼标。
+
+        Args:
+            roi: BGR 的 ROI 图像。
+            res_ratio: 截图高度 / 1080，面积阈值按其平方缩放。
+
+        Returns:
+            tuple: ((has_bar, bar_center, bar_rect, bar_area), (has_icon, icon_center, icon_rect, icon_area))，
+            坐标均为 ROI 内部坐标，rect 为 (x1, y1, x2, y2)。
+        """
+        self._project(roi)
+        # 亮色行标记前后各补一个 0，差分不为 0 的位置依次是每段连续亮色行的起点和终点（不含）
+        np.greater(self._counts, 0, out=self._lit[1:-1])
+        edges = np.flatnonzero(np.diff(self._lit)).tolist()
+        if not edges:
+            return _NOT_FOUND, _NOT_FOUND
+        starts, ends = edges[0::2], edges[1::2]
+        # 段与段之间的行计数为 0，从每个起点累加到下一个起点即为该段的像素数
+        run_pixels = np.add.reduceat(self._counts, starts).tolist()
+
+        scale = res_ratio ** 2
+        min_area = self.icon_min_area * scale
+        counts = self._counts
+        blobs = []
+        for top, bottom, pixels in zip(starts, ends, run_pixels):
+            area = pixels - (bottom - top) - (int(counts[top]) + int(counts[bottom - 1])) / 2 + 1
+            if area > min_area:
+                blobs.append((area, top, bottom, pixels))
+        if not blobs:
+            return _NOT_FOUND, _NOT_FOUND
+        blobs.sort(key=lambda blob: blob[0], reverse=True)
+
+        bar = _NOT_FOUND
+        if blobs[0][0] > self.bar_min_area * scale:
+            bar = self._describe(*blobs[0])
+            # 鱼条是实心矩形，每行都应填满外接矩形
+            x1, _, x2, _ = bar[2]
+            top, bottom = blobs[0][1], blobs[0][2]
+            if int(counts[top:bottom].min()) < x2 - x1 - round(self.BAR_EDGE_TOLERANCE * res_ratio):
+                return self._detect_by_contours(res_ratio)
+        icon = _NOT_FOUND
+        for blob in blobs:
+            if blob[0] == bar[3]:
+                continue
+            if blob[0] < self.icon_max_area * scale:
+                icon = self._describe(*blob)
+                # 鱼标最宽的一行填满外接矩形，否则同一行上还有别的亮色区域
+                x1, _, x2, _ = icon[2]
+                if int(counts[blob[1]:blob[2]].max()) < x2 - x1:
+                    return self._detect_by_contours(res_ratio)
+            break
+        return bar, icon
+
+    def _detect_by_contours(self, res_ratio):
+        """亮色区域与鱼条或鱼标同行时，在同一张二值图上按轮廓重新划分。"""
+        self.fallbacks += 1
+        return select_by_contours(self._binary, res_ratio, self.bar_min_area, self.icon_min_area,
+                                  self.icon_max_area)
+
+    def _describe(self, area, top, bottom, pixels):
+        block = self._binary[top:bottom]
+        x, y, w, h = cv2.boundingRect(block)
+        cv2.reduce(block, 0, cv2.REDUCE_SUM, dst=self._column_counts, dtype=cv2.CV_32S)
+        center_x = int(self._column_counts[0] @ self._column_indices) / pixels
+        center_y = int(self._counts[top:bottom] @ self._row_indices[top:bottom]) / pixels
+        return True, (int(center_x), int(center_y)), (x, top + y, x + w, top + y + h), area
+
+    def _project(self, roi):
+        """二值化并转置为 (列, 行)，沿列方向求和得到每行的亮色像素数。
+
+        转置后的归约是对几十个连续行向量逐元素相加，比沿窄的行方向归约快得多。
+        """
+        height, width = roi.shape[:2]
+        if (height, width) != self._shape:
+            self._shape = (height, width)
+            self._gray = np.empty((height, width), dtype=np.uint8)
+            self._binary = np.empty((height, width), dtype=np.uint8)
+            self._transposed = np.empty((width, height), dtype=np.uint8)
+            self._counts = np.empty(height, dtype=np.int32)
+            self._lit = np.zeros(height + 2, dtype=np.int8)
+            self._column_counts = np.empty((1, width), dtype=np.int32)
+            self._row_indices = np.arange(height, dtype=np.int32)
+            self._column_indices = np.arange(width, dtype=np.int32)
+        cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.threshold(self._gray, self.BRIGHT_THRESHOLD, 1, cv2.THRESH_BINARY, dst=self._binary)
+        cv2.transpose(self._binary, dst=self._transposed)
+        cv2.reduce(self._transposed, 0, cv2.REDUCE_SUM, dst=self._counts.reshape(1, height), dtype=cv2.CV_32S)
+
+
+_NOT_FOUND = (False, None, None, 0.0)
+
+
+def select_by_contours(scene_bin, res_ratio, bar_min_area, icon_min_area, icon_max_area):
+    """在二值图的轮廓中选出鱼条（面积最大）和鱼标（其次），返回格式与 FishBarDetector.detect 相同。"""
+    contours, _ = cv2.findContours(scene_bin, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    blobs = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > icon_min_area * res_ratio ** 2:
+            blobs.append({"contour": contour, "area": area})
+    blobs.sort(key=lambda b: b["area"], reverse=True)
+
+    def describe(blob):
+        moments = cv2.moments(blob["contour"])
+        if moments["m00"] <= 0:
+            return _NOT_FOUND
+        center = (int(moments["m10"] / moments["m00"]), int(moments["m01"] / moments["m00"]))
+        x, y, w, h = cv2.boundingRect(blob["contour"])
+        return True, center, (x, y, x + w, y + h), blob["area"]
+
+    bar = icon = _NOT_FOUND
+    for blob in blobs:
+        if blob["area"] > bar_min_area * res_ratio ** 2:
+            bar = describe(blob)
+        break
+    for blob in blobs:
+        if blob["area"] == bar[3]:
+            continue
+        if icon_min_area * res_ratio ** 2 < blob["area"] < icon_max_area * res_ratio ** 2:
+            icon = describe(blob)
+        break
+    return bar, icon
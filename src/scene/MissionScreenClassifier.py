@@ -0,0 +1,111 @@
+import time
+from enum import Enum
+
+import cv2
+
+from ok import Box
+from src.config import config
+
+template_matching_config = config['template_matching']
+
+
+class MissionScreen(Enum):
+    NONE = 0
+    LETTER_REWARD = 1
+    LETTER = 2
+    DROP_ITEM = 3
+    START = 4
+    CONTINUE = 5
+    ESC_MENU = 6
+
+
+class MissionScreenClassifier:
+    """任务结算/大厅界面分类器。
+
+    候选项由 `task.get_mission_screen_candidates()` 提供，格式为 (MissionScreen, 特征名, box)，
+    列表顺序即优先级。搜索区域和模板每个分辨率只准备一次，之后每次分类只需从当前帧
+    裁剪出各候选区域的视图并直接做模板匹配，不再经过逐个 `find_one` 的调用开销。
+    分类结果存入 `task.detection_cache`，同一帧上的重复分类直接返回缓存结果。
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.threshold = template_matching_config.get('default_threshold', 0.8)
+        self._size = None
+        self._candidates = []
+        self.last_elapsed = 0.0
+
+    def classify(self, frame=None, screens=None) -> tuple[MissionScreen, Box | None]:
+        """识别当前帧所在的界面。
+
+        Args:
+            frame: 要识别的帧，默认为当前帧。
+            screens: 只识别这些界面，默认为全部。
+
+        Returns:
+            tuple: (MissionScreen, 匹配到的 Box)，未识别到时为 (MissionScreen.NONE, None)。
+        """
+        frame = self.task.frame if frame is None else frame
+        # 与 find_one_cached 共用帧级缓存，同一帧上重复的分类（如 wait_until 的条件）只匹配一次
+        key = ('mission_screen', None if screens is None else tuple(screens))
+        return self.task.detection_cache.get(frame, key, lambda: self._classify(frame, screens))
+
+    def _classify(self, frame, screens):
+        start = time.perf_counter()
+        self._prepare(frame)
+
+        best_screen, best_box = MissionScreen.NONE, None
+        for screen, name, template, (x1, y1, x2, y2) in self._candidates:
+            if best_screen is not MissionScreen.NONE and screen is not best_screen:
+                break
+            if screens is not None and screen not in screens:
+                continue
+            result = cv2.matchTemplate(frame[y1:y2, x1:x2, :3], template, cv2.TM_CCOEFF_NORMED)
+            _, confidence, _, (loc_x, loc_y) = cv2.minMaxLoc(result)
+            if confidence < self.threshold:
+                continue
+            if best_box is None or confidence > best_box.confidence:
+                best_screen = screen
+                best_box = Box(x1 + loc_x, y1 + loc_y, template.shape[1], template.shape[0],
+                               confidence=confidence, name=name)
+
+        self.last_elapsed = time.perf_counter() - start
+        if best_box is not None:
+            self.task.draw_boxes(best_box.name, best_box, "green")
+        return best_screen, best_box
+
+    def _prepare(self, frame):
+        frame_height, frame_width = frame.shape[:2]
+        if self._size == (frame_width, frame_height):
+            return
+        h_offset = frame_width * template_matching_config.get('default_horizontal_variance', 0)
+        v_offset = frame_height * template_matching_config.get('default_vertical_variance', 0)
+        candidates = []
+        for screen, name, box in self.task.get_mission_screen_candidates():
+            template = self.task.get_feature_by_name(name).mat
+            if box is None:
+                box = self.task.get_box_by_name(name).copy(x_offset=-h_offset, y_offset=-v_offset,
+                                                           width_offset=h_offset * 2, height_offset=v_offset * 2)
+            candidates.append((screen, name, template,
+                               search_region(box, template.shape, frame_width, frame_height)))
+        self._candidates = candidates
+        self._size = (frame_width, frame_height)
+
+    def reset(self):
+        self._size = None
+        self._candidates = []
+
+
+def search_region(box, template_shape, frame_width, frame_height):
+    """把 box 裁剪到帧内，并保证不小于模板尺寸。"""
+    template_height, template_width = template_shape[:2]
+    x1, y1 = max(box.x, 0), max(box.y, 0)
+    x2 = min(box.x + box.width, frame_width)
+    y2 = min(box.y + box.height, frame_height)
+    if x2 - x1 < template_width:
+        x1 = max(0, min(x1 - (template_width - (x2 - x1) + 1) // 2, frame_width - template_width))
+        x2 = x1 + template_width
+    if y2 - y1 < template_height:
+        y1 = max(0, min(y1 - (template_height - (y2 - y1) + 1) // 2, frame_height - template_height))
+        y2 = y1 + template_height
+    return x1, y1, x2, y2
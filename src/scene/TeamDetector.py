@@ -0,0 +1,107 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class TeamDetector:
+    """队伍状态检测器。
+
+    通过比较 `ultimate_key_icon` 模板与实时截图中"反转后最大连通区域"的面积判断是否在队伍中。
+    模板侧的面积只在特征加载（分辨率变化会重新加载特征）时计算一次，
+    实时截图侧先做一次廉价的上界检查，不可能匹配时直接返回，省去第二次连通组件分析。
+    """
+
+    TOLERANCE = 0.15
+
+    def __init__(self):
+        self._reference_mat = None
+        self._reference_area = 0
+        self.calls = 0
+        self.early_rejects = 0
+        self.last_elapsed = 0.0
+        self.total_elapsed = 0.0
+
+    def reference_area(self, mat: np.ndarray) -> int:
+        """获取模板的面积特征，模板对象变化时才重新计算。"""
+        if mat is not self._reference_mat:
+            self._reference_area = max_inverted_area(mat)
+            self._reference_mat = mat
+        return self._reference_area
+
+    def match(self, template: np.ndarray, roi: np.ndarray) -> bool:
+        """判断实时截图的 ROI 是否与模板的面积特征一致。
+
+        Args:
+            template: `ultimate_key_icon` 特征图像。
+            roi: 从当前帧裁剪出的 `ultimate_key_icon` 区域。
+
+        Returns:
+            bool: 面积差异在 TOLERANCE 范围内返回 True。
+        """
+        start = time.perf_counter()
+        try:
+            reference = self.reference_area(template)
+            if reference <= 0:
+                return False
+            min_area = reference * (1 - self.TOLERANCE)
+            area = max_inverted_area(roi, min_area=min_area)
+            if area < 0:
+                self.early_rejects += 1
+                return False
+            return abs(reference - area) / reference < self.TOLERANCE
+        finally:
+            self.last_elapsed = time.perf_counter() - start
+            self.total_elapsed += self.last_elapsed
+            self.calls += 1
+
+    @property
+    def average_elapsed(self) -> float:
+        return self.total_elapsed / self.calls if self.calls else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "early_rejects": self.early_rejects,
+            "last_ms": self.last_elapsed * 1000,
+            "avg_ms": self.average_elapsed * 1000,
+        }
+
+    def reset_stats(self):
+        self.calls = 0
+        self.early_rejects = 0
+        self.last_elapsed = 0.0
+        self.total_elapsed = 0.0
+
+
+def max_inverted_area(mat: np.ndarray, min_area: float = 0) -> int:
+    """计算 `invert_max_area_only` 的面积结果，不生成中间掩码图像。
+
+    Args:
+        mat: BGR 图像。
+        min_area: 结果的下限。若第一次连通组件分析后已能确定结果达不到此值，直接返回 -1。
+
+    Returns:
+        int: 反转后最大连通区域的面积，没有连通区域时为 0，提前排除时为 -1。
+    """
+    gray = cv2.cvtColor(mat, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY)
+    if min_area > 0 and cv2.countNonZero(thresh) == 0:
+        return -1
+
+    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(thresh)
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    if len(areas) == 0:
+        return 0
+    max_idx = int(np.argmax(areas)) + 1
+
+    # 反转区域由最大区域以外的所有像素组成，其最大连通区域不可能超过这个数量
+    if min_area > 0 and thresh.size - areas[max_idx - 1] < min_area:
+        return -1
+
+    inverted_region = cv2.compare(labels, float(max_idx), cv2.CMP_NE)
+    _, _, stats2, _ = cv2.connectedComponentsWithStats(inverted_region)
+    areas2 = stats2[1:, cv2.CC_STAT_AREA]
+    if len(areas2) == 0:
+        return 0
+    return int(np.max(areas2))
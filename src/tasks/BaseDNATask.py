@@ -1,3 +1,4 @@
+import os
 import time
 from typing import Protocol, Callable, Union
 import numpy as np
@@ -13,6 +14,15 @@ from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
 
 from ok import BaseTask, Box, Logger, color_range_to_bound, run_in_new_thread, og, GenshinInteraction, PyDirectInteraction
+from src.macro.Checkpoint import normalized_position
+from src.macro.CompiledMacro import (OP_CHECKPOINT, OP_DELAY, OP_KEY_DOWN, OP_KEY_UP, OP_MOUSE_DOWN, OP_MOUSE_MOVE,
+                                     OP_MOUSE_UP, OP_NAMES, OP_RESET_TRANSPORT)
+from src.macro.InputState import INPUT_KEY_DOWN, INPUT_KEY_UP, INPUT_MOUSE_DOWN, INPUT_MOUSE_MOVE, InputState
+from src.macro.MacroPlayer import MacroPlayer
+from src.macro.PrecisionTimer import PrecisionTimer
+from src.macro.Timeline import Timeline, load_timelines, run_timeline
+from src.scene.DetectionCache import DetectionCache, box_key
+from src.scene.TeamDetector import TeamDetector
 
 logger = Logger.get_logger(__name__)
 f_black_color = {
@@ -69,6 +79,9 @@ class Ticker(Protocol):
 
 class BaseDNATask(BaseTask):
 
+    FRAME_FEED_INTERVAL = 0.01
+    MONTHLY_CARD_CHECK_INTERVAL = 1.0
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.key_config = self.get_global_config('Game Hotkey Config')  # 游戏热键配置
@@ -82,6 +95,14 @@ class BaseDNATask(BaseTask):
         self.sensitivity_config = self.get_global_config('Game Sensitivity Config')  # 游戏灵敏度配置
         self.onetime_seen = set()
         self.onetime_queue = deque()
+        self.team_detector = TeamDetector()
+        self.detection_cache = DetectionCache()
+        self.action_timer = PrecisionTimer(sleep=self.sleep)
+        self.drift_detections = 0
+        self.input_state = InputState(self.emit_inputs)
+        self.macro_player = MacroPlayer(self.dispatch_macro_op, is_paused=lambda: self.executor.paused,
+                                        main_thread_ops=(OP_RESET_TRANSPORT, OP_CHECKPOINT),
+                                        batch=self.input_state.batch)
 
     @property
     def f_search_box(self) -> Box:
@@ -97,6 +118,11 @@ class BaseDNATask(BaseTask):
     def thread_pool_executor(self) -> ThreadPoolExecutor:
         return og.my_app.get_thread_pool_executor()
     
+    @cached_property
+    def builtin_timelines(self) -> dict:
+        """内置移动路线 `mod/builtin/route_paths.json`，首次使用时加载并编译。"""
+        return load_timelines(os.path.join("mod", "builtin", "route_paths.json"))
+
     @property
     def shared_frame(self) -> np.ndarray:
         return og.my_app.shared_frame
@@ -138,22 +164,39 @@ class BaseDNATask(BaseTask):
             oldest_msg = self.onetime_queue.popleft()
             self.onetime_seen.discard(oldest_msg)
 
+    def next_frame(self):
+        self.detection_cache.invalidate()
+        return super().next_frame()
+
+    def find_one_cached(self, feature_name, threshold: float = 0, box: Box | None = None) -> Box | None:
+        """在当前帧上查找特征，同一帧上相同的查询只做一次模板匹配。"""
+        return self.detection_cache.get(
+            self.frame,
+            (feature_name, box_key(box), threshold),
+            lambda: self.find_one(feature_name, threshold=threshold, box=box),
+        )
+
+    def report_detection_cache(self):
+        stats = self.detection_cache.stats()
+        total = stats['hits'] + stats['misses']
+        if total:
+            self.info_set('检测缓存命中率', f"{stats['hit_rate']:.1%} ({stats['hits']}/{total})")
+
+    def report_action_timing(self, name='', timer=None):
+        stats = (timer or self.action_timer).stats()
+        if stats['count']:
+            text = f"p50 {stats['p50_ms']:.2f}ms / p99 {stats['p99_ms']:.2f}ms"
+            self.info_set('动作延迟', text)
+            logger.debug(f"动作延迟 {name}: {text}, max {stats['max_ms']:.2f}ms, "
+                         f"自旋预算 {stats['spin_budget_ms']:.2f}ms, 动作数 {stats['count']}")
+
     def in_team(self, frame=None) -> bool:
         _frame = self.frame if frame is None else frame
         if self.find_one('lv_text', frame=frame, threshold=0.8):
             return True
-        # start_time = time.perf_counter()
         mat = self.get_feature_by_name("ultimate_key_icon").mat
         mat2 = self.get_box_by_name("ultimate_key_icon").crop_frame(_frame)
-        max_area1 = invert_max_area_only(mat)[2]
-        max_area2 = invert_max_area_only(mat2)[2]
-        result = False
-        if max_area1 > 0:
-            if abs(max_area1 - max_area2) / max_area1 < 0.15:
-                result = True
-        # elapsed = time.perf_counter() - start_time
-        # logger.debug(f"in_team check took {elapsed:.4f} seconds.")
-        return result
+        return self.team_detector.match(mat, mat2)
 
     def in_team_and_world(self):
         return self.in_team()
@@ -178,33 +221,48 @@ class BaseDNATask(BaseTask):
     def find_start_btn(self, threshold: float = 0, box: Box | None = None, template=None) -> Box | None:
         if isinstance(box, Box):
             self.draw_boxes(box.name, box, "blue")
+        if template is None:
+            return self.find_one_cached('start_icon', threshold=threshold, box=box)
         return self.find_one('start_icon', threshold=threshold, box=box, template=template)
 
     def find_cancel_btn(self, threshold: float = 0, box: Box | None = None, template=None) -> Box | None:
         if isinstance(box, Box):
             self.draw_boxes(box.name, box, "blue")
+        if template is None:
+            return self.find_one_cached('cancel_icon', threshold=threshold, box=box)
         return self.find_one('cancel_icon', threshold=threshold, box=box, template=template)
 
     def find_retry_btn(self, threshold: float = 0, box: Box | None = None, template=None) -> Box | None:
         if isinstance(box, Box):
             self.draw_boxes(box.name, box, "blue")
+        if template is None:
+            return self.find_one_cached('retry_icon', threshold=threshold, box=box)
         return self.find_one('retry_icon', threshold=threshold, box=box, template=template)
 
     def find_quit_btn(self, threshold: float = 0, box: Box | None = None, template=None) -> Box | None:
         if isinstance(box, Box):
             self.draw_boxes(box.name, box, "blue")
+        if template is None:
+            return self.find_one_cached('quit_icon', threshold=threshold, box=box)
         return self.find_one('quit_icon', threshold=threshold, box=box, template=template)
 
+    def drop_item_box(self):
+        return self.box_of_screen(0.381, 0.406, 0.713, 0.483, name="drop_rate_item", hcenter=True)
+
     def find_drop_item(self, rates=2000, threshold: float = 0, box: Box | None = None, template=None) -> Box | None:
         if isinstance(box, Box):
             self.draw_boxes(box.name, box, "blue")
         else:
-            box = self.box_of_screen(0.381, 0.406, 0.713, 0.483, name="drop_rate_item", hcenter=True)
+            box = self.drop_item_box()
+        if template is None:
+            return self.find_one_cached(f'drop_item_{str(rates)}', threshold=threshold, box=box)
         return self.find_one(f'drop_item_{str(rates)}', threshold=threshold, box=box, template=template)
 
     def find_not_use_letter_icon(self, threshold: float = 0, box: Box | None = None, template=None) -> Box | None:
         if isinstance(box, Box):
             self.draw_boxes(box.name, box, "blue")
+        if template is None:
+            return self.find_one_cached('not_use_letter', threshold=threshold, box=box)
         return self.find_one('not_use_letter', threshold=threshold, box=box, template=template)
 
     def safe_get(self, key, default=None):
@@ -534,12 +592,11 @@ class BaseDNATask(BaseTask):
         """
         return self.key_config['HelixLeap Key']
         
-    def calculate_sensitivity(self, dx, dy, original_Xsensitivity=1.0, original_Ysensitivity=1.0):
-        """计算玩家水平鼠标移动值和垂直鼠标移动值,并且移动鼠标.
+    def sensitivity_divisor(self, original_Xsensitivity=1.0, original_Ysensitivity=1.0):
+        """计算录制灵敏度换算到游戏灵敏度时，鼠标移动值需要除以的系数.
 
         Returns:
-            int: 玩家水平鼠标移动值
-            int: 玩家垂直鼠标移动值
+            tuple | None: (水平系数, 垂直系数)，不需要换算时为 None
 
         """
         # 判断设置中灵敏度开关是否打开
@@ -549,23 +606,178 @@ class BaseDNATask(BaseTask):
             game_Ysensitivity = self.sensitivity_config['Y-axis sensitivity']
 
             # 判断和计算
-            if original_Xsensitivity == game_Xsensitivity and original_Ysensitivity == game_Ysensitivity:
-                calculate_dx = dx
-                calculate_dy = dy
-            else:
-                calculate_dx = round(dx / (game_Xsensitivity / original_Xsensitivity))
-                calculate_dy = round(dy / (game_Ysensitivity / original_Ysensitivity))
-        else:
-            calculate_dx = dx
-            calculate_dy = dy
+            if original_Xsensitivity != game_Xsensitivity or original_Ysensitivity != game_Ysensitivity:
+                return game_Xsensitivity / original_Xsensitivity, game_Ysensitivity / original_Ysensitivity
+        return None
+
+    def calculate_sensitivity(self, dx, dy, original_Xsensitivity=1.0, original_Ysensitivity=1.0):
+        """计算玩家水平鼠标移动值和垂直鼠标移动值,并且移动鼠标.
+
+        Returns:
+            int: 玩家水平鼠标移动值
+            int: 玩家垂直鼠标移动值
 
-        return calculate_dx, calculate_dy
+        """
+        divisor = self.sensitivity_divisor(original_Xsensitivity, original_Ysensitivity)
+        if divisor is None:
+            return dx, dy
+        return round(dx / divisor[0]), round(dy / divisor[1])
 
     def move_mouse_relative(self, dx, dy, original_Xsensitivity=1.0, original_Ysensitivity=1.0):
         dx, dy = self.calculate_sensitivity(dx, dy, original_Xsensitivity, original_Ysensitivity)
+        self.send_mouse_move(dx, dy)
+
+    def send_mouse_move(self, dx, dy):
+        """按已换算好灵敏度的像素值移动鼠标。"""
         self.try_bring_to_front()
         self.genshin_interaction.move_mouse_relative(int(dx), int(dy))
 
+    def play_macro(self, macro, name='', check_monthly_card=False) -> bool:
+        """在播放线程上播放已绑定的宏。
+
+        输入由播放线程按时间发出，当前线程只负责截图、月卡检查和需要截图的操作（如 reset_and_transport）。
+
+        Returns:
+            bool: 播放完成返回 True，检测到月卡界面而中断时返回 False。
+        """
+        player = self.macro_player
+        player.start(macro)
+        next_monthly_card_check = 0
+        completed = False
+        try:
+            while not player.wait(self.FRAME_FEED_INTERVAL):
+                self.next_frame()
+                self.shared_frame = self.frame
+                self.try_bring_to_front()
+                player.service()
+
+                if check_monthly_card:
+                    now = time.time()
+                    if now >= next_monthly_card_check:
+                        next_monthly_card_check = now + self.MONTHLY_CARD_CHECK_INTERVAL
+                        if self.check_for_monthly_card()[0]:
+                            return False
+            player.raise_error()
+            completed = True
+        finally:
+            player.stop()
+            if not completed:
+                # 中断（包括 TaskDisabledException）或出错时松开播放中按下的键，防止卡键
+                released = self.input_state.release_all()
+                if released:
+                    logger.info(f"播放中断，松开按键: {released}")
+
+        self.report_action_timing(name, player.timer)
+        return True
+
+    def play_timeline(self, timeline: Timeline, hooks=None, key_resolver=None) -> bool:
+        """播放时间轴，片段之间在当前线程执行 hooks 中的等待逻辑。
+
+        Args:
+            timeline: 已编译的时间轴。
+            hooks: {钩子名称: 无参数函数}，与 timeline_hooks 合并。
+            key_resolver: 按键映射，默认为 resolve_macro_key。
+
+        Returns:
+            bool: 全部片段执行完成返回 True，被钩子或播放中止返回 False。
+        """
+        all_hooks = self.timeline_hooks()
+        all_hooks.update(hooks or {})
+        key_resolver = key_resolver or self.resolve_macro_key
+
+        def play(segment):
+            # 按键配置和灵敏度可能在两次运行之间修改，每次播放时绑定
+            program = segment.program
+            macro = program.bind(key_resolver, self.sensitivity_divisor(*program.original_sensitivity))
+            return self.play_macro(macro, f"{timeline.name}/{segment.name}")
+
+        return run_timeline(timeline, play, all_hooks, measure=self.measure_drift)
+
+    def measure_drift(self, segment) -> bool:
+        """在片段开始前测量 track_point，记录偏离录制位置的片段，不转动视角。
+
+        Returns:
+            bool: 是否偏离录制位置，未检测到标记时为 False。
+        """
+        checkpoint = segment.checkpoint
+        x1, y1, x2, y2 = checkpoint.search_region()
+        box = self.box_of_screen_scaled(2560, 1440, 2560 * x1, 1440 * y1, 2560 * x2, 1440 * y2,
+                                        name="checkpoint", hcenter=True)
+        self.next_frame()
+        # 部分任务以不同的签名重写了 find_track_point，这里固定使用基类的实现
+        track_point = BaseDNATask.find_track_point(self, threshold=0.7, box=box)
+        if track_point is None:
+            logger.debug(f"测量点 {segment.name}: 未检测到 track_point")
+            return False
+
+        measured = normalized_position(track_point.x + track_point.width / 2,
+                                       track_point.y + track_point.height / 2, self.width, self.height)
+        offset_x, offset_y = checkpoint.offset(measured)
+        if not checkpoint.drifted(measured):
+            logger.debug(f"测量点 {segment.name}: 偏差 ({offset_x:+.3f}, {offset_y:+.3f})，在允许范围内")
+            return False
+
+        self.drift_detections += 1
+        text = f"{segment.name} 偏差 ({offset_x:+.3f}, {offset_y:+.3f})"
+        logger.info(f"路线漂移 {text}")
+        self.info_set('路线漂移', f"{self.drift_detections} 次, 最近: {text}")
+        return True
+
+    def timeline_hooks(self) -> dict:
+        """所有时间轴都可用的钩子。"""
+        return {}
+
+    def resolve_macro_key(self, key):
+        """把内置路线中的逻辑按键名映射为玩家配置的按键，其余按键原样发送。"""
+        if key == 'dodge':
+            return self.get_dodge_key()
+        elif key == 'interact':
+            return self.get_interact_key()
+        elif key == 'spiral_dive':
+            return self.get_spiral_dive_key()
+        return key
+
+    def dispatch_macro_op(self, op, key, dx, dy):
+        """播放线程的回调，子类可在此记录播放进度。"""
+        if op != OP_DELAY:
+            self.execute_macro_op(op, key, dx, dy)
+
+    def execute_macro_op(self, op, key, dx, dy):
+        """按操作码执行单个动作。"""
+        try:
+            # 窗口前置由播放循环负责，播放线程中只记录状态，由 emit_inputs 发送
+            if op == OP_MOUSE_MOVE:
+                self.input_state.move(dx, dy)
+            elif op == OP_KEY_DOWN:
+                self.input_state.key_down(key)
+            elif op == OP_KEY_UP:
+                self.input_state.key_up(key)
+            elif op == OP_MOUSE_DOWN:
+                self.input_state.mouse_down(key)
+            elif op == OP_MOUSE_UP:
+                self.input_state.mouse_up(key)
+            elif op == OP_RESET_TRANSPORT:
+                self.reset_and_transport()
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except Exception as e:
+            self.log_info(f"执行动作失败 -> type: {OP_NAMES.get(op, op)}, key/btn: {key or 'N/A'}, Error: {e}")
+            raise
+
+    def emit_inputs(self, events):
+        """InputState 的后端，连续发出同一时刻的所有输入。"""
+        for event_type, key, dx, dy in events:
+            if event_type == INPUT_MOUSE_MOVE:
+                self.genshin_interaction.move_mouse_relative(dx, dy)
+            elif event_type == INPUT_KEY_DOWN:
+                self.send_key_down(key)
+            elif event_type == INPUT_KEY_UP:
+                self.send_key_up(key)
+            elif event_type == INPUT_MOUSE_DOWN:
+                self.mouse_down(key=key)
+            else:
+                self.mouse_up(key=key)
+
     def try_bring_to_front(self):
         if not self.hwnd.is_foreground():
             def key_press(key, after_sleep=0):
@@ -4,6 +4,7 @@ from enum import Enum
 from functools import cached_property
 
 from ok import find_boxes_by_name, TaskDisabledException
+from src.scene.MissionScreenClassifier import MissionScreen, MissionScreenClassifier
 from src.tasks.BaseDNATask import BaseDNATask, isolate_white_text_to_black
 from src.tasks.config.CommissionConfig import CommissionConfig
 from src.tasks.config.CommissionSkillConfig import CommissionSkillConfig
@@ -25,6 +26,7 @@ class CommissionsTask(BaseDNATask):
         self.mission_status = None
         self.action_timeout = 15
         self.wave_future = None
+        self.mission_screen_classifier = MissionScreenClassifier(self)
 
     @cached_property
     def commission_config(self):
@@ -47,40 +49,62 @@ class CommissionsTask(BaseDNATask):
     def find_quit_btn(self, threshold=0, box=None):
         if box is None:
             box = self.box_of_screen_scaled(2560, 1440, 729, 960, 854, 1025, name="quit_mission", hcenter=True)
-        return self.find_one("ingame_quit_icon", threshold=threshold, box=box)
+        return self.find_one_cached("ingame_quit_icon", threshold=threshold, box=box)
 
     def find_continue_btn(self, threshold=0, box=None):
         if box is None:
-            box = self.box_of_screen(0.610, 0.671, 0.647, 0.714, name="continue_mission", hcenter=True)
-        return self.find_one("ingame_continue_icon", threshold=threshold, box=box)
+            box = self.continue_box()
+        return self.find_one_cached("ingame_continue_icon", threshold=threshold, box=box)
+
+    def bottom_start_box(self):
+        return self.box_of_screen_scaled(2560, 1440, 2094, 1262, 2153, 1328, name="start_mission", hcenter=True)
+
+    def big_bottom_start_box(self):
+        return self.box_of_screen_scaled(2560, 1440, 1667, 1259, 1728, 1328, name="start_mission", hcenter=True)
+
+    def letter_btn_box(self):
+        return self.box_of_screen_scaled(2560, 1440, 1630, 852, 1884, 920, name="letter_btn", hcenter=True)
+
+    def letter_reward_btn_box(self):
+        return self.box_of_screen_scaled(2560, 1440, 1071, 1160, 1120, 1230, name="letter_reward_btn", hcenter=True)
+
+    def continue_box(self):
+        return self.box_of_screen(0.610, 0.671, 0.647, 0.714, name="continue_mission", hcenter=True)
 
     def find_bottom_start_btn(self, threshold=0):
-        return self.find_start_btn(
-            threshold=threshold, box=self.box_of_screen_scaled(2560, 1440, 2094, 1262, 2153, 1328, name="start_mission",
-                                                               hcenter=True))
+        return self.find_start_btn(threshold=threshold, box=self.bottom_start_box())
 
     def find_big_bottom_start_btn(self, threshold=0):
-        return self.find_start_btn(
-            threshold=threshold, box=self.box_of_screen_scaled(2560, 1440, 1667, 1259, 1728, 1328, name="start_mission",
-                                                               hcenter=True))
+        return self.find_start_btn(threshold=threshold, box=self.big_bottom_start_box())
 
     def find_letter_btn(self, threshold=0):
-        return self.find_start_btn(
-            threshold=threshold, box=self.box_of_screen_scaled(2560, 1440, 1630, 852, 1884, 920, name="letter_btn",
-                                                               hcenter=True))
+        return self.find_start_btn(threshold=threshold, box=self.letter_btn_box())
 
     def find_letter_reward_btn(self, threshold=0):
-        return self.find_start_btn(
-            threshold=threshold, box=self.box_of_screen_scaled(2560, 1440, 1071, 1160, 1120, 1230,
-                                                               name="letter_reward_btn", hcenter=True))
+        return self.find_start_btn(threshold=threshold, box=self.letter_reward_btn_box())
 
     def find_drop_rate_btn(self, threshold=0):
         return self.find_start_btn(
             threshold=threshold, box=self.box_of_screen_scaled(2560, 1440, 1060, 915, 1420, 980, name="drop_rate_btn",
                                                                hcenter=True))
 
+    def get_mission_screen_candidates(self):
+        """任务界面分类器的候选项，顺序即判断优先级，box 为 None 时使用特征自身的位置。"""
+        return [
+            (MissionScreen.LETTER_REWARD, "start_icon", self.letter_reward_btn_box()),
+            (MissionScreen.LETTER, "start_icon", self.letter_btn_box()),
+            (MissionScreen.LETTER, "not_use_letter", None),
+            (MissionScreen.DROP_ITEM, "drop_item_2000", self.drop_item_box()),
+            (MissionScreen.DROP_ITEM, "drop_item_800", self.drop_item_box()),
+            (MissionScreen.START, "retry_icon", None),
+            (MissionScreen.START, "start_icon", self.bottom_start_box()),
+            (MissionScreen.START, "start_icon", self.big_bottom_start_box()),
+            (MissionScreen.CONTINUE, "ingame_continue_icon", self.continue_box()),
+            (MissionScreen.ESC_MENU, "quit_big_icon", None),
+        ]
+
     def find_esc_menu(self, threshold=0):
-        return self.find_one("quit_big_icon", threshold=threshold)
+        return self.find_one_cached("quit_big_icon", threshold=threshold)
 
     def open_in_mission_menu(self, time_out=20, raise_if_not_found=True):
         if self.find_esc_menu():
@@ -129,7 +153,8 @@ class CommissionsTask(BaseDNATask):
 
     def give_up_mission(self, timeout=0):
         def is_mission_start_iface():
-            return self.find_retry_btn() or self.find_bottom_start_btn() or self.find_big_bottom_start_btn() or self.find_continue_btn() or self.find_esc_menu()
+            return self.mission_screen_classifier.classify(
+                screens=(MissionScreen.START, MissionScreen.CONTINUE, MissionScreen.ESC_MENU))[1]
 
         action_timeout = self.action_timeout if timeout == 0 else timeout
         box = self.box_of_screen_scaled(2560, 1440, 1301, 776, 1365, 841, name="give_up_mission", hcenter=True)
@@ -423,26 +448,27 @@ class CommissionsTask(BaseDNATask):
 
         self.check_for_monthly_card()
 
-        if self.find_letter_reward_btn():
+        screen, _ = self.mission_screen_classifier.classify()
+        self.report_detection_cache()
+
+        if screen == MissionScreen.LETTER_REWARD:
             self.log_info("处理任务界面: 选择密函奖励")
             self.choose_letter_reward()
             return
-
-        if self.find_letter_interface():
+        elif screen == MissionScreen.LETTER:
             self.log_info("处理任务界面: 选择密函")
             self.choose_letter()
             return self.get_return_status()
-        elif self.find_drop_item() or self.find_drop_item(800):
+        elif screen == MissionScreen.DROP_ITEM:
             self.log_info("处理任务界面: 选择委托手册")
             self.choose_drop_rate()
             return self.get_return_status()
-
-        if self.find_retry_btn() or self.find_bottom_start_btn() or self.find_big_bottom_start_btn():
+        elif screen == MissionScreen.START:
             self.log_info("处理任务界面: 开始任务")
             self.start_mission()
             self.mission_status = Mission.START
             return
-        elif self.find_continue_btn():
+        elif screen == MissionScreen.CONTINUE:
             if stop_func():
                 self.log_info("处理任务界面: 终止任务")
                 return Mission.STOP
@@ -450,7 +476,7 @@ class CommissionsTask(BaseDNATask):
             self.continue_mission()
             self.mission_status = Mission.CONTINUE
             return
-        elif self.find_esc_menu():
+        elif screen == MissionScreen.ESC_MENU:
             self.log_info("处理任务界面: 放弃任务")
             self.give_up_mission()
             return Mission.GIVE_UP
@@ -471,6 +497,11 @@ class CommissionsTask(BaseDNATask):
         if target_text:
             return True
 
+    def timeline_hooks(self) -> dict:
+        hooks = super().timeline_hooks()
+        hooks['reset_and_transport'] = self.reset_and_transport
+        return hooks
+
     def reset_and_transport(self):
         self.open_in_mission_menu()
         self.wait_until(
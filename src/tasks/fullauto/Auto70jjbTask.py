@@ -118,217 +118,48 @@ class Auto70jjbTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         return super().find_track_point(threshold=0.7, box=box)
     
     def _release_all_move_keys(self):
-        """释放所有移动相关按键，防止卡键"""
-        keys = ['w', 'a', 's', 'd', 'lalt', self.get_dodge_key()]
-        for k in keys:
-            self.send_key_up(k)
+        """释放路线中仍按下的按键，防止卡键"""
+        released = self.input_state.release_all()
+        if released:
+            logger.debug(f"释放按键: {released}")
 
-    def _path_no_elevator(self):
-        """路径逻辑：70皎皎币-无电梯"""
-        self.send_key_down("w")
-        self.sleep(0.1)
-        self.send_key_down("a")
-        self.sleep(0.1)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(2.2)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(2.2)        
-        self.send_key_up("w")
-        self.sleep(1)
-        self.send_key("space", down_time=0.1)
-        self.sleep(1)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.1)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(1.8)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(2.2)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.1)
-        self.send_key_up("a")
-
-        # 检查是否到达
+    def _wave_not_started(self):
+        """检查是否到达，2 秒内没有识别到波次时执行补救片段"""
         start = time.time()
         self.reset_wave_info()
         while self.current_wave == -1 and time.time() - start < 2:
             self.get_wave_info()
             self.sleep(0.2)
-        
-        # 未到达的补救措施
-        if self.current_wave == -1:
-            self.send_key_down('a')
-            self.sleep(0.2)
-            self.send_key_down(self.get_dodge_key())
-            self.sleep(1.5)
-            self.send_key('space', down_time=0.2, after_sleep=1.4)
-            self.send_key_up(self.get_dodge_key())
-            self.sleep(0.1)
-            self.send_key_up('a')
-
-    def _path_elevator_right(self):
-        """路径逻辑：70皎皎币-电梯右"""
-        self.reset_and_transport()
-        self.send_key('s', down_time=0.2, after_sleep=0.2)
-        self.middle_click(after_sleep=0.2)
-        
-        # 重新按住奔跑，防止传送后松开
-        self.send_key_down("lalt") 
-        self.sleep(0.05)
-        
-        self.send_key_down('a')
-        self.sleep(0.2)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(0.4)
-        self.send_key_down('w')
-        self.sleep(0.7)
-        self.send_key_up('lshift') # 原代码有这个，保留
-        self.sleep(0.1)
-        self.send_key_up("a")
-        self.sleep(0.1)
-        
-        self.send_key('space', down_time=0.3, after_sleep=0.2)
-        self.send_key('space', down_time=0.3, after_sleep=0.4)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(2.2)        
-        self.send_key_down('d')
-        self.sleep(0.1)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.2)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.1)
-        self.send_key_up("w")
-        self.sleep(0.7)
-        
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(0.5)
-        self.send_key_down('w')
-        self.sleep(1)
-        self.send_key_up('d')
-        self.sleep(0.7)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.1)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(2.5)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.2)
-        self.send_key_up('w')
-        
-        self._release_all_move_keys()
-        self.reset_and_transport()
-
-    def _path_elevator_left(self):
-        """路径逻辑：70皎皎币-电梯左"""
-        self.reset_and_transport()
-        self.send_key_down("lalt")
-        self.sleep(0.05)
-        self.send_key_down('w')
-        self.sleep(0.2)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(0.6)
-        self.send_key_down("a")
-        self.sleep(0.6)
-        self.send_key_up('a')
-        self.sleep(0.8)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.1)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(2)
-        self.send_key_down("d")
-        self.sleep(1)
-        self.send_key_up('d')
-        self.sleep(0.8)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.1)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.8)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(1)
-        self.send_key_down("d")
-        self.sleep(0.5)
-        self.send_key_up('d')
-        self.sleep(3.6) # 长时间滑行
-        
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.2)
-        self.send_key_up('w')
-
-        self._release_all_move_keys()
-        self.reset_and_transport()
-
-    def _path_elevator_center(self):
-        """路径逻辑：70皎皎币-电梯中"""
-        self.reset_and_transport()
-        self.send_key_down("lalt")
-        self.sleep(0.05)
-        self.send_key_down('w')
-        self.sleep(0.2)
-        self.send_key_down('d')
-        self.sleep(0.2)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(0.7)
-        self.send_key_up('w')
-        self.sleep(1.2)
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.2)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(0.4)
-        self.send_key_down('s')
-        self.sleep(0.3)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(0.4)
-        self.send_key_up('s')
-        self.sleep(1)
-        self.send_key(self.get_dodge_key(), down_time=0.2)
-        self.sleep(2) # 这里等待较长
-        self.send_key_up(self.get_dodge_key())
-        self.sleep(0.1)
-        self.send_key_up('d')
+        return self.current_wave == -1
 
-        self._release_all_move_keys()
-        self.reset_and_transport()
+    def _play_route(self, name):
+        """播放 route_paths.json 中的路线"""
+        self.play_timeline(self.builtin_timelines[name], hooks={'wave_not_started': self._wave_not_started})
 
     def walk_to_aim(self, delay=0):
         """
         主寻路函数：根据识别到的坐标选择路径
         """
         try:
-            self.send_key_down("lalt")
+            self.input_state.key_down("lalt")
             self.sleep(delay)
 
             # 使用 if-elif 结构，优先级清晰，且只执行一个分支
             if self.find_track_point(0.20, 0.54, 0.22, 0.59):
                 # 分支1：无电梯
-                self._path_no_elevator()
+                self._play_route('jjb70_no_elevator')
                 
             elif self.find_track_point(0.66, 0.67, 0.69, 0.72):
                 # 分支2：电梯右
-                self._path_elevator_right()
+                self._play_route('jjb70_elevator_right')
                 
             elif self.find_track_point(0.32, 0.67, 0.35, 0.73):
                 # 分支3：电梯左
-                self._path_elevator_left()
+                self._play_route('jjb70_elevator_left')
                 
             elif self.find_track_point(0.50, 0.71, 0.53, 0.76):
                 # 分支4：电梯中
-                self._path_elevator_center()
+                self._play_route('jjb70_elevator_center')
 
         except Exception as e:
             logger.error("Error in walk_to_aim", e)
@@ -4,6 +4,7 @@ import json
 import os
 
 from ok import Logger, TaskDisabledException
+from src.macro.Timeline import Timeline
 from src.tasks.DNAOneTimeTask import DNAOneTimeTask
 from src.tasks.BaseCombatTask import BaseCombatTask
 from src.tasks.CommissionsTask import CommissionsTask, Mission
@@ -36,7 +37,13 @@ class AutoEscortTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
 
         # 在初始化时加载路径数据
         self.escort_paths = self._load_escort_paths()
-        self.escort_actions = self.escort_paths.get("ESCORT_PATH_A", {}).get("data", [])
+        # 路径在加载时按 f 键切分并编译，执行时不再解析动作
+        self.escort_timelines = {
+            name: Timeline.from_relative(name, path.get("data", []),
+                                         checkpoint=path.get("metadata", {}).get("checkpoint"))
+            for name, path in self.escort_paths.items()
+        }
+        self.escort_timeline = self.escort_timelines.get("ESCORT_PATH_A")
 
         # 缓存 GenshinInteraction 实例，避免重复创建
         self._genshin_interaction = None
@@ -133,9 +140,7 @@ class AutoEscortTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
                     self.info_set("当前阶段", "执行初始路径")
 
                     # 先执行初始路径（使用相对时间版本）
-                    self.escort_actions = self.escort_paths.get(
-                        "ESCORT_PATH_A", {}
-                    ).get("data", [])
+                    self.escort_timeline = self.escort_timelines.get("ESCORT_PATH_A")
                     success = self.execute_escort_path()
 
                     # 如果初始路径执行失败，等待退出队伍并重新开始
@@ -157,10 +162,10 @@ class AutoEscortTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
                     self.stats["current_phase"] = "检测路径"
                     self.info_set("当前阶段", "检测路径")
                     logger.info("检测 track_point 位置，选择护送路径...")
-                    self.escort_actions = self.select_escort_path_by_position()
+                    self.escort_timeline = self.select_escort_path_by_position()
 
                     # 如果检测失败返回 None，说明已经调用了 give_up_mission，等待退出队伍
-                    if self.escort_actions is None:
+                    if self.escort_timeline is None:
                         logger.warning("路径选择失败，等待退出队伍...")
                         self.stats["failed_attempts"] += 1
                         self.info_set("失败次数", self.stats["failed_attempts"])
@@ -279,7 +284,7 @@ class AutoEscortTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         - 路径4: (2898, 688)
 
         Returns:
-            选择的路径动作列表
+            选择的路径时间轴
         """
         # 定义 3840x2160 分辨率下的参考点
         reference_points = {
@@ -344,16 +349,9 @@ class AutoEscortTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
             self.stats["selected_path"] = selected_path
 
             # 返回对应的路径
-            path_map = {
-                1: self.escort_paths.get("ESCORT_PATH_A_1", {}).get("data", []),
-                2: self.escort_paths.get("ESCORT_PATH_A_2", {}).get("data", []),
-                3: self.escort_paths.get("ESCORT_PATH_A_3", {}).get("data", []),
-                4: self.escort_paths.get("ESCORT_PATH_A_4", {}).get("data", []),
-            }
-
-            return path_map.get(
-                selected_path,
-                self.escort_paths.get("ESCORT_PATH_A_1", {}).get("data", []),
+            return self.escort_timelines.get(
+                f"ESCORT_PATH_A_{selected_path}",
+                self.escort_timelines.get("ESCORT_PATH_A_1"),
             )
 
         except Exception as e:
@@ -362,120 +360,21 @@ class AutoEscortTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
             return None
 
     def execute_escort_path(self):
-        """执行护送路径中的所有动作，遇到 f 键时等待 AutoMazeTask 完成
+        """执行护送路径中的所有片段，含 f 键的片段结束后等待 AutoMazeTask 完成
 
         Returns:
             bool: True=成功完成, False=失败需要重新开始
         """
-        if not self.escort_actions:
+        timeline = self.escort_timeline
+        if not timeline:
             logger.warning("没有加载护送路径，跳过移动")
             return True
 
-        logger.info(f"开始执行护送路径，共 {len(self.escort_actions)} 个动作")
-
-        # 将路径按 f 键拆分成多个片段
-        path_segments = self.split_path_by_f_key()
-
-        for segment_idx, segment in enumerate(path_segments):
-            logger.info(f"执行路径片段 {segment_idx + 1}/{len(path_segments)}")
-
-            # 如果前一个片段有 f 键（刚完成解密等待），跳过当前片段第一个动作的 delay
-            skip_first_delay = segment_idx > 0 and self.segment_has_f_key(
-                path_segments[segment_idx - 1]
-            )
-
-            self.execute_path_segment(segment, skip_first_delay=skip_first_delay)
-
-            # 如果这个片段包含 f 键，等待 AutoMazeTask 完成解密
-            if self.segment_has_f_key(segment):
-                logger.info("检测到 f 键，等待 AutoMazeTask 完成解密...")
-                success = self.wait_for_puzzle_completion()
-                if not success:
-                    # 解密失败，需要重新开始任务
-                    return False
-
-        logger.info("护送路径执行完成")
-        return True
-
-    def split_path_by_f_key(self):
-        """将路径按 f 键拆分成多个片段"""
-        segments = []
-        current_segment = []
-
-        for action in self.escort_actions:
-            current_segment.append(action)
-
-            # 检测到 key_up "f" 作为一个片段的结束
-            if action.get("type") == "key_up" and action.get("key") == "f":
-                segments.append(current_segment)
-                current_segment = []
-
-        # 如果还有剩余动作，添加为最后一个片段
-        if current_segment:
-            segments.append(current_segment)
-
-        return segments if segments else [self.escort_actions]
-
-    def segment_has_f_key(self, segment):
-        """检查片段是否包含 f 键"""
-        for action in segment:
-            if (
-                action.get("type") in ["key_down", "key_up"]
-                and action.get("key") == "f"
-            ):
-                return True
-        return False
-
-    def execute_path_segment(self, segment, skip_first_delay=False):
-        """执行单个路径片段（使用相对时间）
-
-        新格式：每个动作包含 delay 字段（距离上一个动作的时间间隔）
-        这样在解密等待后，后续动作可以立即继续，不会因为绝对时间错位
-
-        Args:
-            segment: 路径片段（动作列表）
-            skip_first_delay: 是否跳过第一个动作的 delay（解密等待后使用）
-        """
-        for i, action in enumerate(segment):
-            action_type = action.get("type")
-            delay = action.get("delay", 0)
-
-            # 如果是第一个动作且需要跳过 delay，则不等待
-            if i == 0 and skip_first_delay:
-                logger.debug(
-                    f"跳过片段首个动作的 delay ({delay:.3f}s)，解密等待已消耗此时间"
-                )
-                delay = 0
-
-            # 等待指定的延迟时间（使用高精度等待）
-            target = time.perf_counter() + delay
-            if delay > 0.02:
-                self.sleep(delay - 0.02)
-
-            while time.perf_counter() < target:
-                pass
-
-            # 执行不同类型的动作
-            if action_type == "mouse_rotation":
-                self.execute_mouse_rotation(action)
-            elif action_type == "mouse_down":
-                button = action.get("button", "left")
-                self.mouse_down(key=button)
-                logger.debug(f"按下鼠标: {button}")
-            elif action_type == "mouse_up":
-                button = action.get("button", "left")
-                self.mouse_up(key=button)
-                logger.debug(f"释放鼠标: {button}")
-            elif action_type == "key_down":
-                key = action.get("key")
-                self.send_key_down(key)
-                logger.debug(f"按下键: {key}")
-            elif action_type == "key_up":
-                key = action.get("key")
-                self.send_key_up(key)
-                logger.debug(f"释放键: {key}")
-            else:
-                logger.warning(f"未知动作类型: {action_type}")
+        logger.info(f"开始执行护送路径 {timeline.name}，共 {len(timeline)} 个片段")
+        success = self.play_timeline(timeline, hooks={"puzzle": self.wait_for_puzzle_completion})
+        if success:
+            logger.info("护送路径执行完成")
+        return success
 
     def wait_for_puzzle_completion(self, timeout=10):
         """等待 AutoMazeTask 完成解密
@@ -507,32 +406,3 @@ class AutoEscortTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         logger.warning(f"❌ 等待解密完成超时（{timeout}秒），重新开始任务...")
         self.give_up_mission()
         return False
-
-    def execute_mouse_rotation(self, action):
-        """执行鼠标视角旋转动作
-
-        使用 GenshinInteraction 的 move_mouse_relative 方法进行相对鼠标移动
-        注意：PostMessageInteraction 不支持相对移动，需要使用 GenshinInteraction
-        """
-        direction = action.get("direction", "up")
-        angle = action.get("angle", 0)
-        sensitivity = action.get("sensitivity", 10)
-
-        # 根据 escort-A.py 的计算方式：pixels = angle * sensitivity
-        pixels = angle * sensitivity
-
-        # 计算移动方向
-        if direction == "left":
-            dx, dy = -pixels, 0
-        elif direction == "right":
-            dx, dy = pixels, 0
-        elif direction == "up":
-            dx, dy = 0, -pixels
-        elif direction == "down":
-            dx, dy = 0, pixels
-        else:
-            logger.warning(f"未知的鼠标方向: {direction}")
-            return
-        
-        self.move_mouse_relative(dx, dy)
-        logger.debug(f"鼠标视角旋转: {direction}, 角度: {angle}, 像素: {pixels}")
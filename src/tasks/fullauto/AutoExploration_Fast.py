@@ -134,102 +134,25 @@ class AutoExploration_Fast(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
     def execute_elevator_map(self):
         """执行探险电梯地图的移动逻辑"""
         self.log_info("执行探险电梯地图移动")
-        self.reset_and_transport()
-        self.send_key_down("lalt")
-        self.sleep(0.05)
-        self.send_key_down("a")
-        self.sleep(0.1)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(0.8)
-        self.send_key(self.get_dodge_key(), down_time=0.2,after_sleep=0.8)
-        self.send_key(self.get_dodge_key(), down_time=0.2,after_sleep=1.6)
-        self.send_key_down("s")
-        self.send_key_up("a")
-        self.sleep(0.3)
-        self.send_key("space", down_time=0.1,after_sleep=0.4)
-        self.send_key("space", down_time=0.1,after_sleep=0.4)
-        self.send_key("space", down_time=0.1,after_sleep=0.7)
-        self.send_key_up(self.get_dodge_key())
-        self.send_key_up("s")
-        self.sleep(0.6)
-        self.send_key(self.get_interact_key(), down_time=0.1,after_sleep=0.8)
-        if not self.try_solving_puzzle():
-            return True
-        # self.send_key_down("a")
-        # self.sleep(0.1)
-        # self.send_key(self.get_dodge_key(), down_time=0.2,after_sleep=0.6)
-        # self.send_key_down(self.get_dodge_key())
-        # self.sleep(0.9)
-        # self.send_key_down("w")
-        # self.sleep(0.2)
-        # self.send_key_up("a")
-        # self.sleep(0.1)
-        # self.send_key_up(self.get_dodge_key())
-        # self.send_key_up("w")
-        # self.sleep(0.2)
-        self.send_key_up("lalt")
+        self._play_route("exploration_elevator")
         return True
-    
+
     def execute_platform_map(self):
         """执行探险高台地图的移动逻辑"""
         self.log_info("执行探险高台地图移动")
-        self.send_key_down("lalt")
-        self.sleep(0.05)
-        self.send_key_down("w")
-        self.sleep(0.1)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(1.2)
-        self.send_key(self.get_dodge_key(),  down_time=0.2,after_sleep=0.3)
-        self.send_key_down(self.get_dodge_key())
-        self.sleep(0.1)
-        self.send_key_down("a")
-        self.sleep(0.1)
-        self.send_key("space", down_time=0.1,after_sleep=0.1)
-        self.send_key(self.get_dodge_key(),  down_time=0.2,after_sleep=0.3)
-        self.send_key("space", down_time=0.1,after_sleep=0.7)
-        self.send_key_up(self.get_dodge_key())
-        self.send_key_up("w")
-        self.sleep(0.1)
-        self.send_key_up("a")
-        self.sleep(0.6)
-        self.send_key(self.get_interact_key(), down_time=0.1,after_sleep=0.8)
-        if not self.try_solving_puzzle():
-            return True
-        self.send_key_down("d")
-        self.sleep(0.1)
-        self.send_key(self.get_dodge_key(),  down_time=0.2)
-        self.sleep(0.1)
-        self.send_key_up("d")
-        self.sleep(0.1)
-        self.send_key_down("s")
-        self.sleep(0.1)
-        self.send_key_up(self.get_dodge_key())
-        self.send_key_up("s")
-        self.sleep(0.2)
-        self.middle_click()
-        self.send_key_up("lalt")
+        self._play_route("exploration_platform")
         return True
-    
+
     def execute_ground_map(self):
         """执行探险平地地图的移动逻辑"""
         self.log_info("执行探险平地地图移动")
-        self.reset_and_transport()
-        self.send_key_down("lalt")
-        self.sleep(0.05)
-        self.send_key_down("a")
-        self.sleep(0.1)
-        self.send_key(self.get_dodge_key(), down_time=1.1)
-        self.send_key_up("a")
-        self.sleep(0.6)
-        self.send_key(self.get_interact_key(), down_time=0.1,after_sleep=0.8)
-        if not self.try_solving_puzzle():
-            return True
-        self.send_key('d',down_time=0.8,after_sleep=0.1)
-        self.middle_click()
-        self.send_key_up("lalt")
+        self._play_route("exploration_ground")
         return True
-            
-            
+
+    def _play_route(self, name):
+        """播放 route_paths.json 中的路线，解密失败时不再执行后续片段"""
+        self.play_timeline(self.builtin_timelines[name], hooks={'puzzle': self.try_solving_puzzle})
+
     def find_track_point(self, x1, y1, x2, y2) -> bool:
         box = self.box_of_screen_scaled(2560, 1440, 2560*x1, 1440*y1, 2560*x2, 1440*y2, name="find_track_point", hcenter=True)
         result = super().find_track_point(threshold=0.7, box=box)
@@ -1,8 +1,8 @@
 from qfluentwidgets import FluentIcon
 import time
-import cv2
 
 from ok import Logger, TaskDisabledException
+from src.scene.FishBarDetector import FishBarDetector
 from src.tasks.BaseDNATask import BaseDNATask
 from src.tasks.DNAOneTimeTask import DNAOneTimeTask
 
@@ -24,6 +24,7 @@ class AutoFishTask(DNAOneTimeTask, BaseDNATask):
         self.description = "无悠闲全自动钓鱼 (原作者: B站无敌大蜜瓜)"
         self.group_name = "全自动"
         self.group_icon = FluentIcon.CAFE
+        self.fish_detector = FishBarDetector(self.BAR_MIN_AREA, self.ICON_MIN_AREA, self.ICON_MAX_AREA)
 
         # 默认配置（会被 configs/AutoFishTask.json 覆盖）
         self.default_config.update({
@@ -125,81 +126,10 @@ class AutoFishTask(DNAOneTimeTask, BaseDNATask):
             res_ratio = frame_height / 1080
             roi_img = box.crop_frame(self.frame)
 
-            # 转换为灰度图
-            gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY)
-
-            # 二值化：提取亮色区域（鱼条和图标都是白色/亮色）
-            _, scene_bin = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
-
-            # 查找轮廓
-            contours, _ = cv2.findContours(scene_bin, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-
-            # 收集所有符合最小面积的轮廓
-            blobs = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > self.ICON_MIN_AREA * res_ratio ** 2:
-                    blobs.append({"contour": contour, "area": area})
-
-            # 按面积降序排列
-            blobs.sort(key=lambda b: b["area"], reverse=True)
-
-            # Debug only
-            # output_img = roi_img.copy()
-            # colors = [
-            #     (0, 0, 255),     # 红
-            #     (0, 255, 0),     # 绿
-            #     (255, 0, 0),     # 蓝
-            #     (0, 255, 255),   # 黄
-            #     (255, 0, 255),   # 紫
-            #     (255, 255, 0),   # 青
-            #     (255, 255, 255), # 白
-            # ]
-            # for i, blob in enumerate(blobs):
-            #     color = colors[i % len(colors)]  # 超过列表长度循环使用
-            #     cv2.drawContours(output_img, [blob["contour"]], -1, color, 2)
-            # Debug only
-
-            has_bar = has_icon = False
-            bar_center = bar_rect = icon_center = icon_rect = None
-            bar_area = icon_area = 0.0
-
-            # 查找鱼条（最大的符合条件的轮廓）
-            for blob in blobs:
-                if blob["area"] > self.BAR_MIN_AREA * res_ratio ** 2:
-                    contour = blob["contour"]
-                    moments = cv2.moments(contour)
-                    if moments["m00"] > 0:
-                        has_bar = True
-                        bar_area = blob["area"]
-                        # 注意：这里是 ROI 内部坐标，不加 box_x1, box_y1
-                        bar_center = (
-                            int(moments["m10"] / moments["m00"]),
-                            int(moments["m01"] / moments["m00"]),
-                        )
-                        x, y, w, h = cv2.boundingRect(contour)
-                        # 矩形也是 ROI 内部坐标
-                        bar_rect = (x, y, x + w, y + h)
-                    break
-
-            # 查找鱼标（第二大的符合条件的轮廓，排除鱼条）
-            for blob in blobs:
-                if blob["area"] == bar_area:
-                    continue
-                if self.ICON_MIN_AREA * res_ratio ** 2 < blob["area"] < self.ICON_MAX_AREA * res_ratio ** 2:
-                    contour = blob["contour"]
-                    moments = cv2.moments(contour)
-                    if moments["m00"] > 0:
-                        has_icon = True
-                        icon_area = blob["area"]
-                        # ROI 内部坐标
-                        icon_center = (
-                            int(moments["m10"] / moments["m00"]),
-                            int(moments["m01"] / moments["m00"]),
-                        )
-                        x, y, w, h = cv2.boundingRect(contour)
-                        icon_rect = (x, y, x + w, y + h)
-                    break
+            # 按行投影找出亮色区域（鱼条和图标都是白色/亮色），与鱼条同行时改用轮廓，坐标均为 ROI 内部坐标
+            bar, icon = self.fish_detector.detect(roi_img, res_ratio)
+            has_bar, bar_center, bar_rect, bar_area = bar
+            has_icon, icon_center, icon_rect, icon_area = icon
 
             if has_bar:
                 zone_ratio = bar_area / box.area()
@@ -208,11 +138,6 @@ class AutoFishTask(DNAOneTimeTask, BaseDNATask):
                     self.CONTROL_ZONE_RATIO = zone_ratio
                     self.log_info(f"set CONTROL_ZONE_RATIO {self.CONTROL_ZONE_RATIO}")
 
-            # Debug only
-            # cv2.imshow("Contours", output_img)
-            # cv2.waitKey(1)
-            # Debug only
-
             # 更新统计信息
             self.stats.update({
                 "last_bar_found": has_bar,
@@ -9,7 +9,19 @@ from functools import cached_property
 
 from pathlib import Path
 from PIL import Image
-from ok import Logger, TaskDisabledException, GenshinInteraction
+from ok import Logger, TaskDisabledException, GenshinInteraction, og
+from src.macro.CompiledMacro import OP_CHECKPOINT, OP_DELAY, OP_F_DOWN, OP_F_UP, MacroProgram, compile_script
+from src.macro.MacroOptimizer import MacroOptimizer, format_report
+from src.route.DescriptorIndex import DescriptorIndex
+from src.route.MapWatcher import MapWatcher
+from src.route.ModCache import ModCache
+from src.route.ModPackage import PACKAGE_SUFFIX, ModPackage, is_package
+from src.route.RouteStats import RouteStats
+from src.route.RouteTree import RouteTree
+from src.route.ScaleCalibrator import ScaleCalibrator, candidate_scales, recorded_height, rescale
+from src.route.TemplateMatcher import TemplateMatcher
+from src.route.TemplateStore import TemplateStore
+from src.scene.MissionScreenClassifier import search_region
 from src.tasks.DNAOneTimeTask import DNAOneTimeTask
 from src.tasks.CommissionsTask import CommissionsTask, Mission, QuickAssistTask
 from src.tasks.BaseCombatTask import BaseCombatTask
@@ -20,14 +32,27 @@ from src.tasks.AutoExploration import AutoExploration
 
 logger = Logger.get_logger(__name__)
 
+MATCH_BACKENDS = {"自动": "auto", "空间域": "spatial", "频域": "fft"}
+
+
+def sort_map_names(png_files):
+    return {key: png_files[key] for key in sorted(png_files.keys(), key=lambda x: (len(x), x))}
+
 
 class MacroFailedException(Exception):
     """外部脚本失败异常。"""
     pass
 
 
+class CheckpointFailedException(MacroFailedException):
+    """脚本中的校验点未通过，说明路线已经走偏。"""
+    pass
+
+
 class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
 
+    CALIBRATION_TEMPLATES = 3
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.icon = FluentIcon.FLAG
@@ -44,6 +69,17 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
             '外部文件夹': "",
             '副本类型': "默认",
             '关闭抖动': False,
+            '金字塔匹配': True,
+            '匹配线程数': 1,
+            '提前接受阈值': 0.9,
+            '位置先验': True,
+            '匹配后端': "自动",
+            '预处理缓存': True,
+            '优化脚本': False,
+            '空闲压缩阈值': 2.0,
+            '模板内存上限': 256,
+            '根节点候选数': 3,
+            '分辨率自适应': True,
             # '使用内建机关解锁': False,
         })
         self.config_type['外部文件夹'] = {
@@ -51,6 +87,11 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
             "options": self.load_direct_folder(fr'{Path.cwd()}\mod'),
         }
 
+        self.config_type['匹配后端'] = {
+            "type": "drop_down",
+            "options": list(MATCH_BACKENDS),
+        }
+
         self.config_type['副本类型'] = {
             "type": "drop_down",
             "options": ["默认", "扼守无尽", "探险无尽"],
@@ -58,14 +99,39 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
 
         self.config_description.update({
             '轮次': '如果是无尽关卡，选择打几个轮次',
-            '外部文件夹': '选择mod目录下的外部逻辑',
+            '外部文件夹': '选择mod目录下的外部逻辑文件夹或.okmod包（python -m src.route.ModPackage <文件夹> 打包）',
             '关闭抖动': '使用飞枪等存在视角移动的外部逻辑时可以启用',
+            '金字塔匹配': '先在缩小的画面上粗匹配地图，再在原分辨率下精确匹配，显著降低CPU占用',
+            '匹配线程数': '候选地图较多时并行匹配，1为顺序匹配，建议不超过CPU核心数',
+            '提前接受阈值': '按历史路线顺序匹配地图，置信度达到此值时不再匹配其余候选，0为关闭',
+            '位置先验': '优先在地图上次出现的位置附近搜索，置信度不足时再搜索全屏',
+            '匹配后端': '自动：大模板使用频域匹配，其余使用空间域匹配',
+            '预处理缓存': '把转为灰度的地图和解析后的脚本缓存在外部逻辑的.cache目录，只重新处理修改过的文件',
+            '优化脚本': '加载前合并连续的鼠标移动、去除重复按键、压缩空闲等待，原脚本保留为.json.orig',
+            '空闲压缩阈值': '没有按住任何键时，超过此秒数的空闲等待缩短为此秒数',
+            '模板内存上限': '地图模板按需加载，常驻内存超过此大小(MB)时释放最久未用的模板，0为不限制',
+            '根节点候选数': '根节点较多时先用缩略图粗筛出最相似的几个再精确匹配，都未达到提前接受阈值时再匹配其次的几个，0为关闭',
+            '分辨率自适应': '与录制分辨率（从文件夹名称识别，如1080p）不同时，第一次匹配时校准并缩放地图模板，缩放结果缓存在磁盘',
             # '使用内建解密': '使用ok内建解密功能',
         })
 
         self.skill_tick = self.create_skill_ticker()
         self.action_timeout = 10
         self.quick_assist_task = QuickAssistTask(self)
+        self.template_matcher = TemplateMatcher()
+        self.route_stats = RouteStats()
+        self.last_match_conf = 0.0
+        self.programs = {}
+        self.bound_macros = {}
+        self.playing_index = None
+        self.use_location_prior = True
+        self.checkpoint_failures = 0
+        self.root_index = None
+        self.mod_path = None
+        self.mod_package = None
+        self.scale_calibrator = None
+        self.map_watcher = MapWatcher(self.match_delayed_node, lambda: self.shared_frame,
+                                      is_paused=lambda: self.executor.paused)
 
     def run(self):
         if self.config.get('关闭抖动', False):
@@ -76,8 +142,26 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         self.set_check_monthly_card()
         try:
             path = Path.cwd()
-            self.script = self.process_json_files(fr'{path}\mod\{self.config.get("外部文件夹")}\scripts')
-            self.img = self.load_png_files(fr'{path}\mod\{self.config.get("外部文件夹")}\map')
+            mod_path = fr'{path}\mod\{self.config.get("外部文件夹")}'
+            self.mod_path = mod_path
+            if is_package(mod_path):
+                self.load_package(mod_path)
+            else:
+                if self.config.get('优化脚本', False):
+                    self.optimize_scripts(mod_path)
+                self.mod_package = None
+                self.script, self.img = self.load_mod(mod_path)
+                self.compile_scripts()
+                self.load_compiled_scripts(fr'{mod_path}\scripts')
+            self.route_stats = self.load_route_stats(mod_path)
+            self.template_matcher = TemplateMatcher(
+                pyramid=self.config.get('金字塔匹配', True),
+                backend=MATCH_BACKENDS.get(self.config.get('匹配后端'), 'auto'))
+            self.use_location_prior = self.config.get('位置先验', True)
+            self.script_tree = RouteTree(self.mod_package.scripts if self.mod_package is not None else self.programs)
+            self.map_tree = RouteTree(self.img)
+            self.root_index = self.build_root_index()
+            self.scale_calibrator = self.create_scale_calibrator(mod_path)
             if self.config.get('副本类型') == '扼守无尽':
                 _to_do_task = self.get_task_by_class(AutoDefence)
             elif self.config.get('副本类型') == '探险无尽':
@@ -97,6 +181,7 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
             logger.error('AutoDefence error', e)
             raise
         finally:
+            self.map_watcher.stop()
             if self.config.get('关闭抖动', False):
                 self.afk_config.update({"鼠标抖动": mouse_jitter_setting})
             if _to_do_task is not self:
@@ -110,6 +195,7 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
             self.sleep(0.5)
         while True:
             if self.in_team():
+                self.shared_frame = self.frame
                 self.get_wave_info()
                 if self.current_wave != -1:
                     if self.current_wave != self.runtime_state["wave"]:
@@ -120,9 +206,14 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
                     self.give_up_mission()
                     continue
                 if self.delay_index is not None and time.time() > self.runtime_state["delay_task_start"]:
-                    self.runtime_state["delay_task_start"] += 1
-                    if self.match_map(self.delay_index):
-                        self.walk_to_aim(self.delay_index)
+                    # 延迟节点的子节点在后台线程匹配，主循环只在匹配到时接着寻路
+                    self.map_watcher.watch(self.delay_index)
+                    matched = self.map_watcher.take()
+                    if matched is not None:
+                        # 直接使用后台匹配到的节点，不再重新匹配一次
+                        self.walk_to_aim(self.delay_index, matched=matched)
+                else:
+                    self.map_watcher.stop()
             _status = self.handle_mission_interface(stop_func=self.stop_func)
             if _status == Mission.START or _status == Mission.STOP:
                 if _status == Mission.STOP:
@@ -146,6 +237,7 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
 
     def init_all(self):
         self.init_for_next_round()
+        self.map_watcher.stop()
         self.delay_index = None
         self.skill_tick.reset()
         self.current_round = 0
@@ -170,26 +262,93 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
             item_path = os.path.join(path, item)
             if any(keyword in item_path for keyword in excluded_keywords):
                 continue
-            if os.path.isdir(item_path):
+            if os.path.isdir(item_path) or item.lower().endswith(PACKAGE_SUFFIX):
                 folders.append(item)
         return folders
 
+    def load_package(self, mod_path):
+        """打开单文件外部逻辑包，只读取 zip 目录和 manifest，地图模板和脚本都在用到时才按偏移读取。"""
+        start = time.perf_counter()
+        self.script, self.img = {}, {}
+        self.mod_package = ModPackage(mod_path)
+        self.img = self.load_maps(mod_path)
+        self.programs = {}
+        self.bound_macros = {}
+        if self.config.get('优化脚本', False):
+            self.log_info("外部逻辑包中的脚本已编译，请在打包前优化脚本")
+        self.log_info(f"加载外部逻辑包: 脚本 {len(self.mod_package.scripts)} 个, 地图 {len(self.img)} 个, "
+                      f"耗时 {time.perf_counter() - start:.2f}s")
+
+    def load_route_stats(self, mod_path):
+        """外部逻辑包的路线统计保存在包旁边的 `<包名>.route_stats.json`。"""
+        if not is_package(mod_path):
+            return RouteStats.for_folder(mod_path)
+        route_stats = RouteStats(f'{mod_path[:-len(PACKAGE_SUFFIX)]}.{RouteStats.FILENAME}')
+        route_stats.load()
+        return route_stats
+
+    def load_mod(self, mod_path):
+        """加载外部逻辑的脚本和地图，启用缓存时只重新处理变化过的文件。"""
+        # 先释放上一次加载的内存映射，缓存文件才能被覆盖
+        self.script, self.img = {}, {}
+        if not self.config.get('预处理缓存', True):
+            return self.process_json_files(fr'{mod_path}\scripts'), self.load_maps(mod_path)
+
+        start = time.perf_counter()
+        mod_cache = ModCache(mod_path)
+        script = mod_cache.load_scripts(self.load_json_file)
+        if not os.path.exists(fr'{mod_path}\map'):
+            self.log_info(f"文件夹 '{mod_path}\\map' 不存在，将执行无图匹配逻辑。")
+        img = self.load_maps(mod_path, mod_cache=mod_cache)
+        self.log_info(f"加载外部逻辑: 脚本 {len(script)} 个, 地图 {len(img)} 个, "
+                      f"重新处理 {len(mod_cache.rebuilt)} 个文件, 耗时 {time.perf_counter() - start:.2f}s")
+        return script, img
+
+    def optimize_scripts(self, mod_path):
+        """离线优化外部逻辑的脚本并报告每条路线节省的时间。"""
+        optimizer = MacroOptimizer(idle_floor=self.config.get('空闲压缩阈值', 2.0))
+        total_saved = 0.0
+        for report in optimizer.optimize_folder(mod_path):
+            total_saved += report['saved']
+            logger.info(f"脚本优化 {format_report(report)}")
+        self.info_set('脚本优化', f"全部路线合计节省 {total_saved:.2f}s")
+
     def process_json_files(self, folder_path):
         json_files = {}
         for filename in os.listdir(folder_path):
             if filename.endswith('.json'):
-                file_path = os.path.join(folder_path, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        json_files[filename.removesuffix(".json")] = data
-                        self.log_info(f"成功加载: {file_path}")
-                except Exception as e:
-                    self.log_info(f"加载失败 {file_path}: {e}")
+                data = self.load_json_file(os.path.join(folder_path, filename))
+                if data is not None:
+                    json_files[filename.removesuffix(".json")] = data
 
         return json_files
 
-    def load_png_files(self, folder_path):
+    def load_json_file(self, file_path):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                self.log_info(f"成功加载: {file_path}")
+                return data
+        except Exception as e:
+            self.log_info(f"加载失败 {file_path}: {e}")
+
+    def template_store(self, sources):
+        """地图模板按需加载，淘汰时同时丢弃匹配器中由模板派生的缓存。"""
+        return TemplateStore(sources, budget_mb=self.config.get('模板内存上限', 256),
+                             on_evict=lambda name: self.template_matcher.forget(name))
+
+    def load_maps(self, mod_path, scale=1.0, mod_cache=None):
+        """按需加载的地图模板，scale 不为 1 时使用缩放后的模板（启用预处理缓存时缓存在磁盘）。"""
+        if self.mod_package is not None:
+            # 包内的模板直接内存映射，缩放后的模板只保留在内存中
+            return self.template_store(sort_map_names(self.mod_package.map_sources(scale)))
+        if not self.config.get('预处理缓存', True):
+            return self.template_store(self.png_sources(fr'{mod_path}\map', scale))
+        mod_cache = mod_cache or ModCache(mod_path)
+        return self.template_store(sort_map_names(mod_cache.map_sources(self.load_png_file, scale=scale)))
+
+    def png_sources(self, folder_path, scale=1.0):
+        """不使用预处理缓存时，每个地图模板直接从 PNG 加载。"""
         png_files = {}
 
         if not os.path.exists(folder_path):
@@ -199,40 +358,105 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         for filename in os.listdir(folder_path):
             if filename.lower().endswith('.png'):
                 file_path = os.path.join(folder_path, filename)
-                try:
-                    pil_img = Image.open(file_path)
-                    img_array = np.array(pil_img)
-                    if len(img_array.shape) == 3:
-                        template = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-                    else:
-                        template = img_array
+                png_files[filename[:-len('.png')]] = \
+                    lambda file_path=file_path: rescale(self.load_png_file(file_path), scale)
+        return sort_map_names(png_files)
+
+    def build_root_index(self):
+        """为根节点建立缩略图索引，根节点不多于候选数时不需要粗筛。"""
+        top_k = self.config.get('根节点候选数', 3)
+        roots = self.map_tree.roots
+        if top_k <= 0 or len(roots) <= top_k:
+            return None
+        root_index = DescriptorIndex(top_k=top_k)
+        root_index.build(self.img, roots)
+        self.log_info(f"根节点粗筛: {len(root_index)}/{len(roots)} 个根节点建立缩略图")
+        return root_index
+
+    def create_scale_calibrator(self, mod_path):
+        """截图高度与录制分辨率不同（或无法识别录制分辨率）时，在第一次匹配时校准模板缩放比例。"""
+        if not self.config.get('分辨率自适应', True) or not self.img:
+            return None
+        if self.mod_package is not None:
+            recorded = self.mod_package.resolution
+        else:
+            recorded = recorded_height(os.path.basename(mod_path))
+        scales = candidate_scales(self.height, recorded)
+        calibrator = ScaleCalibrator(scales, fallback=scales[0] if recorded else 1.0)
+        if not calibrator.needed:
+            return None
+        self.log_info(f"录制分辨率: {recorded or '未知'}p, 截图高度: {self.height}, 候选缩放比例: {scales}")
+        return calibrator
+
+    def calibrate_template_scale(self, screen_gray, candidates):
+        """用最可能的几个候选模板选出缩放比例，之后改用缩放后的模板。
+
+        每次尝试轮换一组候选，画面里不是最可能的几个模板时，后续尝试也有机会试到正确的模板。
+        """
+        start = self.scale_calibrator.attempts * self.CALIBRATION_TEMPLATES % len(candidates) if candidates else 0
+        chosen = (candidates[start:] + candidates[:start])[:self.CALIBRATION_TEMPLATES]
+        templates = [(name, template) for name in chosen if (template := self.img.get(name)) is not None]
+        result = self.scale_calibrator.calibrate(screen_gray, templates) if templates else None
+        if result is None:
+            return
+        scale, confidence = result
+        self.scale_calibrator = None
+        self.log_info(f"模板缩放比例: {scale} (conf={confidence:.3f})")
+        self.info_set('模板缩放', scale)
+        if scale != 1.0:
+            self.img = self.load_maps(self.mod_path, scale)
+            self.template_matcher.clear()
+            self.root_index = self.build_root_index()
+
+    def prefetch_children(self, index):
+        """index 成为当前节点时，在播放脚本期间于后台加载它的子节点模板。"""
+        if not self.img:
+            return
+        children = self.map_tree.children(index)
+        if children:
+            self.thread_pool_executor.submit(self.img.prefetch, children)
 
-                    if template is None:
-                        raise ValueError(f"图像转换失败: {file_path}")
+    def report_template_stats(self):
+        if not self.img:
+            return
+        stats = self.img.stats()
+        self.info_set('模板内存', f"{stats['resident_mb']:.0f}MB ({stats['resident']}/{len(self.img)}), "
+                                  f"预加载命中率 {stats['prefetch_hit_rate']:.0%}")
 
-                    # 兼容性处理：Python 3.9+ 才支持 removesuffix，低版本用切片
-                    key_name = filename.removesuffix(".png") if hasattr(filename, "removesuffix") else filename[:-4]
+    def load_png_file(self, file_path):
+        filename = os.path.basename(file_path)
+        try:
+            pil_img = Image.open(file_path)
+            img_array = np.array(pil_img)
+            if len(img_array.shape) == 3:
+                template = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+            else:
+                template = img_array
 
-                    png_files[key_name] = template
-                    self.log_info(f"成功加载(已转灰度): {filename}")
+            if template is None:
+                raise ValueError(f"图像转换失败: {file_path}")
 
-                except Exception as e:
-                    self.log_error(f"加载失败 {filename}", e)
-        png_files = {key: png_files[key] for key in sorted(png_files.keys(), key=lambda x: (len(x), x))}
-        return png_files
+            self.log_info(f"成功加载(已转灰度): {filename}")
+            return template
+
+        except Exception as e:
+            self.log_error(f"加载失败 {filename}", e)
 
-    def walk_to_aim(self, former_index=None, delay=0):
+    def walk_to_aim(self, former_index=None, delay=0, matched=None):
         try:
             self.hold_lalt = True
             self.sleep(delay)
-            ret = self._walk_to_aim(former_index)
+            ret = self._walk_to_aim(former_index, matched)
         finally:
             self.hold_lalt = False
+            self.save_route_stats()
+            self.report_template_stats()
         return ret
 
-    def _walk_to_aim(self, former_index=None):
+    def _walk_to_aim(self, former_index=None, matched=None):
         """
         尝试匹配下一个地图节点并执行宏。
+        matched 为 MapWatcher 已经匹配到的 (节点, 置信度)，第一步直接使用，不再匹配。
         """
         # 预编译正则，提高多次调用的效率
         # 假设逻辑是：如果没有前置点，跳过以字母结尾的名字（通常是 start 点之后的步骤）
@@ -243,6 +467,9 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         while True:
             start_time = time.perf_counter()
             map_index = None
+            if matched is not None:
+                map_index, self.last_match_conf = matched
+                matched = None
 
             # 尝试在 5 秒内找到匹配的地图
             while map_index is None and time.perf_counter() - start_time < 5:
@@ -283,10 +510,24 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
 
             if map_index is not None:
                 self.log_info(f'开始执行宏: {map_index}')
+                # 宏执行期间后台匹配会改写 last_match_conf，先记下本次匹配的置信度
+                match_conf = self.last_match_conf
+                if self.img:
+                    self.prefetch_children(map_index)
                 try:
                     self.play_macro_actions(map_index)
+                    # 只统计宏执行成功的转移，失败或放弃的路线不计入
+                    if self.img:
+                        self.route_stats.record(former_index, map_index, match_conf)
                     # 更新前置节点，用于下一次逻辑判断
                     former_index = map_index
+                except CheckpointFailedException as e:
+                    # 路线已经走偏，不必等到超时，立即放弃重开
+                    logger.warning(f"宏执行失败: {map_index}, {e}")
+                    self.checkpoint_failures += 1
+                    self.info_set('校验点失败', self.checkpoint_failures)
+                    self.give_up_mission()
+                    return False
                 except MacroFailedException:
                     logger.warning(f"宏执行失败: {map_index}")
                     return False
@@ -299,27 +540,34 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
                 self.log_info("超时未匹配到任何地图，假定到达目的地或路径丢失")
                 return True
             
+    def save_route_stats(self):
+        try:
+            self.route_stats.save()
+        except Exception as e:
+            logger.error("保存路线统计失败", e)
+
+    def location_prior(self, resolution, name):
+        if not self.use_location_prior:
+            return None
+        return self.route_stats.location(resolution, name)
+
     def no_img_match_map(self, index):
-        sorted_keys = sorted(self.script.keys())
-        count = -1
-        if index is None:
-            if len(sorted_keys):
-                next_key = sorted_keys[0]
-            else:
-                next_key = None 
-                count = 0
-        else:
-            current_pos = sorted_keys.index(index)
-            if current_pos + 1 < len(sorted_keys):
-                next_key = sorted_keys[current_pos + 1]
-            else:
-                next_key = None 
-                count = 0
+        next_key = self.script_tree.next_in_order(index)
+        count = 0 if next_key is None else -1
         return next_key, count
     
-    def match_map(self, index, max_conf=0.0, pattern=None):  # 建议给 max_conf 一个合理的默认阈值，如 0.6
+    def match_delayed_node(self, index, frame):
+        """MapWatcher 的匹配函数，在后台线程中匹配延迟节点的子节点。"""
+        map_index, _ = self.match_map(index, frame=frame)
+        if map_index is None:
+            return None
+        # 匹配位置已由 match_map 记入位置先验，主循环只需要节点和置信度
+        return map_index, self.last_match_conf
+
+    def match_map(self, index, max_conf=0.0, pattern=None, frame=None):  # 建议给 max_conf 一个合理的默认阈值，如 0.6
         """
         在当前屏幕中寻找匹配度最高的地图模板。
+        frame 为 None 时使用当前帧，在后台线程调用时必须传入画面。
         """
         if not self.img:
             return self.no_img_match_map(index)
@@ -329,73 +577,42 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         box = self.box_of_screen_scaled(2560, 1440, 1, 1, 2559, 1439, name="full_screen", hcenter=True)
 
         # 只裁剪和转换一次屏幕
-        frame = self.frame
-        self.shared_frame = frame
+        if frame is None:
+            frame = self.frame
+            self.shared_frame = frame
         cropped_screen = box.crop_frame(frame)
         screen_gray = cv2.cvtColor(cropped_screen, cv2.COLOR_BGR2GRAY)
 
-        count = 0
-        max_index = None
-        best_threshold = max_conf  # 使用传入的阈值作为基准，低于此值不认为是匹配
-
-        # 如果没有传入预编译的正则，则临时编译
-        if pattern is None:
-            pattern = re.compile(r'[a-zA-Z]$')
-
-        for name, template_gray in self.img.items():
-            # --- 过滤逻辑 ---
-            # 逻辑 1: 起始状态 (index is None)
-            if index is None and not pattern.search(name):
-                continue
-
-            if index is not None:
-                # 逻辑 2: 不匹配自己 (先判断这个效率最高)
-                if index == name:
-                    continue
-
-                # 逻辑 3: 严格的前缀匹配
-                
-                # 1. 必须是以 index 开头
-                if not name.startswith(index):
-                    continue
-                
-                # 2. 获取去掉 index 后的剩余部分
-                # 例如: index="A-1", name="A-1-1" -> suffix="-1"
-                # 例如: index="A-1", name="A-10"  -> suffix="0"
-                suffix = name[len(index):]
-
-                # 3. 检查分隔符：如果不是以 '-' 开头，说明不是层级递进，而是数字扩展 (如 1 -> 10)
-                # 这一步阻止了 "60角色-A-1-1" 匹配到 "60角色-A-1-10"
-                if not suffix.startswith('-'):
-                    continue
-                
-                # 4. 层级限制
-                # 如果剩余部分包含 2 个或以上的 '-', 说明是跨级节点 (如 A -> A-1-1)
-                # 也就是 suffix 只能是 "-1", 不能是 "-1-1"
-                if suffix.count('-') >= 2:
-                    continue
-
-                # 5. 长度限制 (保留作为最后的防线)
-                # 由于上面限制了只能有一个 '-', 这个长度限制其实主要限制 "-xxxxx" 后面数字或字符太长的情况
-                if len(suffix) > 4: 
-                    continue
-
-            count += 1
-
-            # if self.height != 1080:
-            #     scale_factor = self.height / 1080
-            #     template_gray = cv2.resize(template_gray, (0, 0), fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_LINEAR)
-
-            # 执行匹配
-            result = cv2.matchTemplate(screen_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-            _, threshold, _, _, = cv2.minMaxLoc(result)
-
-            # 只记录比当前最佳结果更好的
-            if threshold > best_threshold:
-                best_threshold = threshold
-                max_index = name
-                # 只有当发现更好的匹配时才打印 debug 日志，减少刷屏
-                # logger.debug(f"发现潜在匹配: {name} conf={threshold:.4f}")
+        # 候选节点在加载时已建立好父子关系：
+        # index 为 None 时是以字母结尾的根节点，否则是 index 的直接子节点
+        # 例如 index="A-1" 时只有 "A-1-1" 这类节点，不包括 "A-10" 和 "A-1-1-1"
+        # 再按历史上实际出现的次数排序，最可能的候选排在最前
+        candidates = self.route_stats.order(index, self.map_tree.candidates(index, pattern))
+        count = len(candidates)
+        # 先在全部候选上校准缩放比例，校准后会重建根节点索引，粗筛用的是缩放后模板的缩略图
+        if self.scale_calibrator is not None:
+            self.calibrate_template_scale(screen_gray, candidates)
+        accept_conf = self.config.get('提前接受阈值', 0.9)
+        # 关闭提前接受时无论如何都要比较所有候选，粗筛只会多出缩略图的开销
+        shortlisted, rest = candidates, []
+        if index is None and self.root_index is not None and accept_conf > 0:
+            shortlisted, rest = self.root_index.rank(screen_gray, candidates)
+
+        # 位置先验按截图分辨率区分
+        resolution = (screen_gray.shape[1], screen_gray.shape[0])
+        # 以传入的阈值为基准，低于此值不认为是匹配
+        best = (None, max_conf, None)
+        best = self.match_candidates(screen_gray, shortlisted, best, resolution, accept_conf)
+        # 粗筛是近似的，候选中没有达到提前接受阈值的结果时再匹配缩略图得分其次的几个根节点。
+        # 不在任何根节点上的画面最常见，只回退 top_k 个，代价不会变成全部根节点
+        if rest and best[1] < accept_conf:
+            self.root_index.fallbacks += 1
+            best = self.match_candidates(screen_gray, rest[:self.root_index.top_k], best, resolution, accept_conf)
+        max_index, best_threshold, max_loc = best
+
+        self.last_match_conf = best_threshold
+        if max_index is not None:
+            self.route_stats.record_location(resolution, max_index, max_loc)
 
         if max_index is not None:
             self.log_info(f"成功匹配: {max_index} (conf={best_threshold:.4f})")
@@ -406,6 +623,39 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
 
         return max_index, count
 
+    def match_candidates(self, screen_gray, candidates, best, resolution, accept_conf):
+        """按顺序匹配候选模板，只保留比 best 更好的结果。
+
+        Returns:
+            tuple: (模板名称, 置信度, 位置)，没有更好的结果时原样返回 best。
+        """
+        max_index, best_threshold, max_loc = best
+        # 并行匹配时结果仍按候选顺序归约，与顺序匹配的结果一致
+        workers = self.config.get('匹配线程数', 1)
+        executor = og.my_app.get_vision_executor(workers) if workers > 1 and len(candidates) > 1 else None
+        if executor is None:
+            batches = [[name] for name in candidates]
+        elif accept_conf > 0:
+            # 先单独匹配最可能的候选，达到阈值就不必再并行匹配其余候选
+            batches = [candidates[:1], candidates[1:]]
+        else:
+            batches = [candidates]
+
+        for batch in batches:
+            # 加载失败（如外部逻辑包中偏移或形状损坏）的模板视为不存在，跳过
+            entries = [(name, template, self.location_prior(resolution, name)) for name in batch
+                       if (template := self.img.get(name)) is not None]
+            results = self.template_matcher.match_many(screen_gray, entries, executor)
+            for (name, _, _), (threshold, loc) in zip(entries, results):
+                # 只记录比当前最佳结果更好的
+                if threshold > best_threshold:
+                    best_threshold = threshold
+                    max_index = name
+                    max_loc = loc
+            if 0 < accept_conf <= best_threshold:
+                break
+        return max_index, best_threshold, max_loc
+
     @cached_property
     def genshin_interaction(self):
         """
@@ -416,105 +666,131 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
         return GenshinInteraction(self.executor.interaction.capture, self.hwnd)
 
     def play_macro_actions(self, map_index):
-        actions = self.script[map_index]["actions"]
-
-        if "original_x_sensitivity" and "original_y_sensitivity" in self.script[map_index] :
-            self.original_Xsensitivity = self.script[map_index]["original_x_sensitivity"]
-            self.original_Ysensitivity = self.script[map_index]["original_y_sensitivity"]
-        else:
-            self.original_Xsensitivity = 1.0
-            self.original_Ysensitivity = 1.0
-      
-        # 使用 perf_counter 获得更高精度的时间
-        start_time = time.perf_counter()
-
-        for action in actions:
-            target_time = action['time']
-
-            if self.check_for_monthly_card()[0]:
-                raise MacroFailedException
-
-            self.next_frame()
-            self.shared_frame = self.frame
-
-            current_offset = time.perf_counter() - start_time
-            delay = target_time - current_offset
-            target = time.perf_counter() + delay
-            if delay > 0.02:
-                self.sleep(delay - 0.02)
-
-            while time.perf_counter() < target:
-                pass
-
-            if action['type'] == "delay":
-                self.delay_index = map_index
-            else:
-                self.delay_index = None
-                self.execute_action(action)
-
+        macro = self.bind_macro(map_index)
+        self.playing_index = map_index
+        if not self.play_macro(macro, map_index, check_monthly_card=True):
+            raise MacroFailedException
         self.sleep(2)
 
-    def execute_action(self, action):
-        """
-        分发动作执行，替代原有的 execute_key_action
-        """
-        action_type = action['type']
-
-        try:
-            if action_type == "mouse_move":
-                self.move_mouse_relative(action['dx'], action['dy'], self.original_Xsensitivity, self.original_Ysensitivity)
-
-            elif action_type == "mouse_rotation":
-                self.execute_mouse_rotation(action)
-
-            elif action_type in ("mouse_down", "mouse_up"):
-                self._handle_mouse_click(action_type, action['button'])
-
-            elif action_type in ("key_down", "key_up"):
-                self._handle_keyboard(action_type, action['key'])
-
-            else:
-                raise ValueError(f"Unknown action type: {action_type}")
-
-        except Exception as e:
-            # 获取 key 信息用于日志，如果不存在则为 None
-            key_info = action.get('key') or action.get('button') or 'N/A'
-            self.log_info(f"执行动作失败 -> type: {action_type}, key/btn: {key_info}, Error: {e}")
-            raise
-
-    def _handle_mouse_click(self, action_type, button):
-        if action_type == "mouse_down":
-            self.mouse_down(key=button)
+    def dispatch_macro_op(self, op, key, dx, dy):
+        if op == OP_DELAY:
+            self.delay_index = self.playing_index
         else:
-            self.mouse_up(key=button)
-
-    def _handle_keyboard(self, action_type, key):
-        key = normalize_key(key)
-
-        if key == 'f4':
-            if action_type == "key_down":
-                self.reset_and_transport()
+            self.delay_index = None
+            self.execute_macro_op(op, key, dx, dy)
+
+    def bind_macro(self, map_index):
+        """获取绑定了当前按键配置和灵敏度的宏，每次运行只绑定一次。"""
+        macro = self.bound_macros.get(map_index)
+        if macro is None:
+            program = self.programs.get(map_index)
+            if program is None:
+                program = self.programs[map_index] = self.load_program(map_index)
+            macro = program.bind(self.resolve_macro_key, self.sensitivity_divisor(*program.original_sensitivity))
+            self.bound_macros[map_index] = macro
+        return macro
+
+    def load_program(self, map_index):
+        """外部逻辑包中的脚本在第一次播放时读取，文件夹中的 JSON 脚本在第一次播放时编译。"""
+        if self.mod_package is not None:
+            return self.mod_package.load_program(map_index)
+        return compile_script(self.script[map_index])
+
+    def compile_scripts(self):
+        self.programs = {}
+        self.bound_macros = {}
+        for name, script in self.script.items():
+            program = compile_script(script)
+            for warning in program.warnings:
+                logger.warning(f"{name}: {warning}")
+            self.programs[name] = program
+
+    def load_compiled_scripts(self, folder_path):
+        """加载录制器直接生成的 .npz 脚本，与 JSON 脚本同名时使用 JSON 脚本。"""
+        if not os.path.isdir(folder_path):
             return
+        for filename in os.listdir(folder_path):
+            if not filename.lower().endswith('.npz'):
+                continue
+            name = filename[:-len('.npz')]
+            if name in self.programs:
+                logger.warning(f"{name}: 同时存在 JSON 和 .npz 脚本，使用 JSON 脚本")
+                continue
+            try:
+                self.programs[name] = MacroProgram.load(os.path.join(folder_path, filename))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"加载脚本失败: {filename}", e)
 
-        # 3. 统一应用动态按键映射
+    def resolve_macro_key(self, key):
+        """统一应用动态按键映射。"""
         if key == 'lshift':
-            key = self.get_dodge_key()
-        elif key == 'f':
-            key = self._resolve_f_key(action_type)
+            return self.get_dodge_key()
         elif key == '4':
-            key = self.get_spiral_dive_key()
+            return self.get_spiral_dive_key()
         elif key == 'e':
-            key = self.get_combat_key()
+            return self.get_combat_key()
         elif key == 'q':
-            key = self.get_ultimate_key()
-        elif 'alt' in key:
-            return
+            return self.get_ultimate_key()
+        return super().resolve_macro_key(key)
+
+    def execute_macro_op(self, op, key, dx, dy):
+        """F 键在播放时判断交互还是快速破解，校验点在主线程截图校验，其余操作交给基类。"""
+        if op == OP_CHECKPOINT:
+            self.verify_checkpoint(key)
+        elif op == OP_F_DOWN:
+            self.input_state.key_down(self._resolve_f_key("key_down"))
+        elif op == OP_F_UP:
+            self.input_state.key_up(self._resolve_f_key("key_up"))
+        else:
+            super().execute_macro_op(op, key, dx, dy)
 
-        # 4. 执行实际按键操作
-        if action_type == "key_down":
-            self.send_key_down(key)
-        elif action_type == "key_up":
-            self.send_key_up(key)
+    def verify_checkpoint(self, checkpoint):
+        """校验脚本中的校验点，未通过时抛出 CheckpointFailedException。
+
+        校验点格式::
+
+            {"type": "checkpoint", "time": 3.2, "template": "A-1-1", "roi": [0.4, 0.3, 0.6, 0.5], "threshold": 0.7}
+            {"type": "checkpoint", "time": 3.2, "check": "in_team"}
+
+        template 为 map 文件夹中的模板名称，roi 为 16:9 参考画面中的相对区域，缺省时为全屏，
+        小于模板时以 roi 为中心扩大到模板大小；
+        timeout 秒内（默认只检查当前帧）通过即可，等待期间后续动作会顺延。
+        """
+        timeout = checkpoint.get('timeout', 0)
+        if checkpoint.get('check') == 'in_team':
+            condition = self.in_team
+            description = 'in_team'
+        else:
+            name = checkpoint['template']
+            template = self.img.get(name)
+            if template is None:
+                logger.warning(f"校验点模板不存在，跳过校验: {name}")
+                return
+            threshold = checkpoint.get('threshold', 0.7)
+            frame_height, frame_width = self.frame.shape[:2]
+            if template.shape[0] > frame_height or template.shape[1] > frame_width:
+                logger.warning(f"校验点模板 {name} {template.shape[1]}x{template.shape[0]} 大于截图，跳过校验")
+                return
+            x1, y1, x2, y2 = checkpoint.get('roi', (0, 0, 1, 1))
+            box = self.box_of_screen_scaled(2560, 1440, 2560 * x1, 1440 * y1, 2560 * x2, 1440 * y2,
+                                            name="checkpoint", hcenter=True)
+            # roi 小于模板时匹配结果恒为 0，以 roi 为中心扩大到至少与模板一样大
+            left, top, right, bottom = search_region(box, template.shape, frame_width, frame_height)
+            if (right - left, bottom - top) != (box.width, box.height):
+                self.log_onetime_info(f"校验点 {name} 的 roi 小于模板 {template.shape[1]}x{template.shape[0]}，"
+                                      f"已扩大搜索区域", key=f"checkpoint_roi_{name}")
+
+            def condition():
+                screen_gray = cv2.cvtColor(self.frame[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+                confidence, _ = self.template_matcher.match(screen_gray, name, template)
+                return confidence >= threshold
+
+            description = f'{name} >= {threshold}'
+
+        if condition() or (timeout > 0 and self.wait_until(condition, time_out=timeout)):
+            logger.debug(f"校验点通过: {description}")
+            return
+        raise CheckpointFailedException(f"校验点未通过: {description}")
 
     def _resolve_f_key(self, action_type):
         """
@@ -543,36 +819,3 @@ class ImportTask(DNAOneTimeTask, CommissionsTask, BaseCombatTask):
                 return self.get_interact_key()
             else:
                 return 'f'
-
-    def execute_mouse_rotation(self, action):
-        direction = action.get("direction", "up")
-        angle = action.get("angle", 0)
-        sensitivity = action.get("sensitivity", 10)
-
-        pixels = int(angle * sensitivity)
-
-        # 使用字典映射替代 if-elif 链，更简洁
-        direction_map = {"left": (-pixels, 0), "right": (pixels, 0), "up": (0, -pixels), "down": (0, pixels)}
-
-        if direction not in direction_map:
-            logger.warning(f"未知的鼠标方向: {direction}")
-            return
-
-        dx, dy = direction_map[direction]
-        self.move_mouse_relative(dx, dy, self.original_Xsensitivity, self.original_Ysensitivity)
-        logger.debug(f"鼠标视角旋转: {direction}, 角度: {angle}, 像素: {pixels}")
-
-
-def normalize_key(key: str) -> str:
-    """
-    标准化按键名称
-    """
-    if not isinstance(key, str):
-        return key
-
-    key_lower = key.lower()
-    if key_lower == 'shift':
-        return 'lshift'
-    if key_lower == 'ctrl':
-        return 'lcontrol'
-    return key
@@ -0,0 +1,152 @@
+from qfluentwidgets import FluentIcon
+import os
+import queue
+
+import cv2
+from pathlib import Path
+from PySide6.QtCore import Qt
+
+from ok import Logger, og
+from src.macro.MacroRecorder import MacroRecorder, key_name
+from src.tasks.BaseDNATask import BaseDNATask
+from src.tasks.DNAOneTimeTask import DNAOneTimeTask
+
+logger = Logger.get_logger(__name__)
+
+
+class MacroRecordTask(DNAOneTimeTask, BaseDNATask):
+    """录制外部逻辑，直接生成使用外部移动逻辑自动打本可以播放的编译脚本"""
+
+    SNAPSHOT_POLL_INTERVAL = 0.02
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.icon = FluentIcon.MICROPHONE
+        self.name = "录制外部逻辑"
+        self.description = "按分段键开始录制，之后每按一次分段键开始录制下一个节点并截取地图，按结束键保存。\n"
+        self.description += "脚本保存为 mod/<外部文件夹>/scripts/<节点>.npz，地图保存为 map/<节点>.png。"
+        self.group_name = "全自动"
+        self.group_icon = FluentIcon.CAFE
+
+        self.default_config.update({
+            '外部文件夹': "录制",
+            '路线名称': "A",
+            '分段键': "f9",
+            '结束键': "f10",
+            '截取地图': True,
+            '鼠标锁定在窗口中心': True,
+        })
+        self.config_description.update({
+            '外部文件夹': '保存到mod目录下的文件夹',
+            '路线名称': '第一个节点的名称，后续节点依次为 名称-1、名称-2 ...',
+            '分段键': '开始录制 / 开始下一个节点',
+            '结束键': '结束录制并保存',
+            '截取地图': '每个节点开始时截取画面中央作为地图模板',
+            '鼠标锁定在窗口中心': '游戏锁定光标时鼠标移动量以窗口中心为基准，关闭时以上一次位置为基准',
+        })
+
+        self.recorder = None
+        self.segment_count = 0
+        self.stop_requested = False
+        self.pending_snapshots = queue.Queue()
+        self.split_key = None
+        self.stop_key = None
+        self.connected = False
+
+    def run(self):
+        DNAOneTimeTask.run(self)
+        folder = os.path.join(Path.cwd(), 'mod', self.config.get('外部文件夹'))
+        scripts_dir = os.path.join(folder, 'scripts')
+        map_dir = os.path.join(folder, 'map')
+        os.makedirs(scripts_dir, exist_ok=True)
+        os.makedirs(map_dir, exist_ok=True)
+
+        anchor = None
+        if self.config.get('鼠标锁定在窗口中心', True):
+            anchor = self.hwnd.get_abs_cords(self.hwnd.width // 2, self.hwnd.height // 2)
+        self.recorder = MacroRecorder(anchor=anchor)
+        self.segment_count = 0
+        self.stop_requested = False
+        self.pending_snapshots = queue.Queue()
+        self.split_key = self.config.get('分段键', 'f9').lower()
+        self.stop_key = self.config.get('结束键', 'f10').lower()
+
+        self.connect_recorder()
+        try:
+            self.log_info(f"按 {self.split_key} 开始录制，按 {self.stop_key} 结束", notify=True)
+            while not self.stop_requested:
+                self.sleep(self.SNAPSHOT_POLL_INTERVAL)
+                self.save_pending_snapshots(map_dir)
+        finally:
+            self.disconnect_recorder()
+            self.recorder.stop()
+        self.save_pending_snapshots(map_dir)
+        self.save_programs(scripts_dir)
+
+    def connect_recorder(self):
+        # 直接在监听线程中调用，事件时间不受 Qt 事件队列延迟影响
+        if not self.connected:
+            og.my_app.pressed.connect(self.on_recorder_press, Qt.ConnectionType.DirectConnection)
+            og.my_app.released.connect(self.on_recorder_release, Qt.ConnectionType.DirectConnection)
+            og.my_app.clicked.connect(self.recorder.on_click, Qt.ConnectionType.DirectConnection)
+            og.my_app.moved.connect(self.recorder.on_move, Qt.ConnectionType.DirectConnection)
+            og.my_app.start_move_listener()
+            self.connected = True
+
+    def disconnect_recorder(self):
+        if self.connected:
+            og.my_app.stop_move_listener()
+            og.my_app.pressed.disconnect(self.on_recorder_press)
+            og.my_app.released.disconnect(self.on_recorder_release)
+            og.my_app.clicked.disconnect(self.recorder.on_click)
+            og.my_app.moved.disconnect(self.recorder.on_move)
+            self.connected = False
+
+    def on_recorder_press(self, key):
+        name = key_name(key)
+        if name == self.split_key:
+            self.start_next_segment()
+        elif name == self.stop_key:
+            self.recorder.stop()
+            self.stop_requested = True
+        else:
+            self.recorder.on_press(key)
+
+    def on_recorder_release(self, key):
+        if key_name(key) not in (self.split_key, self.stop_key):
+            self.recorder.on_release(key)
+
+    def start_next_segment(self):
+        prefix = self.config.get('路线名称', 'A')
+        name = prefix if self.segment_count == 0 else f"{prefix}-{self.segment_count}"
+        if self.segment_count == 0:
+            self.recorder.start(name)
+        else:
+            self.recorder.split(name)
+        self.segment_count += 1
+        self.pending_snapshots.put(name)
+
+    def save_pending_snapshots(self, map_dir):
+        """在任务线程截取节点开始时的地图模板。"""
+        while True:
+            try:
+                name = self.pending_snapshots.get_nowait()
+            except queue.Empty:
+                return
+            self.info_set('当前节点', name)
+            if not self.config.get('截取地图', True) or self.frame is None:
+                continue
+            # 与外部逻辑示例的地图一致：画面中央约 38% x 69% 的区域
+            box = self.box_of_screen_scaled(2560, 1440, 790, 227, 1770, 1213, name="record_map", hcenter=True)
+            ok, encoded = cv2.imencode('.png', box.crop_frame(self.frame))
+            if ok:
+                encoded.tofile(os.path.join(map_dir, f"{name}.png"))
+
+    def save_programs(self, scripts_dir):
+        programs = self.recorder.build()
+        for name, program in programs:
+            program.save(os.path.join(scripts_dir, f"{name}.npz"))
+            logger.info(f"录制节点 {name}: {len(program)} 个动作, {program.duration:.2f}s")
+        if self.recorder.unknown_keys:
+            logger.warning(f"忽略了 {self.recorder.unknown_keys} 个无法识别的按键")
+        self.log_info(f"录制完成，共 {len(programs)} 个节点，保存在 {scripts_dir}", notify=True)
@@ -0,0 +1,56 @@
+# Test case
+import unittest
+
+from src.macro.Checkpoint import Checkpoint, normalized_position
+from src.macro.Timeline import Timeline, run_timeline
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def test_from_dict(self):
+        self.assertIsNone(Checkpoint.from_dict(None))
+        self.assertIsNone(Checkpoint.from_dict({}))
+        checkpoint = Checkpoint.from_dict({"expected": [0.5, 0.2], "tolerance": 0.02})
+        self.assertEqual(checkpoint.expected, (0.5, 0.2))
+        self.assertEqual(checkpoint.tolerance, 0.02)
+
+    def test_offset(self):
+        offset_x, offset_y = Checkpoint((0.5, 0.2)).offset((0.6, 0.25))
+        self.assertAlmostEqual(offset_x, 0.1)
+        self.assertAlmostEqual(offset_y, 0.05)
+
+    def test_drifted(self):
+        checkpoint = Checkpoint((0.5, 0.2), tolerance=0.01)
+        self.assertFalse(checkpoint.drifted((0.505, 0.195)))
+        self.assertTrue(checkpoint.drifted((0.55, 0.2)))
+        self.assertTrue(checkpoint.drifted((0.5, 0.18)))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            Checkpoint((0.5, 0.2), tolerance=0.08, search_radius=0.08)
+        # 不再支持按 gain 转动视角
+        with self.assertRaises(TypeError):
+            Checkpoint.from_dict({"expected": [0.5, 0.2], "gain": 1000})
+
+    def test_search_region_clipped(self):
+        self.assertEqual(Checkpoint((0.02, 0.5), search_radius=0.05).search_region(), (0.0, 0.45, 0.07, 0.55))
+
+    def test_run_timeline_measures_before_play(self):
+        timeline = Timeline.from_dict('route', {'segments': [
+            {'name': 'a', 'checkpoint': {'expected': [0.5, 0.2]}, 'actions': []},
+            {'name': 'b', 'actions': []},
+        ]})
+        calls = []
+        self.assertTrue(run_timeline(timeline, lambda segment: calls.append(('play', segment.name)), {},
+                                     measure=lambda segment: calls.append(('measure', segment.name))))
+        self.assertEqual(calls, [('measure', 'a'), ('play', 'a'), ('play', 'b')])
+
+    def test_normalized_position(self):
+        self.assertEqual(normalized_position(1280, 720, 2560, 1440), (0.5, 0.5))
+        # 21:9 画面两侧多出的部分不影响以中心对齐的相对位置
+        self.assertEqual(normalized_position(1720, 720, 3440, 1440), (0.5, 0.5))
+        self.assertAlmostEqual(normalized_position(0, 0, 2560, 1440)[0], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
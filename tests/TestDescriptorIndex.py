@@ -0,0 +1,44 @@
+# Test case
+import unittest
+
+import cv2
+import numpy as np
+
+from src.route.DescriptorIndex import DescriptorIndex
+
+
+def make_scene(seed, width=640, height=360):
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (height // 16, width // 16), dtype=np.uint8)
+    return cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+class TestDescriptorIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.scenes = [make_scene(seed) for seed in range(6)]
+        self.templates = {f'root-{i}': scene[60:300, 160:480].copy() for i, scene in enumerate(self.scenes)}
+        self.names = list(self.templates)
+        self.index = DescriptorIndex(scale=1 / 8, top_k=2)
+        self.index.build(self.templates, self.names)
+
+    def test_rank_splits_shortlist_and_rest(self):
+        shortlisted, rest = self.index.rank(self.scenes[3], self.names)
+        self.assertIn('root-3', shortlisted)
+        self.assertEqual(len(shortlisted), 2)
+        # 其余模板按得分从高到低排列，供调用方有限度地回退
+        self.assertEqual(set(shortlisted) | set(rest), set(self.names))
+        small = self.index._downscale_screen(self.scenes[3])
+        scores = [self.index.score(small, name) for name in rest]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(self.index.shortlist(self.scenes[3], self.names), shortlisted)
+
+    def test_few_candidates_are_not_ranked(self):
+        shortlisted, rest = self.index.rank(self.scenes[0], self.names[:2])
+        self.assertEqual(shortlisted, self.names[:2])
+        self.assertEqual(rest, [])
+        self.assertEqual(self.index.queries, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# Test case
+import unittest
+
+from src.scene.FishBarDetector import FishBarDetector
+from tests.benchmarks.FishBarBenchmark import (BAR_MIN_AREA, ICON_MAX_AREA, ICON_MIN_AREA, detect_baseline,
+                                               same_result, synthetic_strip, synthetic_strips)
+
+
+class TestFishBarDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = FishBarDetector(BAR_MIN_AREA, ICON_MIN_AREA, ICON_MAX_AREA)
+
+    def detect(self, strip, res_ratio=1.0, contours=False):
+        fallbacks = self.detector.fallbacks
+        result = self.detector.detect(strip, res_ratio)
+        self.assertTrue(same_result(result, detect_baseline(strip, res_ratio)))
+        self.assertEqual(self.detector.fallbacks > fallbacks, contours)
+        return result
+
+    def test_icon_apart_from_bar_uses_projection(self):
+        bar, icon = self.detect(synthetic_strip(402, 120, 110, 320, 16))
+        self.assertEqual(bar[2], (2, 120, 27, 230))
+        self.assertEqual(bar[3], 2616.0)
+        self.assertTrue(icon[0])
+        self.assertEqual(icon[1][1], 320)
+
+    def test_specks_on_other_rows_use_projection(self):
+        bar, icon = self.detect(synthetic_strip(402, 120, 110, 320, 16, specks=30))
+        self.assertEqual(bar[2], (2, 120, 27, 230))
+        self.assertEqual(icon[1][1], 320)
+
+    def test_icon_inside_bar(self):
+        # 鱼标进入控制区时与鱼条同行，仍需识别为单独的鱼标
+        bar, icon = self.detect(synthetic_strip(402, 120, 110, 170, 16), contours=True)
+        self.assertEqual(bar[2], (2, 120, 27, 230))
+        self.assertTrue(icon[0])
+        self.assertEqual(icon[1][1], 170)
+
+    def test_specks_on_bar_rows(self):
+        bar, icon = self.detect(synthetic_strip(402, 120, 110, 320, 16, bar_specks=3), contours=True)
+        self.assertEqual(bar[2], (2, 120, 27, 230))
+        self.assertEqual(icon[1][1], 320)
+
+    def test_no_icon(self):
+        bar, icon = self.detect(synthetic_strip(402, 120, 110, None, 16, specks=30))
+        self.assertTrue(bar[0])
+        self.assertFalse(icon[0])
+
+    def test_matches_baseline_on_all_resolutions(self):
+        for name, strip, res_ratio in synthetic_strips():
+            with self.subTest(name):
+                self.assertTrue(same_result(self.detector.detect(strip, res_ratio), detect_baseline(strip, res_ratio)))
+
+
+if __name__ == '__main__':
+    unittest.main()
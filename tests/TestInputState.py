@@ -0,0 +1,127 @@
+# Test case
+import unittest
+
+from src.macro.CompiledMacro import OP_KEY_DOWN, OP_KEY_UP, OP_MOUSE_MOVE, OP_RESET_TRANSPORT
+from src.macro.InputState import InputState
+from src.macro.MacroPlayer import MacroPlayer
+
+
+class FakeBackend:
+    """记录每次发出的输入，一次 emit 为一个列表。"""
+
+    def __init__(self):
+        self.emissions = []
+
+    def __call__(self, events):
+        self.emissions.append([(event_type, key, dx, dy) for event_type, key, dx, dy in events])
+
+
+class TestInputState(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = FakeBackend()
+        self.state = InputState(self.backend)
+
+    def test_skips_redundant_events(self):
+        self.assertTrue(self.state.key_down('w'))
+        self.assertFalse(self.state.key_down('w'))
+        self.assertTrue(self.state.key_up('w'))
+        self.assertFalse(self.state.key_up('w'))
+        self.assertFalse(self.state.mouse_up('left'))
+        self.assertEqual(self.backend.emissions, [[('key_down', 'w', 0, 0)], [('key_up', 'w', 0, 0)]])
+
+    def test_repeated_press_of_other_keys_is_sent(self):
+        # 按住移动键时再次按下闪避，两次按下都要发出，松开一次即可
+        self.state.key_down('w')
+        self.assertTrue(self.state.key_down('lshift'))
+        self.state.key_up('lshift')
+        self.assertTrue(self.state.key_down('lshift'))
+        self.assertTrue(self.state.key_down('lshift'))
+        self.assertFalse(self.state.key_down('w'))
+        self.assertEqual(self.state.release_all(), ['lshift', 'w'])
+        self.assertEqual(self.backend.emissions, [
+            [('key_down', 'w', 0, 0)],
+            [('key_down', 'lshift', 0, 0)],
+            [('key_up', 'lshift', 0, 0)],
+            [('key_down', 'lshift', 0, 0)],
+            [('key_down', 'lshift', 0, 0)],
+            [('key_up', 'lshift', 0, 0), ('key_up', 'w', 0, 0)],
+        ])
+
+    def test_batch_is_one_emission(self):
+        with self.state.batch():
+            self.state.key_down('w')
+            self.state.key_down('lshift')
+            self.state.move(3, 1)
+            self.state.move(-1, 2)
+            self.state.mouse_down('left')
+        self.assertEqual(self.backend.emissions, [[
+            ('key_down', 'w', 0, 0),
+            ('key_down', 'lshift', 0, 0),
+            ('mouse_move', None, 2, 3),
+            ('mouse_down', 'left', 0, 0),
+        ]])
+
+    def test_release_all_only_pressed(self):
+        self.state.key_down('w')
+        self.state.key_down('lalt')
+        self.state.key_up('w')
+        self.state.mouse_down('right')
+        self.backend.emissions.clear()
+
+        self.assertEqual(self.state.release_all(), ['lalt', 'right'])
+        self.assertEqual(self.backend.emissions, [[('key_up', 'lalt', 0, 0), ('mouse_up', 'right', 0, 0)]])
+        self.assertEqual(self.state.release_all(), [])
+        self.assertEqual(len(self.backend.emissions), 1)
+
+    def test_release_on_exception(self):
+        try:
+            with self.state.batch():
+                self.state.key_down('w')
+                raise RuntimeError
+        except RuntimeError:
+            self.state.release_all()
+        self.assertEqual(self.backend.emissions, [[('key_down', 'w', 0, 0)], [('key_up', 'w', 0, 0)]])
+
+
+class TestMacroPlayerBatch(unittest.TestCase):
+
+    def test_simultaneous_actions_share_one_emission(self):
+        backend = FakeBackend()
+        state = InputState(backend)
+        served = []
+
+        def dispatch(op, key, dx, dy):
+            if op == OP_KEY_DOWN:
+                state.key_down(key)
+            elif op == OP_KEY_UP:
+                state.key_up(key)
+            elif op == OP_MOUSE_MOVE:
+                state.move(dx, dy)
+            else:
+                served.append(op)
+
+        player = MacroPlayer(dispatch, main_thread_ops=(OP_RESET_TRANSPORT,), batch=state.batch)
+        player.start([
+            (0.0, OP_KEY_DOWN, 'w', 0, 0),
+            (0.0, OP_KEY_DOWN, 'lshift', 0, 0),
+            (0.0, OP_MOUSE_MOVE, None, 5, 0),
+            (0.01, OP_RESET_TRANSPORT, None, 0, 0),
+            (0.01, OP_KEY_UP, 'lshift', 0, 0),
+            (0.01, OP_KEY_UP, 'w', 0, 0),
+        ])
+        while not player.wait(0.005):
+            player.service()
+        player.stop()
+        player.raise_error()
+
+        self.assertEqual(served, [OP_RESET_TRANSPORT])
+        self.assertEqual(backend.emissions, [
+            [('key_down', 'w', 0, 0), ('key_down', 'lshift', 0, 0), ('mouse_move', None, 5, 0)],
+            [('key_up', 'lshift', 0, 0), ('key_up', 'w', 0, 0)],
+        ])
+        self.assertEqual(len(player.timer.lateness), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
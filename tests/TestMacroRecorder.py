@@ -0,0 +1,119 @@
+# Test case
+import unittest
+
+from src.macro.CompiledMacro import OP_F_DOWN, OP_F_UP, OP_KEY_DOWN, OP_KEY_UP, OP_MOUSE_MOVE
+from src.macro.MacroRecorder import MacroRecorder, key_name
+
+
+class FakeKey:
+    """只带 char/name 属性的假按键，与 pynput 的 KeyCode/Key 相同的接口。"""
+
+    def __init__(self, char=None, name=None):
+        self.char = char
+        self.name = name
+
+
+class FakeClock:
+    """手动推进的纳秒时钟。"""
+
+    def __init__(self):
+        self.now = 1_000_000_000_000
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += int(seconds * 1_000_000_000)
+
+
+class TestMacroRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.recorder = MacroRecorder(clock_ns=self.clock)
+
+    def test_key_name(self):
+        self.assertEqual(key_name(FakeKey(char='W')), 'w')
+        self.assertEqual(key_name(FakeKey(name='shift')), 'lshift')
+        self.assertEqual(key_name(FakeKey(name='space')), 'space')
+        self.assertIsNone(key_name(FakeKey()))
+
+    def test_ignores_events_outside_recording(self):
+        self.recorder.on_press(FakeKey(char='w'))
+        self.recorder.start('A')
+        self.clock.advance(0.5)
+        self.recorder.on_press(FakeKey(char='w'))
+        self.recorder.stop()
+        self.recorder.on_release(FakeKey(char='w'))
+
+        (name, program), = self.recorder.build()
+        self.assertEqual(name, 'A')
+        self.assertEqual(len(program), 1)
+        self.assertAlmostEqual(program.duration, 0.5)
+
+    def test_split_segments_with_relative_time(self):
+        self.recorder.start('A')
+        self.clock.advance(0.25)
+        self.recorder.on_press(FakeKey(char='w'))
+        self.clock.advance(1.0)
+        self.recorder.on_release(FakeKey(char='w'))
+        self.clock.advance(0.5)
+        self.recorder.split('A-1')
+        self.clock.advance(0.125)
+        self.recorder.on_press(FakeKey(char='f'))
+        self.clock.advance(0.1)
+        self.recorder.on_release(FakeKey(char='f'))
+
+        programs = dict(self.recorder.build())
+        self.assertEqual(list(programs), ['A', 'A-1'])
+        first, second = programs['A'], programs['A-1']
+        self.assertEqual(first.actions['op'].tolist(), [OP_KEY_DOWN, OP_KEY_UP])
+        self.assertEqual(first.actions['time'].tolist(), [0.25, 1.25])
+        self.assertEqual(second.actions['op'].tolist(), [OP_F_DOWN, OP_F_UP])
+        self.assertEqual(second.actions['time'].tolist(), [0.125, 0.225])
+
+    def test_drops_autorepeat(self):
+        self.recorder.start('A')
+        for _ in range(5):
+            self.clock.advance(0.03)
+            self.recorder.on_press(FakeKey(char='w'))
+        self.clock.advance(0.03)
+        self.recorder.on_release(FakeKey(char='w'))
+
+        (_, program), = self.recorder.build()
+        self.assertEqual(program.actions['op'].tolist(), [OP_KEY_DOWN, OP_KEY_UP])
+        self.assertEqual(program.keys, ['w'])
+
+    def test_moves_relative_to_anchor_are_merged(self):
+        recorder = MacroRecorder(clock_ns=self.clock, anchor=(960, 540))
+        recorder.start('A')
+        for x, y in ((965, 541), (970, 542), (960, 540), (955, 540)):
+            self.clock.advance(0.002)
+            recorder.on_move(x, y)
+
+        (_, program), = recorder.build()
+        self.assertEqual(program.actions['op'].tolist(), [OP_MOUSE_MOVE])
+        # 连续两次移动各 +5，光标被拉回锚点只重置位置，之后再 -5
+        self.assertEqual(program.actions['dx'].tolist(), [5 + 5 - 5])
+        self.assertEqual(program.actions['dy'].tolist(), [2])
+
+    def test_moves_relative_to_previous_position(self):
+        self.recorder.start('A')
+        self.recorder.on_move(100, 100)
+        self.clock.advance(0.1)
+        self.recorder.on_move(130, 90)
+
+        (_, program), = self.recorder.build()
+        self.assertEqual(program.actions['dx'].tolist(), [30])
+        self.assertEqual(program.actions['dy'].tolist(), [-10])
+
+    def test_unknown_keys_are_counted(self):
+        self.recorder.start('A')
+        self.recorder.on_press(FakeKey())
+        self.assertEqual(self.recorder.unknown_keys, 1)
+        (_, program), = self.recorder.build()
+        self.assertEqual(len(program), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# Test case
+import threading
+import unittest
+
+from src.route.MapWatcher import MapWatcher
+
+
+class FakeFrames:
+    """每次 next() 生成一个新的画面对象。"""
+
+    def __init__(self):
+        self.frame = object()
+
+    def __call__(self):
+        return self.frame
+
+    def next(self):
+        self.frame = object()
+
+
+class TestMapWatcher(unittest.TestCase):
+
+    def test_reports_match_from_background(self):
+        frames = FakeFrames()
+        calls = []
+
+        def match(index, frame):
+            calls.append((index, threading.current_thread().name))
+            return 'A-1-1' if len(calls) >= 3 else None
+
+        watcher = MapWatcher(match, frames, interval=0.001)
+        watcher.watch('A-1')
+        for _ in range(200):
+            if watcher.found.wait(0.005):
+                break
+            frames.next()
+        self.assertEqual(watcher.take(), 'A-1-1')
+        self.assertFalse(watcher.found.is_set())
+        self.assertFalse(watcher.watching)
+        self.assertTrue(all(index == 'A-1' and name == 'map-watcher' for index, name in calls))
+
+    def test_same_frame_is_matched_once(self):
+        frames = FakeFrames()
+        watcher = MapWatcher(lambda index, frame: None, frames, interval=0.001)
+        watcher.watch('A')
+        threading.Event().wait(0.05)
+        watcher.stop()
+        self.assertEqual(watcher.matches, 1)
+        self.assertIsNone(watcher.take())
+
+    def test_watch_other_index_restarts(self):
+        frames = FakeFrames()
+        seen = []
+        watcher = MapWatcher(lambda index, frame: seen.append(index), frames, interval=0.001)
+        watcher.watch('A')
+        watcher.watch('A')
+        watcher.watch('B')
+        for _ in range(100):
+            if 'B' in seen:
+                break
+            frames.next()
+            threading.Event().wait(0.005)
+        watcher.stop()
+        self.assertEqual(watcher.index, None)
+        self.assertIn('B', seen)
+
+    def test_error_is_raised_on_take(self):
+        def match(index, frame):
+            raise ValueError('bad template')
+
+        watcher = MapWatcher(match, FakeFrames(), interval=0.001)
+        watcher.watch('A')
+        self.assertTrue(watcher.found.wait(1))
+        with self.assertRaises(ValueError):
+            watcher.take()
+        self.assertIsNone(watcher.take())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ import unittest
 from src.config import config
 from ok.test.TaskTestCase import TaskTestCase
 
+from src.scene.MissionScreenClassifier import MissionScreen
 from src.tasks.CommissionsTask import CommissionsTask
 
 
@@ -48,6 +49,20 @@ class TestMissonInterface(TaskTestCase):
         self.assertIsNotNone(feature)
         self.logger.info(feature)
 
+    def test_classifier(self):
+        cases = [
+            ('tests/images/iface_esc.png', MissionScreen.ESC_MENU),
+            ('tests/images/iface_ltr.png', MissionScreen.LETTER),
+            ('tests/images/iface_start.png', MissionScreen.START),
+            ('tests/images/iface_cont.png', MissionScreen.CONTINUE),
+            ('tests/images/iface_drop.png', MissionScreen.DROP_ITEM),
+        ]
+        for image, expected in cases:
+            self.set_image(image)
+            screen, box = self.task.mission_screen_classifier.classify()
+            self.assertEqual(screen, expected, image)
+            self.assertIsNotNone(box)
+            self.logger.info(f'{image} {screen} {box}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,54 @@
+# Test case
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from src.route.ModPackage import ModPackage, pack
+from src.route.TemplateStore import TemplateStore
+
+
+class TestModPackage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        folder = os.path.join(self.tmp.name, '示例(1080p)')
+        os.makedirs(os.path.join(folder, 'map'))
+        rng = np.random.default_rng(0)
+        self.templates = {}
+        for name in ('A', 'A-1'):
+            image = rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+            cv2.imencode('.png', image)[1].tofile(os.path.join(folder, 'map', f'{name}.png'))
+            self.templates[name] = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        self.path = pack(folder)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_maps_are_memory_mapped(self):
+        package = ModPackage(self.path)
+        self.assertEqual(package.resolution, 1080)
+        self.assertEqual(package.scripts, [])
+        sources = package.map_sources()
+        for name, template in self.templates.items():
+            np.testing.assert_array_equal(sources[name](), template)
+        self.assertEqual(package.map_sources(0.5)['A']().shape, (12, 16))
+
+    def test_corrupt_entry_is_skipped(self):
+        package = ModPackage(self.path)
+        package.manifest['maps']['A']['shape'] = [4096, 4096]
+        package.manifest['maps']['A-1']['offset'] = -1
+        sources = package.map_sources()
+        self.assertIsNone(sources['A']())
+        self.assertIsNone(sources['A-1']())
+        self.assertEqual(set(package.errors), {'A', 'A-1'})
+
+        store = TemplateStore(sources)
+        self.assertIsNone(store.get('A'))
+        self.assertNotIn('A', store)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# Test case
+import time
+import unittest
+
+from src.macro.CompiledMacro import OP_KEY_DOWN, OP_KEY_UP, OP_RESET_TRANSPORT
+from src.macro.MacroPlayer import MacroPlayer
+from src.macro.PrecisionTimer import PrecisionTimer, percentile
+
+
+class FakeSink:
+    """记录每个动作实际发出时间的假输入设备。"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = []
+
+    def send(self, name):
+        self.events.append((name, self.clock()))
+
+
+class FakeClock:
+    """每次 sleep 固定超时 overshoot 秒的假时钟。"""
+
+    def __init__(self, overshoot):
+        self.now = 0.0
+        self.overshoot = overshoot
+
+    def clock(self):
+        self.now += 1e-6
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds + self.overshoot
+
+
+class TestPrecisionTimer(unittest.TestCase):
+
+    def test_emits_on_schedule(self):
+        timer = PrecisionTimer()
+        sink = FakeSink(time.perf_counter)
+        schedule = [i * 0.005 for i in range(40)]
+        timer.start()
+        origin = timer.origin
+        for i, offset in enumerate(schedule):
+            timer.wait_until(offset)
+            sink.send(i)
+        for (_, emitted), offset in zip(sink.events, schedule):
+            self.assertGreaterEqual(emitted - origin, offset)
+        self.assertEqual(timer.stats()['count'], len(schedule))
+
+    def test_learns_spin_budget(self):
+        fake = FakeClock(overshoot=0.003)
+        timer = PrecisionTimer(sleep=fake.sleep, clock=fake.clock, yield_func=lambda: None)
+        timer.start()
+        for i in range(1, 50):
+            timer.wait_until(i * 0.05)
+        self.assertAlmostEqual(timer.spin_budget, 0.003, delta=0.001)
+        self.assertLess(timer.stats()['max_ms'], 0.1)
+
+    def test_late_action_does_not_shift_schedule(self):
+        fake = FakeClock(overshoot=0.0)
+        timer = PrecisionTimer(sleep=fake.sleep, clock=fake.clock, yield_func=lambda: None)
+        timer.start()
+        fake.now += 0.03
+        self.assertGreater(timer.wait_until(0.01), 0.015)
+        self.assertLess(timer.wait_until(0.05), 0.001)
+
+    def test_percentile(self):
+        ordered = list(range(101))
+        self.assertEqual(percentile(ordered, 0.5), 50)
+        self.assertEqual(percentile(ordered, 0.99), 99)
+        self.assertEqual(percentile([3], 0.99), 3)
+
+
+class TestMacroPlayerSchedule(unittest.TestCase):
+
+    def test_blocking_op_restarts_schedule(self):
+        events = []
+
+        def dispatch(op, key, dx, dy):
+            if op == OP_RESET_TRANSPORT:
+                time.sleep(0.1)
+            events.append((op, time.perf_counter()))
+
+        player = MacroPlayer(dispatch, main_thread_ops=(OP_RESET_TRANSPORT,))
+        player.start([(0.0, OP_KEY_DOWN, 'w', 0, 0), (0.01, OP_RESET_TRANSPORT, None, 0, 0),
+                      (0.05, OP_KEY_UP, 'w', 0, 0)])
+        while not player.wait(0.001):
+            player.service()
+        player.raise_error()
+        (_, blocked_end), (_, released) = events[1], events[2]
+        # 阻塞了 0.1 秒，松开按键仍在阻塞结束 0.04 秒之后，而不是立即追赶
+        self.assertGreaterEqual(released - blocked_end, 0.035)
+
+
+if __name__ == '__main__':
+    unittest.main()
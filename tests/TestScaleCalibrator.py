@@ -0,0 +1,69 @@
+# Test case
+import unittest
+
+import cv2
+import numpy as np
+
+from src.route.ScaleCalibrator import ScaleCalibrator, candidate_scales, recorded_height, rescale
+
+
+def make_scene(width=640, height=360, seed=0):
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (height // 8, width // 8), dtype=np.uint8)
+    return cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+class TestScaleHelpers(unittest.TestCase):
+
+    def test_recorded_height(self):
+        self.assertEqual(recorded_height('示例(1080p)'), 1080)
+        self.assertEqual(recorded_height('xxx 2k'), 1440)
+        self.assertEqual(recorded_height('扼守 4K'), 2160)
+        self.assertEqual(recorded_height('720P 录制'), 720)
+        self.assertIsNone(recorded_height('示例'))
+
+    def test_candidate_scales_with_recorded(self):
+        self.assertEqual(candidate_scales(1440, 1080), [1.3333, 1.0])
+        # 与 1 相差不到 1% 时视为不缩放，不需要校准
+        self.assertEqual(candidate_scales(1080, 1080), [1.0])
+        self.assertEqual(candidate_scales(1086, 1080), [1.0])
+
+    def test_candidate_scales_unknown(self):
+        self.assertEqual(candidate_scales(1080), [1.0, 0.75, 0.5])
+        self.assertEqual(candidate_scales(1440), [1.3333, 1.0, 0.6667])
+
+
+class TestScaleCalibrator(unittest.TestCase):
+
+    def setUp(self):
+        # 截图按 0.75 缩放，相当于 1440p 录制的模板在 1080p 下使用
+        self.original = make_scene(seed=1)
+        self.screen = rescale(self.original, 0.75)
+        self.template = self.original[100:260, 200:440].copy()
+        self.other = make_scene(seed=2)[100:260, 200:440].copy()
+
+    def test_not_needed_with_single_scale(self):
+        self.assertFalse(ScaleCalibrator([1.0]).needed)
+        self.assertTrue(ScaleCalibrator([0.75, 1.0]).needed)
+
+    def test_picks_matching_scale(self):
+        calibrator = ScaleCalibrator([1.0, 0.75, 0.5])
+        scale, confidence = calibrator.calibrate(self.screen, [('A', self.template)])
+        self.assertEqual(scale, 0.75)
+        self.assertGreaterEqual(confidence, calibrator.min_confidence)
+
+    def test_undecided_until_max_attempts(self):
+        calibrator = ScaleCalibrator([1.0, 0.75], min_confidence=1.1, max_attempts=2)
+        self.assertIsNone(calibrator.calibrate(self.screen, [('A', self.template)]))
+        # 最后一次只有不在画面里的模板，仍按之前累计的置信度选择比例而不是 fallback
+        scale, confidence = calibrator.calibrate(self.screen, [('B', self.other)])
+        self.assertEqual(scale, 0.75)
+        self.assertGreater(confidence, 0.6)
+
+    def test_fallback_without_any_match(self):
+        calibrator = ScaleCalibrator([1.0, 0.75], fallback=0.75, max_attempts=1)
+        self.assertEqual(calibrator.calibrate(self.screen, []), (0.75, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
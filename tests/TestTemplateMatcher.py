@@ -0,0 +1,58 @@
+# Test case
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.route.TemplateMatcher import TemplateMatcher
+
+
+def make_screen(seed, width=640, height=360):
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (height // 8, width // 8), dtype=np.uint8)
+    return cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+class TestTemplateMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.screens = [make_screen(1), make_screen(2)]
+        self.locations = [(200, 100), (60, 180)]
+        self.templates = [screen[y:y + 120, x:x + 200].copy()
+                          for screen, (x, y) in zip(self.screens, self.locations)]
+
+    def test_match_many_with_executor(self):
+        matcher = TemplateMatcher(pyramid=True, backend='spatial')
+        candidates = [('a', self.templates[0]), ('b', self.templates[1])]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = matcher.match_many(self.screens[0], candidates, executor)
+        self.assertEqual(results[0][1], self.locations[0])
+        self.assertGreater(results[0][0], results[1][0])
+
+    def test_concurrent_screens_do_not_mix(self):
+        # 后台匹配线程与主循环用同一个匹配器匹配不同的截图，缩小截图和频谱不能互相覆盖
+        for backend in ('spatial', 'fft'):
+            matcher = TemplateMatcher(pyramid=True, backend=backend)
+            errors = []
+
+            def run(index):
+                screen, template = self.screens[index], self.templates[index]
+                for _ in range(30):
+                    # 每次都是新的截图对象，迫使缓存不断被替换
+                    frame = screen.copy()
+                    confidence, loc = matcher.match(frame, f'template-{index}', template)
+                    if loc != self.locations[index] or confidence < 0.99:
+                        errors.append((backend, index, loc, confidence))
+
+            threads = [threading.Thread(target=run, args=(index,)) for index in (0, 1)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
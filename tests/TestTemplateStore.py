@@ -0,0 +1,86 @@
+# Test case
+import unittest
+
+import numpy as np
+
+from src.route.TemplateStore import BYTES_PER_MB, TemplateStore
+
+
+class CountingSources(dict):
+    """每个模板 1MB，记录每个模板被加载的次数。"""
+
+    def __init__(self, names, failing=()):
+        super().__init__()
+        self.loads = {name: 0 for name in names}
+        for name in names:
+            self[name] = self._source(name, name in failing)
+
+    def _source(self, name, failing):
+        def load():
+            self.loads[name] += 1
+            return None if failing else np.zeros(BYTES_PER_MB, dtype=np.uint8)
+        return load
+
+
+class TestTemplateStore(unittest.TestCase):
+
+    def test_lazy_and_cached(self):
+        sources = CountingSources(['A', 'A-1', 'A-2'])
+        store = TemplateStore(sources, budget_mb=8)
+        self.assertEqual(list(store), ['A', 'A-1', 'A-2'])
+        self.assertIn('A-1', store)
+        self.assertEqual(sum(sources.loads.values()), 0)
+
+        store['A']
+        store['A']
+        self.assertEqual(sources.loads['A'], 1)
+        self.assertEqual((store.hits, store.misses), (1, 1))
+        self.assertAlmostEqual(store.stats()['resident_mb'], 1.0)
+
+    def test_lru_eviction_within_budget(self):
+        sources = CountingSources(['A', 'B', 'C'])
+        evicted = []
+        store = TemplateStore(sources, budget_mb=2, on_evict=evicted.append)
+        store['A']
+        store['B']
+        store['A']
+        store['C']
+        self.assertEqual(evicted, ['B'])
+        self.assertLessEqual(store.resident_bytes, 2 * BYTES_PER_MB)
+        self.assertEqual(store.peak_bytes, 2 * BYTES_PER_MB)
+        store['B']
+        self.assertEqual(sources.loads['B'], 2)
+
+    def test_prefetch_hit_rate(self):
+        sources = CountingSources(['A', 'A-1', 'A-2'])
+        store = TemplateStore(sources, budget_mb=8)
+        self.assertEqual(store.prefetch(['A-1', 'A-2']), 2)
+        self.assertEqual(store.prefetch(['A-1']), 0)
+        store['A-1']
+        store['A-1']
+        self.assertEqual(store.prefetch_hits, 1)
+        self.assertAlmostEqual(store.prefetch_hit_rate, 0.5)
+        self.assertEqual(store.misses, 0)
+
+    def test_failed_source_is_missing(self):
+        sources = CountingSources(['A', 'B'], failing=['B'])
+        store = TemplateStore(sources)
+        self.assertIsNone(store.get('B'))
+        self.assertNotIn('B', store)
+        self.assertEqual(len(store), 1)
+        store.get('B')
+        self.assertEqual(sources.loads['B'], 1)
+
+    def test_clear_releases_everything(self):
+        sources = CountingSources(['A', 'B'])
+        evicted = []
+        store = TemplateStore(sources, on_evict=evicted.append)
+        store['A']
+        store['B']
+        store.clear()
+        self.assertEqual(store.resident_bytes, 0)
+        self.assertEqual(sorted(evicted), ['A', 'B'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import time
+
+import cv2
+import numpy as np
+
+from src.route.DescriptorIndex import DescriptorIndex
+from src.route.TemplateMatcher import TemplateMatcher
+
+
+def _similar_scenes(rng, count, width, height, shared=0.7):
+    """生成彼此相似的场景：共用同一张低频底图，各自叠加不同的结构，近似同一副本里外观接近的地图。"""
+    def smooth(cells):
+        noise = rng.integers(0, 256, (height // cells, width // cells)).astype(np.float32)
+        return cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+
+    base = smooth(32)
+    scenes = []
+    for _ in range(count):
+        scene = shared * base + (1 - shared) * smooth(16)
+        scenes.append(np.clip(scene, 0, 255).astype(np.uint8))
+    return scenes
+
+
+def benchmark(width=1920, height=1080, roots=(4, 16, 64), template_size=(740, 740), top_k=3, accept_conf=0.9,
+              repeat=3):
+    """对比全部根节点精确匹配与先粗筛再匹配的耗时，以及粗筛（含回退）的结果是否与全部匹配一致。
+
+    场景彼此相似，截图在正确场景上加了亮度变化和噪声，粗筛的排序可能出错，此时按 match_map 的做法回退。
+    absent 的一行截图不在任何根节点上（最常见的情形），必然回退，衡量回退的额外开销。
+    """
+    rng = np.random.default_rng(0)
+    rows = []
+    template_width, template_height = template_size
+    for count in roots:
+        # 多生成一个场景作为不在任何根节点上的画面
+        scenes = _similar_scenes(rng, count + 1, width, height)
+        x, y = (width - template_width) // 2, (height - template_height) // 2
+        templates = {f'root-{i}': scene[y:y + template_height, x:x + template_width].copy()
+                     for i, scene in enumerate(scenes[:count])}
+        names = list(templates)
+        index = DescriptorIndex(top_k=top_k)
+        index.build(templates, names)
+        matcher = TemplateMatcher(backend='auto')
+        for absent in (False, True):
+            noise = rng.normal(0, 12, (height, width))
+            scene = scenes[count] if absent else scenes[count // 2]
+            screen = np.clip(scene * 0.85 + 20 + noise, 0, 255).astype(np.uint8)
+            index.fallbacks = 0
+
+            def run(candidates):
+                results = matcher.match_many(screen, [(name, templates[name], None) for name in candidates])
+                return max(zip(results, candidates))
+
+            def run_shortlist():
+                # 与 ImportTask.match_map 相同：没有达到接受阈值时只回退缩略图得分其次的 top_k 个根节点
+                shortlisted, rest = index.rank(screen, names)
+                best = run(shortlisted)
+                if rest and best[0][0] < accept_conf:
+                    index.fallbacks += 1
+                    best = max(best, run(rest[:top_k]))
+                return best
+
+            run(names)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                matcher._small_screen = None
+                best_full = run(names)
+            full = (time.perf_counter() - start) / repeat
+            start = time.perf_counter()
+            for _ in range(repeat):
+                index._small_screen = None
+                matcher._small_screen = None
+                best_shortlist = run_shortlist()
+            shortlisted = (time.perf_counter() - start) / repeat
+            if absent:
+                correct = best_full[0][0] < accept_conf and best_shortlist[0][0] < accept_conf
+            else:
+                correct = best_full[1] == best_shortlist[1] == f'root-{count // 2}'
+            rows.append((count, absent, full * 1000, shortlisted * 1000, index.fallbacks / repeat, correct))
+    return rows
+
+
+if __name__ == '__main__':
+    for count, absent, full_ms, shortlist_ms, fallback_rate, correct in benchmark():
+        print(f'roots={count:>3} {"absent " if absent else "present"} full={full_ms:8.2f} ms '
+              f'shortlist={shortlist_ms:8.2f} ms fallback={fallback_rate:.0%} correct={correct}')
@@ -0,0 +1,142 @@
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from src.scene.FishBarDetector import FishBarDetector
+
+BAR_MIN_AREA, ICON_MIN_AREA, ICON_MAX_AREA = 1200, 70, 400
+
+
+def detect_baseline(roi, res_ratio, bar_min_area=BAR_MIN_AREA, icon_min_area=ICON_MIN_AREA,
+                    icon_max_area=ICON_MAX_AREA):
+    """改用 FishBarDetector 之前 AutoFishTask.find_bar_and_fish_by_area 的轮廓实现，作为结果和耗时的基准。"""
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    _, scene_bin = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(scene_bin, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    blobs = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > icon_min_area * res_ratio ** 2:
+            blobs.append({"contour": contour, "area": area})
+    blobs.sort(key=lambda b: b["area"], reverse=True)
+
+    has_bar = has_icon = False
+    bar_center = bar_rect = icon_center = icon_rect = None
+    bar_area = icon_area = 0.0
+    for blob in blobs:
+        if blob["area"] > bar_min_area * res_ratio ** 2:
+            moments = cv2.moments(blob["contour"])
+            if moments["m00"] > 0:
+                has_bar = True
+                bar_area = blob["area"]
+                bar_center = (int(moments["m10"] / moments["m00"]), int(moments["m01"] / moments["m00"]))
+                x, y, w, h = cv2.boundingRect(blob["contour"])
+                bar_rect = (x, y, x + w, y + h)
+        break
+    for blob in blobs:
+        if blob["area"] == bar_area:
+            continue
+        if icon_min_area * res_ratio ** 2 < blob["area"] < icon_max_area * res_ratio ** 2:
+            moments = cv2.moments(blob["contour"])
+            if moments["m00"] > 0:
+                has_icon = True
+                icon_area = blob["area"]
+                icon_center = (int(moments["m10"] / moments["m00"]), int(moments["m01"] / moments["m00"]))
+                x, y, w, h = cv2.boundingRect(blob["contour"])
+                icon_rect = (x, y, x + w, y + h)
+        break
+    return (has_bar, bar_center, bar_rect, bar_area), (has_icon, icon_center, icon_rect, icon_area)
+
+
+def synthetic_strip(height, bar_top, bar_height, icon_y, icon_size, res_ratio=1.0, specks=0, bar_specks=0, seed=0):
+    """生成与游戏中 ROI 尺寸相同的合成竖条：暗色噪声背景、鱼条、一个带暗色描边的圆形鱼标，
+    specks 个不与鱼条、鱼标同行的小亮点（水面反光），以及 bar_specks 个落在鱼条右侧空白处、与鱼条同行的小亮点。
+    icon_y 落在鱼条范围内时鱼标被描边与鱼条隔开，与鱼标进入控制区时的画面相同。"""
+    rng = np.random.default_rng(seed)
+    width = max(8, round(33 * res_ratio))
+    size = max(2, round(2 * res_ratio))
+    bar_right = width - 2 * size - 2
+    strip = rng.integers(20, 120, (height, width, 3), dtype=np.uint8)
+    strip[bar_top:bar_top + bar_height, 2:bar_right] = 235
+    busy = [(bar_top - 2, bar_top + bar_height + 2)]
+    if icon_y is not None:
+        cv2.circle(strip, (bar_right // 2 + 1, icon_y), icon_size // 2 + max(2, round(2 * res_ratio)),
+                   (40, 40, 40), -1)
+        cv2.circle(strip, (bar_right // 2 + 1, icon_y), icon_size // 2, (250, 250, 250), -1)
+        busy.append((icon_y - icon_size, icon_y + icon_size))
+    for i in range(bar_specks):
+        y = bar_top + (i + 1) * bar_height // (bar_specks + 1)
+        strip[y:y + size, width - size - 1:width - 1] = 255
+    placed = 0
+    while placed < specks:
+        y, x = int(rng.integers(0, height - size)), int(rng.integers(0, width - size))
+        if any(top <= y + size and y <= bottom for top, bottom in busy):
+            continue
+        strip[y:y + size, x:x + size] = 255
+        busy.append((y - 1, y + size + 1))
+        placed += 1
+    return strip
+
+
+def synthetic_strips():
+    """1080p/1440p/4K 的合成竖条，包括有反光亮点、鱼标在鱼条内、反光与鱼条同行（后两种走轮廓）的情形。"""
+    strips = []
+    for res_ratio, label in ((1.0, '1080p'), (4 / 3, '1440p'), (2.0, '4k')):
+        height = round(402 * res_ratio)
+        bar_top, bar_height = round(120 * res_ratio), round(110 * res_ratio)
+        icon = round(16 * res_ratio)
+        apart, inside = round(320 * res_ratio), round(170 * res_ratio)
+        strips.append((f'{label} apart', synthetic_strip(height, bar_top, bar_height, apart, icon, res_ratio),
+                       res_ratio))
+        strips.append((f'{label} no icon', synthetic_strip(height, bar_top, bar_height, None, icon, res_ratio),
+                       res_ratio))
+        strips.append((f'{label} specks', synthetic_strip(height, bar_top, bar_height, apart, icon, res_ratio,
+                                                         specks=30), res_ratio))
+        strips.append((f'{label} icon in bar', synthetic_strip(height, bar_top, bar_height, inside, icon,
+                                                              res_ratio), res_ratio))
+        strips.append((f'{label} bar specks', synthetic_strip(height, bar_top, bar_height, apart, icon, res_ratio,
+                                                             bar_specks=3), res_ratio))
+    return strips
+
+
+def same_result(actual, expected):
+    """坐标一致，面积允许 5% 的差异（鱼标斜边上与 contourArea 有半像素级的差异）。"""
+    return all(a[:3] == e[:3] and abs(a[3] - e[3]) <= 0.05 * e[3] for a, e in zip(actual, expected))
+
+
+def benchmark(strips=None, repeat=2000):
+    """对比基准轮廓实现与 FishBarDetector 在同一组竖条上的结果和单次耗时。
+
+    strips 为 [(名称, BGR 竖条, res_ratio)]，为 None 时使用 synthetic_strips()。
+    """
+    detector = FishBarDetector(BAR_MIN_AREA, ICON_MIN_AREA, ICON_MAX_AREA)
+    rows = []
+    for name, strip, res_ratio in strips or synthetic_strips():
+        fallbacks = detector.fallbacks
+        same = same_result(detector.detect(strip, res_ratio), detect_baseline(strip, res_ratio))
+        fallback = detector.fallbacks > fallbacks
+        timings = []
+        for func in (lambda: detect_baseline(strip, res_ratio), lambda: detector.detect(strip, res_ratio)):
+            # 取 5 轮中最快的一轮，减少其它进程的干扰
+            best = float('inf')
+            for _ in range(5):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    func()
+                best = min(best, time.perf_counter() - start)
+            timings.append(best / repeat * 1e6)
+        rows.append((name, timings[0], timings[1], fallback, same))
+    return rows
+
+
+if __name__ == '__main__':
+    # python -m tests.benchmarks.FishBarBenchmark [录制的竖条.png ...]，录制的竖条按高度 402 像素为 1080p 换算
+    recorded = []
+    for path in sys.argv[1:]:
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        recorded.append((path, image, image.shape[0] / 402))
+    for name, baseline_us, detector_us, fallback, same in benchmark(recorded or None):
+        print(f'{name:>17} baseline={baseline_us:7.1f} us detector={detector_us:7.1f} us '
+              f'contours={fallback!s:>5} same={same}')
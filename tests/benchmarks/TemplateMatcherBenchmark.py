@@ -0,0 +1,106 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.route.TemplateMatcher import TemplateMatcher
+
+
+def benchmark(width=2560, height=1440, sizes=((1200, 700), (600, 400), (240, 160)), repeat=5):
+    """对比穷举与金字塔模式在合成截图上的置信度与耗时。"""
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (height // 8, width // 8), dtype=np.uint8)
+    screen = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    exhaustive = TemplateMatcher(pyramid=False, backend='spatial')
+    pyramid = TemplateMatcher(pyramid=True, backend='spatial')
+    rows = []
+    for template_width, template_height in sizes:
+        x, y = (width - template_width) // 3, (height - template_height) // 3
+        template = screen[y:y + template_height, x:x + template_width].copy()
+        name = f'{template_width}x{template_height}'
+        for label, matcher in (('exhaustive', exhaustive), ('pyramid', pyramid)):
+            matcher.match(screen, name, template)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                matcher._small_screen = None
+                confidence, loc = matcher.match(screen, name, template)
+            elapsed = (time.perf_counter() - start) / repeat
+            rows.append((name, label, confidence, loc == (x, y), elapsed * 1000))
+        # 位置先验与真实位置有少量偏移
+        hint = (x + 7, y - 5)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            confidence, loc = pyramid.match(screen, name, template, hint=hint)
+        elapsed = (time.perf_counter() - start) / repeat
+        rows.append((name, 'window', confidence, loc == (x, y), elapsed * 1000))
+    return rows
+
+
+def benchmark_parallel(width=2560, height=1440, candidates=6, workers=(1, 2, 4, 8), repeat=3, pyramid=False):
+    """测量多候选并行匹配相对于顺序匹配的加速比。"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (height // 8, width // 8), dtype=np.uint8)
+    screen = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    templates = []
+    for i in range(candidates):
+        x, y = 100 + i * 150, 80 + i * 90
+        templates.append((f'candidate-{i}', screen[y:y + 400, x:x + 600].copy()))
+    matcher = TemplateMatcher(pyramid=pyramid, backend='spatial')
+    rows = []
+    baseline = None
+    for worker_count in workers:
+        executor = ThreadPoolExecutor(max_workers=worker_count) if worker_count > 1 else None
+        matcher.match_many(screen, templates, executor)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            matcher._small_screen = None
+            matcher.match_many(screen, templates, executor)
+        elapsed = (time.perf_counter() - start) / repeat
+        if executor is not None:
+            executor.shutdown()
+        baseline = baseline or elapsed
+        rows.append((worker_count, elapsed * 1000, baseline / elapsed))
+    return rows
+
+
+def benchmark_backends(width=2560, height=1440, sizes=((2000, 1200), (1200, 700), (900, 520), (600, 400),
+                                                       (240, 160), (80, 60)), candidates=4, repeat=3):
+    """对比各后端在同一帧上匹配 candidates 个同尺寸模板的平均耗时。
+
+    fft 的截图频谱和窗口方差由同一帧的所有候选分摊，因此按每帧 candidates 个候选计时。
+    """
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (height // 8, width // 8), dtype=np.uint8)
+    rows = []
+    for template_width, template_height in sizes:
+        x, y = (width - template_width) // 3, (height - template_height) // 3
+        screen = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+        templates = [(f'{template_width}x{template_height}-{i}',
+                      screen[y + i:y + i + template_height, x + i:x + i + template_width].copy())
+                     for i in range(candidates)]
+        for label, matcher in (('exhaustive', TemplateMatcher(pyramid=False, backend='spatial')),
+                               ('pyramid', TemplateMatcher(pyramid=True, backend='spatial')),
+                               ('fft', TemplateMatcher(backend='fft'))):
+            matcher.match_many(screen, templates)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                frame = screen.copy()
+                results = matcher.match_many(frame, templates)
+            elapsed = (time.perf_counter() - start) / repeat / candidates
+            located = all(loc == (x + i, y + i) for i, (_, loc) in enumerate(results))
+            rows.append((f'{template_width}x{template_height}', label, min(r[0] for r in results), located,
+                         elapsed * 1000))
+    return rows
+
+
+if __name__ == '__main__':
+    for name, label, confidence, located, elapsed_ms in benchmark():
+        print(f'{name:>10} {label:>10} conf={confidence:.4f} located={located} {elapsed_ms:8.2f} ms')
+    print(f'cpu count: {os.cpu_count()}')
+    for worker_count, elapsed_ms, speedup in benchmark_parallel():
+        print(f'workers={worker_count} {elapsed_ms:8.2f} ms speedup={speedup:.2f}x')
+    for name, label, confidence, located, elapsed_ms in benchmark_backends():
+        print(f'{name:>10} {label:>10} conf={confidence:.4f} located={located} {elapsed_ms:8.2f} ms/candidate')